@@ -1,10 +1,12 @@
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
-from fastapi import APIRouter, HTTPException, File, UploadFile, Depends
+from fastapi import APIRouter, HTTPException, File, UploadFile, Depends, Query
 from core.schemas import Message, WorkRequest, AgentResponse, WorkRequestFile, WorkResult, MessageForFile
+from core.work_scheduler import WorkQueueFullError
+from core.agent_routes import add_message_routes
+from core.uploads import UploadStore, UploadTooLargeError
+from core.file_cache import FileContentCache
 from app.services.agent_service import ConciergeAgentService
-import shutil
-from pathlib import Path
 from fastapi import Body, Form
 from typing import Annotated
 import logging
@@ -27,6 +29,12 @@ app.add_middleware(
 
 router = APIRouter()
 agent_service = ConciergeAgentService()
+upload_store = UploadStore.from_env()
+file_cache = FileContentCache.from_env()
+
+# Files up to FILE_CONTEXT_MAX_CHARS are sent whole, larger ones as their best matching chunks
+FILE_CONTEXT_MAX_CHARS = int(os.getenv("FILE_CONTEXT_MAX_CHARS", 12000))
+FILE_CONTEXT_MAX_CHUNKS = int(os.getenv("FILE_CONTEXT_MAX_CHUNKS", 6))
 
 @router.post("/restart")
 async def restart_agent():
@@ -41,26 +49,10 @@ async def restart_agent():
         logger.debug("Agent restart completed successfully")
         return {"status": "success", "message": "Agent restarted successfully"}
     except Exception as e:
-        logger.error(f"Error restarting agent: {str(e)}", exc_info=True)
+        logger.error("Error restarting agent: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/message", response_model=AgentResponse)
-async def process_message(message: Message):
-    """
-    Process a message for the agent.
-    
-    Takes a Message containing the role, context and history.
-    Returns an AgentResponse with status and optional result/error.
-    """
-    try:
-        logger.info(f"Processing message with role: {message.role}")
-        logger.debug(f"Message content: {message.message}")
-        response = agent_service.process_message(message)
-        logger.debug(f"Message processed successfully: {response}")
-        return response
-    except Exception as e:
-        logger.error(f"Error processing message: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+add_message_routes(router, agent_service)
 
 @router.get("/status")
 async def get_status():
@@ -74,16 +66,19 @@ async def get_status():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/work-request", response_model=AgentResponse)
+@router.post("/work-request", response_model=WorkResult)
 async def process_work_request(work_request: WorkRequest):
     """
     Process an asynchronous work request for the agent.
     
     Takes a WorkRequest containing the task, context and history.
-    Returns an AgentResponse with status and optional result/error.
+    Returns a WorkResult with status and optional result/error.
+    Returns 429 if the agent's work queue is full.
     """
     try:
-        return agent_service.process_work_request(work_request)
+        return await agent_service.process_work_request(work_request)
+    except WorkQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -95,23 +90,14 @@ async def process_work_request_with_file(
     content_type: str = Form(...),
     file: UploadFile = File(...)
 ):
-    """Process work request with file upload"""
+    """
+    Process work request with file upload.
+    
+    The file is streamed to the upload directory; returns 413 if it exceeds UPLOAD_MAX_BYTES.
+    """
     try:
-        # Create uploads directory if it doesn't exist
-        upload_dir = Path("uploads")
-        upload_dir.mkdir(exist_ok=True)
-        
-        # Save uploaded file
-        file_path = upload_dir / file.filename
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # Create WorkRequestFile
-        work_file = WorkRequestFile(
-            filename=file.filename,
-            content_type=file.content_type,
-            file_path=str(file_path)
-        )
+        # Stream the upload to disk
+        work_file = await upload_store.save(file)
         
         # Add file to work request
         work_request = WorkRequest(
@@ -122,21 +108,32 @@ async def process_work_request_with_file(
         )
         
         return await agent_service.process_work_request(work_request)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except WorkQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/work-result/{work_id}", response_model=WorkResult)
-async def get_work_result(work_id: str):
+async def get_work_result(
+    work_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the work to change state")
+):
     """
     Get the result of an async work request.
     
     Takes a work_id and returns the WorkResult with status and optional result/error.
+    With wait > 0, a pending or in-progress request blocks until the work changes
+    state or the wait expires, so clients can long-poll instead of polling on an interval.
     """
     try:
-        result = agent_service.get_work_result(work_id)
+        result = await agent_service.wait_for_work_result(work_id, wait)
         if result is None:
             raise HTTPException(status_code=404, detail="Work request not found")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -146,48 +143,57 @@ async def process_file_message(message_request: MessageForFile):
     Process a message query about a specific file.
     """
     try:
-        logger.info(f"Processing file message for file: {message_request.file_path}")
-        logger.debug(f"Message content: {message_request.message}")
+        logger.info("Processing file message for file: %s", message_request.file_path)
+        logger.debug("Message content", extra={"payload": message_request.message})
 
-        # Verify file exists in cache
-        file_path = Path(message_request.file_path)
-        if not file_path.exists():
-            logger.error(f"File not found: {message_request.file_path}")
+        # Read the file, or reuse its cached content if unchanged on disk
+        try:
+            cached_file = await file_cache.get(message_request.file_path)
+        except FileNotFoundError:
+            logger.error("File not found: %s", message_request.file_path)
             raise HTTPException(
                 status_code=404,
                 detail=f"File not found: {message_request.file_path}"
             )
-
-        # Read file content
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                file_content = file.read()
-                logger.debug(f"Successfully read file content, length: {len(file_content)}")
         except Exception as e:
-            logger.error(f"Error reading file: {str(e)}", exc_info=True)
+            logger.error("Error reading file: %s", e, exc_info=True)
             raise HTTPException(
                 status_code=500,
                 detail=f"Error reading file: {str(e)}"
             )
 
+        # Only the parts of the file relevant to the question go into the prompt
+        excerpts = cached_file.select(
+            message_request.message,
+            max_chunks=FILE_CONTEXT_MAX_CHUNKS,
+            max_chars=FILE_CONTEXT_MAX_CHARS
+        )
+        logger.debug(
+            "Selected %d of %d chunks, file length: %d", len(excerpts), len(cached_file.chunks), cached_file.length
+        )
+        if cached_file.length <= FILE_CONTEXT_MAX_CHARS:
+            file_context = f"File content:\n\n{cached_file.text}"
+        else:
+            file_context = "File content (relevant excerpts):\n\n" + "\n\n[...]\n\n".join(excerpts)
+
         # Create message with file content as context
         message = Message(
             message=message_request.message,
             role="user",
-            context=f"File content:\n\n{file_content}",
+            context=file_context,
             history=message_request.history if message_request.history else []
         )
 
         # Process message with agent's file-specific method
         logger.info("Sending message to agent for file processing")
-        response = agent_service.process_message_for_file(message)
-        logger.debug(f"Received response from agent: {response}")
+        response = await agent_service.process_message_for_file(message)
+        logger.debug("Received response from agent", extra={"payload": response})
 
         return response
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error processing file message: {str(e)}", exc_info=True)
+        logger.error("Unexpected error processing file message: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
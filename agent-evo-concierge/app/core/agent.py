@@ -1,8 +1,9 @@
-from typing import List, Tuple
+from typing import List, Tuple, AsyncIterator
 from core.agent_base import BaseAgent
 from core.schemas import MessageHistory, WorkRequestFile
-from llama_index.agent.openai import OpenAIAgent
-from core.azure_openai_llm import AzureOpenAILLM
+from core.llm_factory import create_llm
+from core.agent_pool import OpenAIAgentPool
+from core.llm_cache import llm_cache_config_from_env
 import os
 from llama_index.core import Settings
 from dotenv import load_dotenv
@@ -14,18 +15,28 @@ logger = logging.getLogger("evo_concierge")
 load_dotenv()
 
 class ConciergeAgent(BaseAgent):
+
+    INTERNAL_CONTEXT = (
+        "You are the Evolve concierge agent. You greet users, answer their questions "
+        "and help them find their way around the Evolve system. "
+        "Be friendly, concise and accurate."
+    )
+
     def __init__(self):
         logger.info("Initializing ConciergeAgent")
-        self.llm = AzureOpenAILLM(
+        self.llm = create_llm(
             model_config={
                 "deployment_name": os.getenv("AZURE_OPEN_AI_DEPLOYMENT_ID"),
                 "api_base": os.getenv("AZURE_OPENAI_ENDPOINT"),
                 "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
                 "model": os.getenv("AZURE_OPENAI_MODEL"),
-                "api_version": os.getenv("AZURE_API_VERSION")
+                "api_version": os.getenv("AZURE_API_VERSION"),
+                "embedding_deployment_name": os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_ID"),
+                "cache": llm_cache_config_from_env()
             }
         )
         logger.debug("LLM initialized successfully")
+        self.agent_pool = OpenAIAgentPool(self.llm.llm)
         super().__init__()
 
     def process_message(
@@ -35,11 +46,68 @@ class ConciergeAgent(BaseAgent):
         context: str,
         history: List[MessageHistory]
     ) -> Tuple[str, List[MessageHistory]]:
-        logger.info(f"Processing message from role: {role}")
-        logger.debug(f"Message content: {message}")
-        logger.debug(f"Context: {context}")
-        
-        # Rest of your implementation...
+        logger.info("Processing message from role: %s", role)
+        logger.debug("Message content", extra={"payload": message})
+        logger.debug("Context", extra={"payload": context})
+
+        chat_messages = self.build_chat_messages(message, role, context, history)
+        with self.agent_pool.checkout(
+            self.system_prompt_template,
+            chat_messages[0].content,
+            chat_messages[1:-1]
+        ) as agent:
+            response = agent.chat(message)
+        self.llm.record_usage(chat_messages, response.response)
+
+        response_memory = self.build_response_memory(message, role, history, response.response)
+        return response.response, response_memory
+
+    async def aprocess_message(
+        self,
+        message: str,
+        role: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> Tuple[str, List[MessageHistory]]:
+        logger.info("Processing message from role: %s", role)
+        logger.debug("Message content", extra={"payload": message})
+
+        # System prompt and history packed into the token budget
+        chat_messages = self.build_chat_messages(message, role, context, history)
+
+        async def produce(llm) -> str:
+            with self.agent_pool.checkout(
+                self.system_prompt_template,
+                chat_messages[0].content,
+                chat_messages[1:-1],
+                llm
+            ) as agent:
+                response = await agent.achat(message)
+            return response.response
+
+        result = await self.llm.execute_chat(chat_messages, produce)
+
+        response_memory = self.build_response_memory(message, role, history, result)
+        return result, response_memory
+
+    async def stream_message(
+        self,
+        message: str,
+        role: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> AsyncIterator[str]:
+        logger.info("Streaming message from role: %s", role)
+        chat_messages = self.build_chat_messages(message, role, context, history)
+        response_stream = await self.llm.run_request(
+            lambda llm: llm.astream_chat(chat_messages), chat_messages, operation="stream"
+        )
+        deltas = []
+        async for chunk in response_stream:
+            if chunk.delta:
+                deltas.append(chunk.delta)
+                yield chunk.delta
+        self.llm.record_usage(chat_messages, "".join(deltas))
 
     async def process_work_request(
         self,
@@ -1,45 +0,0 @@
-import logging
-import sys
-from logging.handlers import RotatingFileHandler
-import os
-
-def setup_logging(debug_mode: bool = False):
-    # Create logs directory if it doesn't exist
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    # Configure logging level based on debug mode
-    log_level = logging.DEBUG if debug_mode else logging.INFO
-    
-    # Create logger
-    logger = logging.getLogger("evo_concierge")
-    logger.setLevel(log_level)
-    
-    # Create formatters
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_formatter = logging.Formatter(
-        '%(levelname)s - %(message)s'
-    )
-    
-    # Create and configure file handler
-    file_handler = RotatingFileHandler(
-        os.path.join(log_dir, "evo_concierge.log"),
-        maxBytes=10485760,  # 10MB
-        backupCount=5
-    )
-    file_handler.setLevel(log_level)
-    file_handler.setFormatter(file_formatter)
-    
-    # Create and configure console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(log_level)
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger 
\ No newline at end of file
@@ -1,6 +1,9 @@
 from fastapi import FastAPI
-from .api.routes import router
-from .core.logging_config import setup_logging
+from .api.routes import router, upload_store
+from core.uploads import UploadSizeLimitMiddleware
+from core.logging_config import setup_logging
+from core.metrics import setup_metrics
+from core.tracing import setup_tracing
 import os
 from dotenv import load_dotenv
 
@@ -9,10 +12,14 @@ load_dotenv()
 
 # Setup logging
 debug_mode = os.getenv("DEBUG", "false").lower() == "true"
-logger = setup_logging(debug_mode)
+logger = setup_logging("agent-evo-concierge", debug_mode)
 
 app = FastAPI(title="Evo Concierge Agent")
+setup_metrics(app, "agent-evo-concierge")
+setup_tracing(app, "agent-evo-concierge")
 
+# Refuse oversize uploads before their body is received
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=upload_store.max_bytes)
 app.include_router(router, prefix="/agent")
 
 # Log application startup
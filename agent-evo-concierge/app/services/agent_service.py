@@ -1,6 +1,7 @@
 from core.service_base import BaseAgentService
 from app.core.agent import ConciergeAgent
 from core.schemas import Message, AgentResponse
+from core.token_budget import track_token_usage
 import logging
 
 logger = logging.getLogger("evo_concierge")
@@ -14,15 +15,15 @@ class ConciergeAgentService(BaseAgentService):
         self.status = "idle"
         return {"status": "success"}
 
-    def process_message_for_file(self, message: Message) -> AgentResponse:
+    async def process_message_for_file(self, message: Message) -> AgentResponse:
         """
         Concierge-specific implementation for processing file-based messages.
         This method can be customized to handle file content in a way specific to the concierge agent.
         """
         try:
             logger.info("Processing file-based message in ConciergeAgent")
-            logger.debug(f"Message: {message.message}")
-            logger.debug(f"Context length: {len(message.context)}")
+            logger.debug("Message", extra={"payload": message.message})
+            logger.debug("Context length: %d", len(message.context))
 
             # You could add specific file-handling logic here
             # For example, you might want to format the context differently
@@ -44,15 +45,21 @@ class ConciergeAgentService(BaseAgentService):
             )
             
             # Process the enhanced message
-            result, memory = self.agent.process_message(
-                enhanced_message.message,
-                enhanced_message.role,
-                enhanced_message.context,
-                enhanced_message.history or []
-            )
+            with track_token_usage() as usage:
+                result, memory = await self.agent.aprocess_message(
+                    enhanced_message.message,
+                    enhanced_message.role,
+                    enhanced_message.context,
+                    enhanced_message.history or []
+                )
             
-            return AgentResponse(status="completed", result=result, memory=memory)
+            return AgentResponse(
+                status="completed",
+                result=result,
+                memory=memory,
+                tokens_used=usage.total_tokens
+            )
             
         except Exception as e:
-            logger.error(f"Error in ConciergeAgent processing file message: {str(e)}", exc_info=True)
+            logger.error("Error in ConciergeAgent processing file message: %s", e, exc_info=True)
             return AgentResponse(status="error", error=str(e)) 
\ No newline at end of file
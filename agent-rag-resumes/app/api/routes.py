@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, File, UploadFile, Depends
+from fastapi import APIRouter, HTTPException, File, UploadFile, Depends, Query, Form
+from typing import Optional
 from core.schemas import Message, WorkRequest, AgentResponse, WorkRequestFile, WorkResult
+from core.work_scheduler import WorkQueueFullError
+from core.agent_routes import add_message_routes
+from core.uploads import UploadStore, UploadTooLargeError
 from app.services.agent_service import ResumeAgentService
-import shutil
-from pathlib import Path
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
 
@@ -19,6 +21,7 @@ app.add_middleware(
 
 router = APIRouter()
 agent_service = ResumeAgentService()
+upload_store = UploadStore.from_env()
 
 @router.post("/restart")
 async def restart_agent():
@@ -33,18 +36,7 @@ async def restart_agent():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/message", response_model=AgentResponse)
-async def process_message(message: Message):
-    """
-    Process a message for the agent.
-    
-    Takes a Message containing the role, context and history.
-    Returns an AgentResponse with status and optional result/error.
-    """
-    try:
-        return agent_service.process_message(message)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+add_message_routes(router, agent_service)
 
 @router.get("/status")
 async def get_status():
@@ -58,45 +50,75 @@ async def get_status():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/work-request", response_model=AgentResponse)
+@router.post("/work-request", response_model=WorkResult)
 async def process_work_request(work_request: WorkRequest):
     """
     Process an asynchronous work request for the agent.
     
     Takes a WorkRequest containing the task, context and history.
-    Returns an AgentResponse with status and optional result/error.
+    Returns a WorkResult with status and optional result/error.
+    Returns 429 if the agent's work queue is full.
     """
     try:
-        return agent_service.process_work_request(work_request)
+        return await agent_service.process_work_request(work_request)
+    except WorkQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/work-request-with-file", response_model=WorkResult)
 async def process_work_request_with_file(
-    work_request: WorkRequest,
-    file: UploadFile = File(...)
+    task: str = Form(...),
+    context: str = Form(...),
+    file: UploadFile = File(...),
+    document_id: Optional[str] = Form(None)
 ):
-    """Process work request with file upload"""
+    """
+    Process work request with file upload.
+    
+    The file is streamed to the upload directory; returns 413 if it exceeds UPLOAD_MAX_BYTES.
+    Uploads with the same document_id, such as a candidate id, are versions of one resume;
+    without it the resume is identified by its content.
+    """
     try:
-        # Create uploads directory if it doesn't exist
-        upload_dir = Path("uploads")
-        upload_dir.mkdir(exist_ok=True)
-        
-        # Save uploaded file
-        file_path = upload_dir / file.filename
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # Create WorkRequestFile
-        work_file = WorkRequestFile(
-            filename=file.filename,
-            content_type=file.content_type,
-            file_path=str(file_path)
-        )
+        # Stream the upload to disk
+        work_file = await upload_store.save(file)
+        work_file.document_id = document_id
         
         # Add file to work request
-        work_request.file = work_file
+        work_request = WorkRequest(
+            task=task,
+            context=context,
+            history=[],
+            file=work_file
+        )
         
         return await agent_service.process_work_request(work_request)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except WorkQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.get("/work-result/{work_id}", response_model=WorkResult)
+async def get_work_result(
+    work_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the work to change state")
+):
+    """
+    Get the result of an async work request.
+    
+    Takes a work_id and returns the WorkResult with status and optional result/error.
+    With wait > 0, a pending or in-progress request blocks until the work changes
+    state or the wait expires, so clients can long-poll instead of polling on an interval.
+    """
+    try:
+        result = await agent_service.wait_for_work_result(work_id, wait)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Work request not found")
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,26 +1,87 @@
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple, AsyncIterator
 from core.agent_base import BaseAgent
 from core.schemas import MessageHistory, WorkRequestFile
-from core.azure_openai_llm import AzureOpenAILLM
+from core.llm_factory import create_llm
+from core.llm_cache import llm_cache_config_from_env
+from app.core.config import settings
+from app.core.resume_index import ResumeIndex
+from app.core.ingestion import ResumeIngestor, content_hash
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger("evo_concierge")
+
+load_dotenv()
 
 class ResumeAgent(BaseAgent):
+
+    INTERNAL_CONTEXT = (
+        "You are the Evolve resume agent. You answer questions about candidates using "
+        "the resume excerpts provided in the context. Only rely on those excerpts, cite "
+        "the file they come from, and say so when they do not contain the answer."
+    )
+
     def __init__(self):
+        self.llm = create_llm(
+            model_config={
+                "deployment_name": os.getenv("AZURE_OPEN_AI_DEPLOYMENT_ID"),
+                "api_base": os.getenv("AZURE_OPENAI_ENDPOINT"),
+                "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
+                "model": os.getenv("AZURE_OPENAI_MODEL"),
+                "api_version": os.getenv("AZURE_API_VERSION"),
+                "embedding_deployment_name": os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_ID"),
+                "cache": llm_cache_config_from_env()
+            }
+        )
         super().__init__()
-        self.resume_index = None
+        self.resume_index: Optional[ResumeIndex] = None
+        self.ingestor: Optional[ResumeIngestor] = None
 
-    def process_message(
+    async def aprocess_message(
         self,
         message: str,
         role: str,
         context: str,
         history: List[MessageHistory]
     ) -> Tuple[str, List[MessageHistory]]:
-        # Resume-specific RAG processing implementation
-        new_message = MessageHistory(role=role, content=message)
-        response_message = f"Processing resume-related query: {message}"
-        agent_response = MessageHistory(role="assistant", content=response_message)
-        response_memory = history + [new_message, agent_response]
-        return response_message, response_memory
+        logger.info("Processing resume query from role: %s", role)
+        matches = await self.search_resumes(message)
+        chat_messages = self.build_chat_messages(
+            message, role, self._build_resume_context(context, matches), history
+        )
+
+        async def produce(llm) -> str:
+            response = await llm.achat(chat_messages)
+            return (response.message.content or "").strip()
+
+        result = await self.llm.execute_chat(chat_messages, produce)
+
+        response_memory = self.build_response_memory(message, role, history, result)
+        return result, response_memory
+
+    async def stream_message(
+        self,
+        message: str,
+        role: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> AsyncIterator[str]:
+        logger.info("Streaming resume query from role: %s", role)
+        matches = await self.search_resumes(message)
+        chat_messages = self.build_chat_messages(
+            message, role, self._build_resume_context(context, matches), history
+        )
+        response_stream = await self.llm.run_request(
+            lambda llm: llm.astream_chat(chat_messages), chat_messages, operation="stream"
+        )
+        deltas = []
+        async for chunk in response_stream:
+            if chunk.delta:
+                deltas.append(chunk.delta)
+                yield chunk.delta
+        self.llm.record_usage(chat_messages, "".join(deltas))
 
     async def process_work_request(
         self,
@@ -28,19 +89,64 @@ class ResumeAgent(BaseAgent):
         context: str,
         history: List[MessageHistory]
     ) -> Tuple[str, List[MessageHistory]]:
-        # Resume-specific task processing implementation
-        result = f"Processing resume task: {task}"
-        
-        # Create new history entries for the work request
-        task_message = MessageHistory(role="user", content=task)
-        response_message = MessageHistory(role="assistant", content=result)
-        updated_history = history + [task_message, response_message]
-        
-        return result, updated_history
+        return await self.aprocess_message(task, "user", context, history)
 
     def initialize_resume_index(self):
-        # Initialize RAG index implementation
-        pass
+        """Open the resume index at RESUME_INDEX_PATH"""
+        self.close()
+        self.resume_index = ResumeIndex(settings.RESUME_INDEX_PATH)
+        self.ingestor = ResumeIngestor(
+            self.resume_index,
+            self.llm,
+            chunk_size=settings.RESUME_CHUNK_SIZE,
+            chunk_overlap=settings.RESUME_CHUNK_OVERLAP
+        )
+        logger.info("Resume index ready: %s", self.resume_index.get_stats())
+
+    def close(self):
+        """Close the resume index, releasing its database connection and memmap"""
+        if self.resume_index is not None:
+            self.resume_index.close()
+            self.resume_index = None
+            self.ingestor = None
+
+    async def search_resumes(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Find the resume chunks most relevant to a query"""
+        if self.resume_index is None or len(self.resume_index) == 0:
+            return []
+
+        query_embedding = await self.llm.embed(query)
+        return await asyncio.to_thread(
+            self.resume_index.search,
+            query_embedding,
+            top_k or settings.RESUME_SEARCH_TOP_K
+        )
+
+    async def ingest_resume(
+        self,
+        doc_id: str,
+        filename: str,
+        text: str,
+        document_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Index a resume, skipping unchanged content and re-embedding only changed chunks
+
+        Returns:
+            The ingestion summary, see ResumeIngestor.ingest
+        """
+        if self.ingestor is None:
+            self.initialize_resume_index()
+        return await self.ingestor.ingest(doc_id, filename, text, document_hash)
+
+    def _build_resume_context(self, context: str, matches: List[Dict[str, Any]]) -> str:
+        if not matches:
+            return f"{context}\n\nNo resume excerpts matched this query."
+
+        excerpts = "\n\n".join(
+            f"[{i}] {match['filename']} (relevance {match['score']:.2f}):\n{match['text']}"
+            for i, match in enumerate(matches, start=1)
+        )
+        return f"{context}\n\nResume excerpts:\n{excerpts}"
 
     async def process_work_request_with_file(
         self,
@@ -49,13 +155,23 @@ class ResumeAgent(BaseAgent):
         history: List[MessageHistory],
         file: WorkRequestFile
     ) -> Tuple[str, List[MessageHistory]]:
-        """Process work request with resume file"""
-        # Read and process the uploaded resume file
-        with open(file.file_path, 'r') as f:
-            resume_content = f.read()
-            
-        # Add resume content to context
-        enhanced_context = f"{context}\n\nResume Content:\n{resume_content}"
-        
-        # Process using existing work request logic with enhanced context
-        return await self.process_work_request(task, enhanced_context, history)
\ No newline at end of file
+        """Index the uploaded resume, then answer the task against the index"""
+        def read_file() -> bytes:
+            with open(file.file_path, 'rb') as f:
+                return f.read()
+
+        data = await asyncio.to_thread(read_file)
+        document_hash = file.content_hash or content_hash(data)
+        # Different candidates' files often share a name, so the name cannot identify the resume
+        summary = await self.ingest_resume(
+            file.document_id or document_hash,
+            file.filename,
+            data.decode('utf-8', errors='replace'),
+            document_hash
+        )
+
+        if summary["status"] == "indexed":
+            enhanced_context = f"{context}\n\nResume indexed: {file.filename} (version {summary['version']})"
+        else:
+            enhanced_context = f"{context}\n\nResume already indexed: {file.filename}"
+        return await self.process_work_request(task, enhanced_context, history)
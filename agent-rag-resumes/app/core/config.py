@@ -11,6 +11,9 @@ class Settings(BaseSettings):
     
     # Resume-specific settings
     RESUME_INDEX_PATH: str = os.getenv("RESUME_INDEX_PATH", "data/resume_index")
+    RESUME_SEARCH_TOP_K: int = int(os.getenv("RESUME_SEARCH_TOP_K", 5))
+    RESUME_CHUNK_SIZE: int = int(os.getenv("RESUME_CHUNK_SIZE", 1000))
+    RESUME_CHUNK_OVERLAP: int = int(os.getenv("RESUME_CHUNK_OVERLAP", 200))
     
     class Config:
         case_sensitive = True
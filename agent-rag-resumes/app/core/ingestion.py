@@ -0,0 +1,102 @@
+from typing import Any, Dict, List, Optional
+from core.chunking import chunk_text
+from core.llm_base import BaseLLM
+from app.core.resume_index import ResumeIndex
+import asyncio
+import hashlib
+import logging
+
+logger = logging.getLogger("evo_concierge")
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest used to identify document and chunk content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResumeIngestor:
+    """Incremental ingestion of resumes into a ResumeIndex.
+
+    Documents whose content hash matches the indexed version are skipped. For
+    changed documents only chunks whose text is not already in the index are
+    embedded; unchanged chunks keep their stored embeddings and rows.
+    """
+
+    def __init__(
+        self,
+        index: ResumeIndex,
+        llm: BaseLLM,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200
+    ):
+        self.index = index
+        self.llm = llm
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    async def ingest(
+        self,
+        doc_id: str,
+        filename: str,
+        text: str,
+        document_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Bring the index up to date with a document's content
+
+        Args:
+            doc_id: Stable identifier of the document
+            filename: Name shown alongside retrieved chunks
+            text: Document text
+            document_hash: Hash of the uploaded file, computed from text if omitted
+
+        Returns:
+            Summary with a status of "unchanged", "duplicate" or "indexed"; indexed
+            documents also report their version and chunks added, kept, removed
+            and embedded. A duplicate's previous version, if any, is removed so
+            its stale chunks are no longer searched
+        """
+        document_hash = document_hash or content_hash(text.encode("utf-8"))
+
+        current = self.index.get_document(doc_id)
+        if current is not None and current["content_hash"] == document_hash:
+            logger.info("Resume %s is unchanged at version %s, skipping", filename, current["version"])
+            return {"status": "unchanged", "doc_id": doc_id, "version": current["version"]}
+
+        duplicate_of = self.index.find_document_by_hash(document_hash)
+        if duplicate_of is not None:
+            # The document's previous version is superseded by content already indexed elsewhere
+            removed = 0
+            if current is not None:
+                removed = await asyncio.to_thread(self.index.remove_document, doc_id)
+            if current is not None:
+                logger.info(
+                    "Resume %s has the same content as %s, skipping and retiring its previous version (%d chunks)",
+                    filename, duplicate_of, removed
+                )
+            else:
+                logger.info("Resume %s has the same content as %s, skipping", filename, duplicate_of)
+            return {"status": "duplicate", "doc_id": doc_id, "duplicate_of": duplicate_of, "removed": removed}
+
+        chunks = chunk_text(text, self.chunk_size, self.chunk_overlap)
+        chunk_hashes = [content_hash(chunk.encode("utf-8")) for chunk in chunks]
+        known = await asyncio.to_thread(self.index.get_chunk_embeddings, chunk_hashes)
+
+        to_embed: Dict[str, str] = {}
+        for chunk, chunk_hash in zip(chunks, chunk_hashes):
+            if chunk_hash not in known:
+                to_embed.setdefault(chunk_hash, chunk)
+        if to_embed:
+            embedded = await self.llm.embed_batch(list(to_embed.values()))
+            known.update(zip(to_embed.keys(), embedded))
+
+        embeddings: List[Any] = [known[chunk_hash] for chunk_hash in chunk_hashes]
+        summary = await asyncio.to_thread(
+            self.index.upsert_document,
+            doc_id, filename, document_hash, chunks, chunk_hashes, embeddings
+        )
+        summary.update(status="indexed", embedded=len(to_embed))
+        logger.info(
+            "Indexed resume %s version %d: %d added, %d kept, %d removed, %d embedded",
+            filename, summary["version"], summary["added"], summary["kept"], summary["removed"], summary["embedded"]
+        )
+        return summary
@@ -0,0 +1,516 @@
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger("evo_concierge")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    chunk_hash TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id);
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    chunks INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+class ResumeIndex:
+    """Persistent vector index of resume chunks.
+
+    Chunk embeddings are stored L2-normalized in a raw float32 matrix file that
+    is memory-mapped on load, so startup cost does not grow with the index size
+    and pages are only read when searched. A SQLite database next to it holds
+    the text and metadata of each matrix row, a record per document with its
+    content hash and version, and a manifest with the matrix generation, shape
+    and committed row count.
+
+    Updates are proportional to what changed: new chunk rows are appended to the
+    matrix, rows of removed chunks are deleted from the database, and unchanged
+    chunks keep their rows. The database changes and the new row count commit
+    in one transaction after the rows are written, so a crash mid-update leaves
+    the previous version readable. The matrix is rewritten only when removed
+    rows exceed compact_ratio of its rows.
+    """
+
+    DATABASE_FILE = "index.db"
+    LEGACY_METADATA_FILE = "metadata.json"
+
+    def __init__(self, index_path: str, compact_ratio: float = 0.5):
+        self.index_path = Path(index_path)
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._embeddings: Optional[np.ndarray] = None
+        self._live: np.ndarray = np.zeros(0, dtype=bool)
+        # Only appended to, or replaced whole on compaction, so readers can hold on to a snapshot
+        self._rows: List[Optional[Dict[str, Any]]] = []
+        self._hash_rows: Dict[str, int] = {}
+        self._doc_rows: Dict[str, List[int]] = {}
+        # Swapped as one reference so lock-free readers see a consistent version
+        self._view = (self._embeddings, self._live, self._rows, self._hash_rows)
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._dimension: Optional[int] = None
+        self._generation = 0
+        self.load()
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._dimension
+
+    def __len__(self) -> int:
+        return int(self._view[1].sum())
+
+    def load(self):
+        """Load the index from disk, memory-mapping the embedding matrix"""
+        database_path = self.index_path / self.DATABASE_FILE
+        legacy_path = self.index_path / self.LEGACY_METADATA_FILE
+        if not database_path.exists() and not legacy_path.exists():
+            logger.info("No resume index at %s, starting empty", self.index_path)
+            return
+
+        db = self._connect()
+        if legacy_path.exists():
+            self._migrate_legacy(db, legacy_path)
+
+        manifest = {key: json.loads(value) for key, value in db.execute("SELECT key, value FROM manifest")}
+        row_count = manifest.get("rows", 0)
+        rows: List[Optional[Dict[str, Any]]] = [None] * row_count
+        for row, doc_id, filename, chunk_index, chunk_hash, text in db.execute(
+            "SELECT row, doc_id, filename, chunk_index, chunk_hash, text FROM chunks ORDER BY row"
+        ):
+            rows[row] = {
+                "doc_id": doc_id,
+                "filename": filename,
+                "chunk_index": chunk_index,
+                "chunk_hash": chunk_hash,
+                "text": text,
+            }
+        self._documents = {
+            doc_id: {
+                "filename": filename,
+                "content_hash": document_hash,
+                "version": version,
+                "chunks": chunks,
+                "updated_at": updated_at,
+            }
+            for doc_id, filename, document_hash, version, chunks, updated_at in db.execute(
+                "SELECT doc_id, filename, content_hash, version, chunks, updated_at FROM documents"
+            )
+        }
+        self._set_rows(rows, manifest.get("generation", 0), manifest.get("dimension"))
+        logger.info("Loaded resume index with %d chunks from %s", len(self), self.index_path)
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document's record: filename, content_hash, version, chunks and updated_at"""
+        document = self._documents.get(doc_id)
+        return dict(document) if document else None
+
+    def find_document_by_hash(self, content_hash: str) -> Optional[str]:
+        """Get the id of the document whose current content has this hash"""
+        for doc_id, document in list(self._documents.items()):
+            if document["content_hash"] == content_hash:
+                return doc_id
+        return None
+
+    def get_chunk_embeddings(self, chunk_hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Get stored embeddings for any of the given chunk hashes already in the index"""
+        embeddings, _, _, hash_rows = self._view
+        found = {}
+        for chunk_hash in set(chunk_hashes):
+            row = hash_rows.get(chunk_hash)
+            # Rows appended after this snapshot are not in its matrix
+            if row is not None and embeddings is not None and row < len(embeddings):
+                found[chunk_hash] = np.asarray(embeddings[row])
+        return found
+
+    def upsert_document(
+        self,
+        doc_id: str,
+        filename: str,
+        content_hash: str,
+        texts: Sequence[str],
+        chunk_hashes: Sequence[str],
+        embeddings: Sequence[Sequence[float]]
+    ) -> Dict[str, Any]:
+        """Store a new version of a document's chunks
+
+        Chunks whose hash is already stored for the document keep their rows;
+        other chunks are appended and the document's stale chunks are removed.
+
+        Returns:
+            Summary with the document version and the number of chunks added,
+            kept and removed
+        """
+        if not len(texts) == len(chunk_hashes) == len(embeddings):
+            raise ValueError("texts, chunk_hashes and embeddings must have the same length")
+
+        with self._lock:
+            doc_rows = self._doc_rows.get(doc_id, [])
+            # A document may contain the same chunk more than once
+            existing: Dict[str, List[int]] = {}
+            for row in doc_rows:
+                existing.setdefault(self._rows[row]["chunk_hash"], []).append(row)
+
+            kept: Dict[int, Dict[str, Any]] = {}
+            added_chunks, added_vectors = [], []
+            for i, (text, chunk_hash, embedding) in enumerate(zip(texts, chunk_hashes, embeddings)):
+                chunk = {
+                    "doc_id": doc_id,
+                    "filename": filename,
+                    "chunk_index": i,
+                    "chunk_hash": chunk_hash,
+                    "text": text,
+                }
+                rows = existing.get(chunk_hash)
+                if rows:
+                    kept[rows.pop(0)] = chunk
+                else:
+                    added_chunks.append(chunk)
+                    added_vectors.append(embedding)
+            removed_rows = [row for row in doc_rows if row not in kept]
+
+            new_vectors = self._normalize(np.asarray(added_vectors, dtype=np.float32))
+            if new_vectors.size:
+                if self._dimension is not None and new_vectors.shape[1] != self._dimension:
+                    raise ValueError(
+                        f"Embedding dimension {new_vectors.shape[1]} does not match index dimension {self._dimension}"
+                    )
+
+            previous = self._documents.get(doc_id)
+            document = {
+                "filename": filename,
+                "content_hash": content_hash,
+                "version": previous["version"] + 1 if previous else 1,
+                "chunks": len(texts),
+                "updated_at": datetime.now().isoformat(),
+            }
+            self._commit(doc_id, document, kept, removed_rows, added_chunks, new_vectors)
+
+        return {
+            "doc_id": doc_id,
+            "version": document["version"],
+            "added": len(added_chunks),
+            "kept": len(kept),
+            "removed": len(removed_rows),
+        }
+
+    def remove_document(self, doc_id: str) -> int:
+        """Remove a document and its chunks
+
+        Returns:
+            The number of chunks removed
+        """
+        with self._lock:
+            if doc_id not in self._documents:
+                return 0
+            removed_rows = list(self._doc_rows.get(doc_id, []))
+            self._commit(doc_id, None, {}, removed_rows, [], None)
+        return len(removed_rows)
+
+    def search(self, query_embedding: Sequence[float], top_k: int = 5) -> List[Dict[str, Any]]:
+        """Find the chunks most similar to the query embedding
+
+        Returns:
+            Up to top_k chunk metadata dicts with an added "score" (cosine
+            similarity), best match first
+        """
+        # Snapshot so a concurrent update cannot pair new metadata with old rows
+        embeddings, live, rows, _ = self._view
+        live_count = int(live.sum())
+        if embeddings is None or live_count == 0 or top_k <= 0:
+            return []
+
+        query = self._normalize(np.asarray(query_embedding, dtype=np.float32))
+        scores = np.where(live, embeddings @ query, -np.inf)
+        top_k = min(top_k, live_count)
+        if top_k < len(scores):
+            candidates = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        ranked = candidates[np.argsort(-scores[candidates])]
+
+        return [{**rows[i], "score": float(scores[i])} for i in ranked]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size statistics"""
+        live = self._view[1]
+        return {
+            "documents": len(self._documents),
+            "chunks": int(live.sum()),
+            "rows": len(live),
+            "dimension": self._dimension,
+        }
+
+    def close(self):
+        """Close the index database and release the embedding matrix
+
+        The memmap is unmapped once searches still holding it finish.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._embeddings = None
+            self._view = (None, np.zeros(0, dtype=bool), [], {})
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.index_path.mkdir(parents=True, exist_ok=True)
+            # Only used under self._lock, from whichever worker thread holds it
+            self._db = sqlite3.connect(self.index_path / self.DATABASE_FILE, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _embeddings_path(self, generation: int) -> Path:
+        return self.index_path / f"embeddings-{generation:08d}.f32"
+
+    def _commit(
+        self,
+        doc_id: str,
+        document: Optional[Dict[str, Any]],
+        kept: Dict[int, Dict[str, Any]],
+        removed_rows: List[int],
+        added_chunks: List[Dict[str, Any]],
+        new_vectors: Optional[np.ndarray]
+    ):
+        """Append the new rows to the matrix, then commit the changed rows and the manifest"""
+        db = self._connect()
+        dimension = self._dimension
+        if dimension is None and new_vectors is not None and new_vectors.size:
+            dimension = int(new_vectors.shape[1])
+
+        row_count = len(self._rows)
+        if new_vectors is not None and new_vectors.size:
+            path = self._embeddings_path(self._generation)
+            with path.open("r+b" if path.exists() else "wb") as f:
+                # Anything past the committed rows is left over from an interrupted update
+                f.seek(row_count * dimension * 4)
+                f.write(new_vectors.astype(np.float32).tobytes())
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+
+        new_rows = list(range(row_count, row_count + len(added_chunks)))
+        with db:
+            db.executemany("DELETE FROM chunks WHERE row = ?", [(row,) for row in removed_rows])
+            db.executemany(
+                "UPDATE chunks SET filename = ?, chunk_index = ? WHERE row = ?",
+                [(chunk["filename"], chunk["chunk_index"], row) for row, chunk in kept.items()]
+            )
+            db.executemany(
+                "INSERT INTO chunks (row, doc_id, filename, chunk_index, chunk_hash, text) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (row, chunk["doc_id"], chunk["filename"], chunk["chunk_index"], chunk["chunk_hash"], chunk["text"])
+                    for row, chunk in zip(new_rows, added_chunks)
+                ]
+            )
+            if document is None:
+                db.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            else:
+                db.execute(
+                    "INSERT OR REPLACE INTO documents "
+                    "(doc_id, filename, content_hash, version, chunks, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        doc_id, document["filename"], document["content_hash"],
+                        document["version"], document["chunks"], document["updated_at"]
+                    )
+                )
+            self._write_manifest(db, self._generation, dimension, row_count + len(added_chunks))
+
+        # Publish in memory: rows are appended, and kept rows swap in their updated dict
+        for row, chunk in kept.items():
+            self._rows[row] = chunk
+        self._rows.extend(added_chunks)
+        live = np.concatenate([self._live, np.ones(len(added_chunks), dtype=bool)])
+        live[removed_rows] = False
+        for row in removed_rows:
+            chunk_hash = self._rows[row]["chunk_hash"]
+            if self._hash_rows.get(chunk_hash) == row:
+                del self._hash_rows[chunk_hash]
+        for row, chunk in zip(new_rows, added_chunks):
+            self._hash_rows[chunk["chunk_hash"]] = row
+        if document is None:
+            self._documents.pop(doc_id, None)
+            self._doc_rows.pop(doc_id, None)
+        else:
+            self._documents[doc_id] = document
+            self._doc_rows[doc_id] = sorted(kept) + new_rows
+        self._dimension = dimension
+        self._live = live
+        self._embeddings = self._open_embeddings(self._generation, len(self._rows), dimension)
+        self._view = (self._embeddings, self._live, self._rows, self._hash_rows)
+
+        dead = len(live) - int(live.sum())
+        if dead and dead > self.compact_ratio * len(live):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the live rows into a new matrix file and renumber them"""
+        db = self._connect()
+        generation = self._generation + 1
+        live_rows = np.flatnonzero(self._live)
+        with self._embeddings_path(generation).open("wb") as f:
+            if live_rows.size:
+                f.write(np.asarray(self._embeddings[live_rows], dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        with db:
+            # Ascending order moves each row to a lower number that is already free
+            db.executemany(
+                "UPDATE chunks SET row = ? WHERE row = ?",
+                [(new_row, int(row)) for new_row, row in enumerate(live_rows) if new_row != row]
+            )
+            self._write_manifest(db, generation, self._dimension, len(live_rows))
+
+        dead = len(self._live) - len(live_rows)
+        previous_generation = self._generation
+        self._set_rows([self._rows[row] for row in live_rows], generation, self._dimension)
+        self._embeddings_path(previous_generation).unlink(missing_ok=True)
+        logger.info("Compacted resume index, dropped %d removed chunks", dead)
+
+    @staticmethod
+    def _write_manifest(db: sqlite3.Connection, generation: int, dimension: Optional[int], rows: int):
+        db.executemany(
+            "INSERT OR REPLACE INTO manifest (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in
+             (("generation", generation), ("dimension", dimension), ("rows", rows))]
+        )
+
+    def _open_embeddings(self, generation: int, rows: int, dimension: Optional[int]) -> Optional[np.ndarray]:
+        if not rows:
+            return None
+        return np.memmap(self._embeddings_path(generation), dtype=np.float32, mode="r", shape=(rows, dimension))
+
+    def _set_rows(self, rows: List[Optional[Dict[str, Any]]], generation: int, dimension: Optional[int]):
+        """Replace the in-memory rows, for loading and compaction"""
+        self._rows = rows
+        self._live = np.array([chunk is not None for chunk in rows], dtype=bool)
+        self._hash_rows = {}
+        self._doc_rows = {}
+        for row, chunk in enumerate(rows):
+            if chunk is not None:
+                self._hash_rows[chunk["chunk_hash"]] = row
+                self._doc_rows.setdefault(chunk["doc_id"], []).append(row)
+        self._generation = generation
+        self._dimension = dimension
+        self._embeddings = self._open_embeddings(generation, len(rows), dimension)
+        self._view = (self._embeddings, self._live, self._rows, self._hash_rows)
+
+    def _migrate_legacy(self, db: sqlite3.Connection, metadata_path: Path):
+        """Move an index whose rows were kept in metadata.json into the database
+
+        Raises:
+            ValueError: If the metadata is in no known layout, rather than loading an empty index
+        """
+        with metadata_path.open("r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        legacy_matrix: Optional[Path] = None
+        if "rows" in metadata:
+            rows = metadata["rows"]
+        elif "chunks" in metadata:
+            legacy_matrix = self._convert_npy_layout(metadata)
+            rows = metadata["rows"]
+        else:
+            raise ValueError(f"Unrecognized resume index format in {metadata_path}")
+
+        with db:
+            db.execute("DELETE FROM chunks")
+            db.execute("DELETE FROM documents")
+            db.executemany(
+                "INSERT INTO chunks (row, doc_id, filename, chunk_index, chunk_hash, text) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (row, chunk["doc_id"], chunk["filename"], chunk["chunk_index"], chunk["chunk_hash"], chunk["text"])
+                    for row, chunk in enumerate(rows) if chunk is not None
+                ]
+            )
+            db.executemany(
+                "INSERT INTO documents (doc_id, filename, content_hash, version, chunks, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        doc_id, document["filename"], document["content_hash"],
+                        document["version"], document["chunks"], document["updated_at"]
+                    )
+                    for doc_id, document in metadata.get("documents", {}).items()
+                ]
+            )
+            self._write_manifest(db, metadata.get("generation", 0), metadata.get("dimension"), len(rows))
+        metadata_path.unlink()
+        if legacy_matrix is not None:
+            legacy_matrix.unlink(missing_ok=True)
+        logger.info("Migrated resume index metadata at %s to %s", self.index_path, self.DATABASE_FILE)
+
+    def _convert_npy_layout(self, metadata: Dict[str, Any]) -> Optional[Path]:
+        """Convert metadata of the first index layout, a .npy matrix without chunk hashes or versions
+
+        The matrix is copied to the raw float32 file of its generation and
+        metadata is filled in with "rows", "documents" and "dimension". Documents
+        get an empty content hash, so their next upload is ingested again, but
+        chunks keep their embeddings since their hashes are computed here.
+
+        Returns:
+            The .npy file, to delete once the migration is committed
+        """
+        chunks = metadata["chunks"]
+        generation = metadata.get("generation", 0)
+        legacy_matrix = self.index_path / metadata["embeddings_file"] if metadata.get("embeddings_file") else None
+        dimension = None
+        if chunks:
+            embeddings = np.load(legacy_matrix, mmap_mode="r")
+            if embeddings.shape[0] != len(chunks):
+                raise ValueError(
+                    f"Resume index at {self.index_path} is inconsistent: "
+                    f"{embeddings.shape[0]} embeddings for {len(chunks)} chunks"
+                )
+            dimension = int(embeddings.shape[1])
+            with self._embeddings_path(generation).open("wb") as f:
+                f.write(np.asarray(embeddings, dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        # Same hash as the ingestion's content_hash of the chunk text
+        rows = [
+            {**chunk, "chunk_hash": hashlib.sha256(chunk["text"].encode("utf-8")).hexdigest()}
+            for chunk in chunks
+        ]
+        documents: Dict[str, Dict[str, Any]] = {}
+        for chunk in rows:
+            document = documents.setdefault(chunk["doc_id"], {
+                "filename": chunk["filename"],
+                "content_hash": "",
+                "version": 1,
+                "chunks": 0,
+                "updated_at": datetime.now().isoformat(),
+            })
+            document["chunks"] += 1
+        metadata.update(rows=rows, documents=documents, dimension=dimension, generation=generation)
+        return legacy_matrix
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
@@ -1,6 +1,17 @@
 from fastapi import FastAPI
-from app.api.routes import router
+from app.api.routes import router, upload_store
+from core.uploads import UploadSizeLimitMiddleware
+from core.logging_config import setup_logging
+from core.metrics import setup_metrics
+from core.tracing import setup_tracing
+import os
+
+setup_logging("agent-rag-resumes", os.getenv("DEBUG", "false").lower() == "true")
 
 app = FastAPI(title="Resume RAG Agent")
+setup_metrics(app, "agent-rag-resumes")
+setup_tracing(app, "agent-rag-resumes")
 
+# Refuse oversize uploads before their body is received
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=upload_store.max_bytes)
 app.include_router(router, prefix="/agent") 
\ No newline at end of file
@@ -11,6 +11,9 @@ class ResumeAgentService(BaseAgentService):
             self.agent.initialize_resume_index()
 
     def restart(self):
+        # The new agent opens its own index, the old one's connection and memmap are released
+        if isinstance(self.agent, ResumeAgent):
+            self.agent.close()
         self.agent = ResumeAgent()
         self.status = "idle"
         self.initialize_agent()
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from core.schemas import Message, WorkRequest, AgentResponse, WorkResult
+from core.work_scheduler import WorkQueueFullError
+from core.agent_routes import add_message_routes
 from app.services.agent_service import AgentWorkerService
 
 router = APIRouter()
@@ -18,18 +20,7 @@ async def restart_agent():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/message", response_model=AgentResponse)
-async def process_message(message: Message):
-    """
-    Process a message for the agent.
-    
-    Takes a Message containing the role, context and history.
-    Returns an AgentResponse with status and optional result/error.
-    """
-    try:
-        return agent_service.process_message(message)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+add_message_routes(router, agent_service)
 
 @router.get("/status")
 async def get_status():
@@ -58,23 +49,33 @@ async def process_work_request(
     
     Takes a WorkRequest containing the task, context and history.
     Returns a WorkResult with status and optional result/error.
+    Returns 429 if the agent's work queue is full.
     """
     try:
         return await agent_service.process_work_request(work_request)
+    except WorkQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/work-result/{work_id}", response_model=WorkResult)
-async def get_work_result(work_id: str):
+async def get_work_result(
+    work_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the work to change state")
+):
     """
     Get the result of an async work request.
     
     Takes a work_id and returns the WorkResult with status and optional result/error.
+    With wait > 0, a pending or in-progress request blocks until the work changes
+    state or the wait expires, so clients can long-poll instead of polling on an interval.
     """
     try:
-        result = agent_service.get_work_result(work_id)
+        result = await agent_service.wait_for_work_result(work_id, wait)
         if result is None:
             raise HTTPException(status_code=404, detail="Work request not found")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
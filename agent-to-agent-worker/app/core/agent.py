@@ -1,25 +1,29 @@
-from typing import List, Tuple
+from typing import List, Tuple, AsyncIterator
 from core.agent_base import BaseAgent
 from core.schemas import MessageHistory
-from core.schemas import WorkAgentToAgent
+from core.schemas import WorkAgentToAgent, WorkAgentToAgentPlan
 from core.schemas import WorkRequestFile
 from core.client.http import HttpAgentClient
-from core.schemas import Message
-from llama_index.agent.openai import OpenAIAgent
-from core.azure_openai_llm import AzureOpenAILLM
+from core.client.registry import get_agent_registry
+from core.llm_factory import create_llm
+from core.agent_pool import OpenAIAgentPool
+from core.llm_cache import llm_cache_config_from_env
+from core.tracing import start_span
 from llama_index.core.prompts.base import PromptTemplate
 import os
 from llama_index.core import Settings
 from llama_index.core.base.llms.types import ChatMessage
 from core.schemas import TargetAgentEnum
 from dotenv import load_dotenv
+import aiohttp
 import asyncio
+import logging
+
+logger = logging.getLogger("evo_concierge")
 
 load_dotenv()
 
 class AgentWorker(BaseAgent):
-    
-    agent = None
 
     INTERNAL_CONTEXT = (
         "You are an AI agent worker specialized in communicating with other AI agents. "
@@ -30,12 +34,16 @@ class AgentWorker(BaseAgent):
 
     WORK_AGENT_TO_AGENT_PROMPT = (
         "You are an AI agent worker specialized in communicating with other AI agents. "
-        "You will be given a structure to populate that will give us the initial message "
-        "and context for a conversation with another agent. "
-        "Your job is to construct the initial message to send to the other agent. "
-        "Make sure the initial message represents the task you are trying to complete. Make it actionable."
-        "You will figure out the maximum number of turns this conversation should have, try the least number of turns possible. "
-        "You will also figure out which agent you are going to send the message to. "
+        "You will be given a structure to populate that will give us the conversations to have "
+        "with other agents to complete a task. "
+        "Split the task into independent parts that can be worked on at the same time, one conversation per part. "
+        "Use a single conversation when the task has no independent parts. "
+        "For each conversation, construct the initial message to send to the other agent. "
+        "Make sure the initial message represents the part of the task it covers. Make it actionable."
+        "You will figure out the maximum number of turns each conversation should have, try the least number of turns possible. "
+        "You will also figure out which agent each conversation is with: "
+        "AGENT_CONCIERGE answers general questions about the Evolve system, "
+        "AGENT_RAG_RESUMES answers questions about candidates and their resumes. "
         "Take the task below and user that get the information you need to populate the structure. "
         "----------------------------------\n "
         "{task}"
@@ -45,8 +53,8 @@ class AgentWorker(BaseAgent):
     WORK_AGENT_TO_AGENT_PROMPT_TEMPLATE = PromptTemplate(WORK_AGENT_TO_AGENT_PROMPT)
 
     WORK_AGENT_NEXT_MESSAGE_PROMPT = (
-        "Pretend you are a user of the concierge agent. "
-        "You will be given the chat history and the last message sent to you by the concierge agent. "
+        "Pretend you are a user of the other agent. "
+        "You will be given the chat history and the last message sent to you by the other agent. "
         "Dont say anything inappropriate."
         "Use that information to predict the next message. "
         "Return the next message only, nothing else. "
@@ -69,16 +77,20 @@ class AgentWorker(BaseAgent):
     WORK_AGENT_CONVERSATION_COMPLETE_PROMPT_TEMPLATE = PromptTemplate(WORK_AGENT_CONVERSATION_COMPLETE_PROMPT)
 
     def __init__(self):
-        self.llm = AzureOpenAILLM(
+        self.max_concurrent_conversations = int(os.getenv("AGENT_WORKER_MAX_CONCURRENT_CONVERSATIONS", 4))
+        self.llm = create_llm(
             model_config={
                 "deployment_name": os.getenv("AZURE_OPEN_AI_DEPLOYMENT_ID"),
                 "api_base": os.getenv("AZURE_OPENAI_ENDPOINT"),
                 "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
                 "model": os.getenv("AZURE_OPENAI_MODEL"),
                 "api_version": os.getenv("AZURE_API_VERSION"),
+                "embedding_deployment_name": os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_ID"),
+                "cache": llm_cache_config_from_env(),
                 "temperature": .5
             }
         )
+        self.agent_pool = OpenAIAgentPool(self.llm.llm)
         super().__init__()
 
     def process_message(
@@ -88,28 +100,61 @@ class AgentWorker(BaseAgent):
         context: str,
         history: List[MessageHistory]
     ) -> Tuple[str, List[MessageHistory]]:
-        sys_prompt = self.AGENT_SYS_PROMPT_TEMPLATE.format(
-            agent_internal_context=self.INTERNAL_CONTEXT,
-            agent_external_context=context
-        )
+        chat_messages = self.build_chat_messages(message, role, context, history)
+        with self.agent_pool.checkout(
+            self.system_prompt_template,
+            chat_messages[0].content,
+            chat_messages[1:-1]
+        ) as agent:
+            response = agent.chat(message)
+        self.llm.record_usage(chat_messages, response.response)
 
-        chat_history = self.history_to_chat_messages(history)
+        # Return both response and updated history
+        response_memory = self.build_response_memory(message, role, history, response.response)
+        return response.response, response_memory
 
-        self.agent = OpenAIAgent.from_tools(    
-            llm=self.llm.llm,
-            system_prompt=sys_prompt, 
-            chat_history=chat_history
-        )
+    async def aprocess_message(
+        self,
+        message: str,
+        role: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> Tuple[str, List[MessageHistory]]:
+        # System prompt and history packed into the token budget
+        chat_messages = self.build_chat_messages(message, role, context, history)
 
-        response = self.agent.chat(message)
+        async def produce(llm) -> str:
+            with self.agent_pool.checkout(
+                self.system_prompt_template,
+                chat_messages[0].content,
+                chat_messages[1:-1],
+                llm
+            ) as agent:
+                response = await agent.achat(message)
+            return response.response
 
-        # Create new message history entries
-        new_message = MessageHistory(role=role, content=response.response)
-        agent_response = MessageHistory(role="assistant", content=response.response)
-        
-        # Return both response and updated history
-        response_memory = history + [new_message, agent_response]
-        return response.response, response_memory
+        result = await self.llm.execute_chat(chat_messages, produce)
+
+        response_memory = self.build_response_memory(message, role, history, result)
+        return result, response_memory
+
+    async def stream_message(
+        self,
+        message: str,
+        role: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> AsyncIterator[str]:
+        chat_messages = self.build_chat_messages(message, role, context, history)
+        response_stream = await self.llm.run_request(
+            lambda llm: llm.astream_chat(chat_messages), chat_messages, operation="stream"
+        )
+        deltas = []
+        async for chunk in response_stream:
+            if chunk.delta:
+                deltas.append(chunk.delta)
+                yield chunk.delta
+        self.llm.record_usage(chat_messages, "".join(deltas))
 
     async def process_work_request(
         self,
@@ -117,101 +162,162 @@ class AgentWorker(BaseAgent):
         context: str,
         history: List[MessageHistory]
     ) -> Tuple[str, List[MessageHistory]]:
-        sys_prompt = self.AGENT_SYS_PROMPT_TEMPLATE.format(
-            agent_internal_context=self.INTERNAL_CONTEXT,
-            agent_external_context=context
+        # Plan the task into independent conversations and run them concurrently
+        with start_span("worker.plan"):
+            plan = await self._get_work_agent_to_agent_plan(task)
+        transcripts = await self._run_conversations(plan.conversations)
+
+        # synthesize the final message from all transcripts
+        sections = [
+            f"Conversation with {conversation.target_agent_id.value}:\n"
+            + self._format_transcript(self.WORK_AGENT_CONVERSATION_COMPLETE_PROMPT, transcript)
+            for conversation, transcript in zip(plan.conversations, transcripts)
+            if transcript
+        ]
+        history_str, _ = self.pack_prompt(
+            self.WORK_AGENT_CONVERSATION_COMPLETE_PROMPT, "\n\n".join(sections), []
         )
+        prompt = self.WORK_AGENT_CONVERSATION_COMPLETE_PROMPT_TEMPLATE.format(chat_history=history_str)
+        with start_span("worker.synthesis"):
+            final_message_content = await self.llm.generate(prompt=prompt)
 
-        if history is None:
-            chat_history = []    
-        else:
-            chat_history = self.history_to_chat_messages(history)
-
-        # Get the work agent to agent configuration
-        work_agent_to_agent = self._get_work_agent_to_agent_config(task)
-        result, updated_history = await self._work_agent_to_agent(work_agent_to_agent)
-        return result, updated_history
+        merged_history = [entry for transcript in transcripts for entry in transcript]
+        return final_message_content, merged_history
     
-    def _get_work_agent_to_agent_config(self, task: str) -> WorkAgentToAgent:
-        sllm = self.llm.llm.as_structured_llm(output_cls=WorkAgentToAgent)
+    async def _get_work_agent_to_agent_plan(self, task: str) -> WorkAgentToAgentPlan:
         prompt = self.WORK_AGENT_TO_AGENT_PROMPT_TEMPLATE.format(task=task)
         message = ChatMessage.from_str(prompt)
-        response = sllm.chat([message])
 
-        return response.raw
-    
-    async def _work_agent_to_agent(self, work_agent_to_agent: WorkAgentToAgent) -> tuple[str, List[MessageHistory]]:
+        async def request_plan() -> WorkAgentToAgentPlan:
+            response = await self.llm.run_request(
+                lambda llm: llm.as_structured_llm(output_cls=WorkAgentToAgentPlan).achat([message]),
+                [message],
+                operation="structured"
+            )
+            self.llm.record_usage([message], response.message.content or "")
+            return response.raw
+
+        # Identical tasks arriving together share one planning call
+        return await self.llm.coalesce(
+            [message], {"output_cls": WorkAgentToAgentPlan.__name__}, request_plan
+        )
 
-        number_of_turns = work_agent_to_agent.max_turns
+    async def _run_conversations(self, conversations: List[WorkAgentToAgent]) -> List[List[MessageHistory]]:
+        """Run conversations concurrently, at most max_concurrent_conversations at a time
+
+        Returns:
+            The transcript of each conversation, in plan order; empty for failed ones
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_conversations)
+
+        async def run(conversation: WorkAgentToAgent) -> List[MessageHistory]:
+            async with semaphore:
+                with start_span("worker.conversation", target=conversation.target_agent_id.value):
+                    return await self._work_agent_to_agent(conversation)
+
+        results = await asyncio.gather(*(run(c) for c in conversations), return_exceptions=True)
+
+        transcripts = []
+        for conversation, result in zip(conversations, results):
+            if isinstance(result, Exception):
+                logger.error("Conversation with %s failed: %s", conversation.target_agent_id.value, result)
+                transcripts.append([])
+            else:
+                transcripts.append(result)
+        if conversations and not any(transcripts):
+            raise RuntimeError("All agent conversations failed")
+        return transcripts
+
+    async def _work_agent_to_agent(self, work_agent_to_agent: WorkAgentToAgent) -> List[MessageHistory]:
+        target_agent_id = work_agent_to_agent.target_agent_id
+        registry = get_agent_registry()
+        if not registry.endpoints(target_agent_id):
+            raise ValueError(
+                f"Agent {target_agent_id.value} is not supported, set {target_agent_id.value}_BASE_URLS"
+            )
+
+        # A replica that cannot open a session is marked failed, try the next least loaded one
+        tried = set()
+        last_error = None
+        for _ in range(len(registry.endpoints(target_agent_id))):
+            try:
+                async with registry.acquire(target_agent_id, exclude=tried) as client:
+                    tried.add(client.base_url)
+                    # The target agent keeps the transcript in a session, so each turn only sends the new message
+                    session = await client.create_session(
+                        context=work_agent_to_agent.initial_context,
+                        history=work_agent_to_agent.initial_message.history or []
+                    )
+                    return await self._converse(client, session.session_id, work_agent_to_agent)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("Could not start conversation with %s: %s", target_agent_id.value, e)
+                last_error = e
+        raise last_error
+
+    async def _converse(
+        self,
+        client: HttpAgentClient,
+        session_id: str,
+        work_agent_to_agent: WorkAgentToAgent
+    ) -> List[MessageHistory]:
 
-        #figure out the agent to send the message to, and if its not the concierge,
-        # throw an error saying that the agent is not supported
-        if work_agent_to_agent.target_agent_id != TargetAgentEnum.AGENT_CONCIERGE:
-            raise ValueError(f"Agent {work_agent_to_agent.target_agent_id} is not supported")
-        
-        agent_concierge_base_url = os.getenv("AGENT_CONCIERGE_BASE_URL")
         number_of_turns = work_agent_to_agent.max_turns
+        target_agent = work_agent_to_agent.target_agent_id.value
 
-        target_agent_chat_history = []
-
-        #create new Message for the concierge
-        message = Message(
-            message=work_agent_to_agent.initial_message.message,
-            role="user",
-            context=work_agent_to_agent.initial_context,
-            history=target_agent_chat_history
-        )
+        target_agent_chat_history = list(work_agent_to_agent.initial_message.history or [])
+        next_message = work_agent_to_agent.initial_message.message
 
-        while number_of_turns > 0:
-            async with HttpAgentClient(agent_concierge_base_url) as client:
-                
+        turn = 0
+        try:
+            while number_of_turns > 0:
+                turn += 1
                 try:        
-                    # Send message and get response
-                    print(f"Sending message to concierge: {message.message}")
-                    response = await client.process_message(message)
-
-                    if response.status == "completed":
-                        target_agent_chat_history = response.memory
-                    else:
-                        print(f"Error communicating with agent: {response.error}")
-                        break
-
-                    print(f"Received message from concierge: {response.result}")
+                    with start_span("worker.turn", target=target_agent, turn=turn):
+                        # Send message and get response
+                        logger.debug("Sending message to %s", target_agent, extra={"payload": next_message})
+                        with start_span("worker.round_trip", target=target_agent, endpoint=client.base_url):
+                            response = await client.send_session_message(session_id, next_message)
 
-                    # Get the next message
-                    messages = self.history_to_chat_messages(target_agent_chat_history)
-                    history_str = "\n".join([f"{m.role}: {m.content}" for m in messages])
-                    prompt = self.WORK_AGENT_NEXT_MESSAGE_PROMPT_TEMPLATE.format(chat_history=history_str)
+                        if response.status == "completed":
+                            target_agent_chat_history += response.memory
+                        else:
+                            logger.error("Error communicating with %s: %s", target_agent, response.error)
+                            break
 
-                    # convert prompt to ChatMessage
-                    prompt = ChatMessage.from_str(prompt)
-                    next_message = self.llm.llm.chat([prompt])
+                        logger.debug("Received message from %s", target_agent, extra={"payload": response.result})
 
-                    #next_message = await self.llm.generate(prompt=prompt, temperature=.5)
+                        # Get the next message
+                        history_str = self._format_transcript(
+                            self.WORK_AGENT_NEXT_MESSAGE_PROMPT, target_agent_chat_history
+                        )
+                        prompt = self.WORK_AGENT_NEXT_MESSAGE_PROMPT_TEMPLATE.format(chat_history=history_str)
 
-                    message.message = next_message.message.content
-                    message.history = response.memory
+                        next_message = await self.llm.generate(prompt=prompt)
 
-                    if message.message == "":
-                        # if the message is empty, agent has exhusted what it can do
-                        break
+                        if next_message == "":
+                            # if the message is empty, agent has exhusted what it can do
+                            break
 
                 except Exception as e:
-                    print(f"Error communicating with agent: {str(e)}")
+                    logger.error("Error communicating with %s: %s", target_agent, e)
+                    if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)):
+                        get_agent_registry().record_failure(client.base_url, e)
                     break
 
                 number_of_turns -= 1
-
-        # synthesize the final message
-        messages = self.history_to_chat_messages(target_agent_chat_history)
-        history_str = "\n".join([f"{m.role}: {m.content}" for m in messages])
-        prompt = self.WORK_AGENT_CONVERSATION_COMPLETE_PROMPT_TEMPLATE.format(chat_history=history_str)
-        prompt = ChatMessage.from_str(prompt)
-        final_message = self.llm.llm.chat([prompt])
-
-        final_message_content = final_message.message.content
-
-        return final_message_content, target_agent_chat_history
+        finally:
+            try:
+                await client.delete_session(session_id)
+            except Exception as e:
+                logger.warning("Could not delete %s session %s: %s", target_agent, session_id, e)
+
+        return target_agent_chat_history
+
+    def _format_transcript(self, prompt: str, history: List[MessageHistory]) -> str:
+        """Format the most recent conversation turns that fit the token budget"""
+        _, recent_history = self.pack_prompt(prompt, "", history)
+        messages = self.history_to_chat_messages(recent_history)
+        return "\n".join([f"{m.role}: {m.content}" for m in messages])
 
     async def process_work_request_with_file(
         self,
@@ -1,8 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api.routes import router
+from core.client.pool import get_agent_client_pool
+from core.client.registry import get_agent_registry
+from core.logging_config import setup_logging
+from core.metrics import setup_metrics
+from core.tracing import setup_tracing
+import os
+
+setup_logging("agent-to-agent-worker", os.getenv("DEBUG", "false").lower() == "true")
 
 app = FastAPI(title="Agent-to-Agent Worker")
+setup_metrics(app, "agent-to-agent-worker")
+setup_tracing(app, "agent-to-agent-worker")
 
 # Add CORS middleware
 app.add_middleware(
@@ -13,4 +23,10 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-app.include_router(router, prefix="/agent") 
\ No newline at end of file
+app.include_router(router, prefix="/agent")
+
+@app.on_event("shutdown")
+async def close_agent_clients():
+    """Stop agent health checks and close pooled connections to other agents"""
+    await get_agent_registry().close()
+    await get_agent_client_pool().close()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+from .report import compare_results, format_comparison, load_results
+import argparse
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark results files")
+    parser.add_argument("baseline", help="Results file of the reference run")
+    parser.add_argument("current", help="Results file of the run to check")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1,
+        help="Relative change counted as a regression (default: 0.1)"
+    )
+    args = parser.parse_args()
+
+    rows = compare_results(load_results(args.baseline), load_results(args.current), args.tolerance)
+    print(format_comparison(rows))
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
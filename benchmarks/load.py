@@ -0,0 +1,202 @@
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from core.client import HttpAgentClient
+from core.schemas import Message, WorkRequest, WorkStatus
+import asyncio
+import io
+import time
+
+# An operation makes one scenario request; it may return its time to first byte in seconds
+Operation = Callable[[Dict[str, HttpAgentClient], int], Awaitable[Optional[float]]]
+
+
+class ScenarioFailed(Exception):
+    """Raised when an agent answers a scenario request with a failed status"""
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """The q-th percentile (0-100) of sorted values, interpolating between ranks"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50, p95, p99, mean and max of latencies in seconds, reported in milliseconds"""
+    values = sorted(values)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "p50": ms(percentile(values, 50)),
+        "p95": ms(percentile(values, 95)),
+        "p99": ms(percentile(values, 99)),
+        "mean": ms(sum(values) / len(values) if values else None),
+        "max": ms(values[-1] if values else None),
+    }
+
+
+class ScenarioResult:
+    """Latencies and errors of the requests made for one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.first_byte: List[float] = []
+        self.errors: Counter = Counter()
+        self.elapsed = 0.0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    def summary(self) -> Dict[str, Any]:
+        errors = sum(self.errors.values())
+        summary = {
+            "requests": self.requests,
+            "errors": errors,
+            "error_rate": round(errors / self.requests, 4) if self.requests else 0.0,
+            "throughput_rps": round(len(self.latencies) / self.elapsed, 2) if self.elapsed else 0.0,
+            "duration_s": round(self.elapsed, 2),
+            "latency_ms": latency_summary(self.latencies),
+        }
+        if self.first_byte:
+            summary["first_byte_ms"] = latency_summary(self.first_byte)
+        if self.errors:
+            summary["error_types"] = dict(self.errors.most_common(5))
+        return summary
+
+
+async def run_load(
+    name: str,
+    operation: Operation,
+    clients: Dict[str, HttpAgentClient],
+    concurrency: int,
+    duration: Optional[float] = None,
+    requests: Optional[int] = None
+) -> ScenarioResult:
+    """Run an operation from concurrency closed-loop users
+
+    Each user sends its next request as soon as the previous one finished,
+    until duration seconds have passed or requests requests were started.
+    """
+    result = ScenarioResult(name)
+    deadline = time.monotonic() + duration if duration else None
+    sequence = 0
+
+    async def user():
+        nonlocal sequence
+        while (requests is None or sequence < requests) and (deadline is None or time.monotonic() < deadline):
+            sequence += 1
+            start = time.perf_counter()
+            try:
+                first_byte = await operation(clients, sequence)
+            except Exception as e:
+                result.errors[type(e).__name__] += 1
+                continue
+            result.latencies.append(time.perf_counter() - start)
+            if first_byte is not None:
+                result.first_byte.append(first_byte)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _message(text: str) -> Message:
+    return Message(message=text, role="user", context="Load test", history=[])
+
+
+async def message(clients: Dict[str, HttpAgentClient], sequence: int) -> None:
+    response = await clients["concierge"].process_message(_message(f"Question {sequence}: what can you do?"))
+    if response.status != "completed":
+        raise ScenarioFailed(response.error)
+
+
+async def stream(clients: Dict[str, HttpAgentClient], sequence: int) -> float:
+    start = time.perf_counter()
+    first_byte = None
+    final = None
+    async for chunk in clients["concierge"].stream_message(_message(f"Question {sequence}: tell me more")):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        if chunk.response is not None:
+            final = chunk.response
+    if final is None or final.status != "completed":
+        raise ScenarioFailed(final.error if final else "Stream ended without a response")
+    return first_byte
+
+
+async def resume_query(clients: Dict[str, HttpAgentClient], sequence: int) -> None:
+    response = await clients["resumes"].process_message(
+        _message(f"Question {sequence}: which candidates know Python?")
+    )
+    if response.status != "completed":
+        raise ScenarioFailed(response.error)
+
+
+def _resume(sequence: int) -> bytes:
+    lines = [f"Candidate {sequence}", "Senior software engineer."]
+    for year in range(2010, 2025):
+        lines.append(
+            f"{year}: worked on Python services, data pipelines and machine learning projects "
+            f"as part of team {sequence % 17}, leading releases and mentoring engineers."
+        )
+    return "\n".join(lines).encode("utf-8")
+
+
+async def _wait(client: HttpAgentClient, work_id: str, poll_interval: Optional[float] = None):
+    if poll_interval is None:
+        result = await client.wait_for_result(work_id, timeout=300)
+    else:
+        # Fixed-interval polling, as clients that do not long-poll do
+        while True:
+            result = await client.get_work_result(work_id)
+            if result.status in (WorkStatus.COMPLETED, WorkStatus.FAILED):
+                break
+            await asyncio.sleep(poll_interval)
+    if result.status != WorkStatus.COMPLETED:
+        raise ScenarioFailed(result.error or f"Work ended as {result.status.value}")
+
+
+async def resume_upload(clients: Dict[str, HttpAgentClient], sequence: int) -> None:
+    client = clients["resumes"]
+    submitted = await client.process_work_request_with_file(
+        WorkRequest(task="Summarize this candidate's experience", context="Load test"),
+        io.BytesIO(_resume(sequence)),
+        f"candidate-{sequence}.txt",
+        "text/plain"
+    )
+    await _wait(client, submitted.work_id)
+
+
+async def work(clients: Dict[str, HttpAgentClient], sequence: int) -> None:
+    client = clients["worker"]
+    submitted = await client.process_work_request(
+        WorkRequest(task=f"Task {sequence}: ask the concierge what it can do", context="Load test")
+    )
+    await _wait(client, submitted.work_id)
+
+
+async def work_polling(clients: Dict[str, HttpAgentClient], sequence: int) -> None:
+    client = clients["worker"]
+    submitted = await client.process_work_request(
+        WorkRequest(task=f"Task {sequence}: ask the concierge what it can do", context="Load test")
+    )
+    await _wait(client, submitted.work_id, poll_interval=0.5)
+
+
+# Scenario name: (operation, services it needs)
+SCENARIOS: Dict[str, Any] = {
+    "message": (message, ["concierge"]),
+    "stream": (stream, ["concierge"]),
+    "resume_query": (resume_query, ["resumes"]),
+    "resume_upload": (resume_upload, ["resumes"]),
+    "work": (work, ["worker", "concierge"]),
+    "work_polling": (work_polling, ["worker", "concierge"]),
+}
@@ -0,0 +1,140 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+
+# Scenario metrics compared between runs: (label, path in a scenario summary, True if higher is better)
+COMPARED_METRICS: List[Tuple[str, Tuple[str, ...], bool]] = [
+    ("p50 ms", ("latency_ms", "p50"), False),
+    ("p95 ms", ("latency_ms", "p95"), False),
+    ("p99 ms", ("latency_ms", "p99"), False),
+    ("throughput rps", ("throughput_rps",), True),
+]
+
+
+def save_results(results: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _get(data: Any, path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _row(
+    name: str,
+    metric: str,
+    baseline: Optional[float],
+    current: Optional[float],
+    regressed: bool,
+    change: Optional[float]
+) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "metric": metric,
+        "baseline": baseline,
+        "current": current,
+        "change": change,
+        "regressed": regressed,
+    }
+
+
+def _relative_row(
+    name: str,
+    metric: str,
+    baseline: Optional[float],
+    current: Optional[float],
+    higher_is_better: bool,
+    tolerance: float
+) -> Dict[str, Any]:
+    if not baseline or current is None:
+        return _row(name, metric, baseline, current, False, None)
+    change = (current - baseline) / baseline
+    worse = -change if higher_is_better else change
+    return _row(name, metric, baseline, current, worse > tolerance, change)
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 0.1,
+    error_rate_tolerance: float = 0.01
+) -> List[Dict[str, Any]]:
+    """Compare the scenarios and services present in both runs
+
+    Latency, throughput and peak memory regressed when they got worse by more
+    than tolerance, a fraction of the baseline value. The error rate regressed
+    when it rose by more than error_rate_tolerance.
+
+    Returns:
+        One row per compared metric, with the relative change where there is one
+    """
+    rows = []
+    for scenario, summary in current.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if base is None:
+            continue
+        for label, path, higher_is_better in COMPARED_METRICS:
+            rows.append(_relative_row(
+                scenario, label, _get(base, path), _get(summary, path), higher_is_better, tolerance
+            ))
+        base_errors = base.get("error_rate", 0.0)
+        errors = summary.get("error_rate", 0.0)
+        rows.append(_row(
+            scenario, "error rate", base_errors, errors, errors - base_errors > error_rate_tolerance, None
+        ))
+
+    for service, usage in current.get("services", {}).items():
+        base = baseline.get("services", {}).get(service)
+        if base is None:
+            continue
+        rows.append(_relative_row(
+            service, "peak rss MB", base.get("peak_rss_mb"), usage.get("peak_rss_mb"), False, tolerance
+        ))
+    return rows
+
+
+def _format_value(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:g}"
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    """Results of a run as a text table"""
+    lines = [
+        f"{'scenario':<15}{'requests':>9}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    ]
+    for name, summary in results.get("scenarios", {}).items():
+        latency = summary["latency_ms"]
+        lines.append(
+            f"{name:<15}{summary['requests']:>9}{summary['errors']:>8}{_format_value(summary['throughput_rps']):>9}"
+            f"{_format_value(latency['p50']):>10}{_format_value(latency['p95']):>10}"
+            f"{_format_value(latency['p99']):>10}{_format_value(latency['max']):>10}"
+        )
+    lines.append("")
+    lines.append(f"{'service':<15}{'rss MB':>10}{'peak rss MB':>13}")
+    for name, usage in results.get("services", {}).items():
+        lines.append(
+            f"{name:<15}{_format_value(usage.get('rss_mb')):>10}{_format_value(usage.get('peak_rss_mb')):>13}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """Comparison rows as a text table, regressions marked"""
+    lines = [f"{'':<15}{'metric':<16}{'baseline':>11}{'current':>11}{'change':>9}"]
+    for row in rows:
+        change = "-" if row["change"] is None else f"{row['change'] * 100:+.1f}%"
+        lines.append(
+            f"{row['name']:<15}{row['metric']:<16}{_format_value(row['baseline']):>11}"
+            f"{_format_value(row['current']):>11}{change:>9}{'  REGRESSED' if row['regressed'] else ''}"
+        )
+    return "\n".join(lines)
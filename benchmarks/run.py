@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from core.client import HttpAgentClient
+from .load import SCENARIOS, run_load
+from .report import compare_results, format_comparison, format_results, load_results, save_results
+from .services import REPO_ROOT, ServiceProcess, start_services, stop_services
+import aiohttp
+import argparse
+import asyncio
+import os
+import platform
+import sys
+import tempfile
+
+# Command line option: FAKE_LLM_* variable it sets
+FAKE_LLM_OPTIONS = {
+    "latency_ms": "FAKE_LLM_LATENCY_MS",
+    "tokens_per_second": "FAKE_LLM_TOKENS_PER_SECOND",
+    "completion_tokens": "FAKE_LLM_COMPLETION_TOKENS",
+    "error_rate": "FAKE_LLM_ERROR_RATE",
+    "seed": "FAKE_LLM_SEED",
+}
+
+
+async def _sample_memory(services: Dict[str, ServiceProcess], peaks: Dict[str, float], interval: float = 0.5):
+    while True:
+        for name, service in services.items():
+            rss = service.memory()["rss_mb"]
+            if rss is not None:
+                peaks[name] = max(peaks.get(name, 0.0), rss)
+        await asyncio.sleep(interval)
+
+
+async def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the services the scenarios need, run each scenario and collect the results"""
+    scenarios: List[str] = args.scenarios
+    needed = sorted({service for name in scenarios for service in SCENARIOS[name][1]})
+    env = {
+        variable: str(getattr(args, option))
+        for option, variable in FAKE_LLM_OPTIONS.items()
+        if getattr(args, option) is not None
+    }
+    # The LLM response cache would turn repeated scenario requests into cache hits
+    env.setdefault("LLM_CACHE_ENABLED", "false")
+
+    results: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "scenarios": scenarios,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "requests": args.requests,
+            "warmup_s": args.warmup,
+            "fake_llm": env,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": {},
+        "services": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="evo-bench-") as workdir:
+        print(f"Starting {', '.join(needed)}", file=sys.stderr)
+        services = await start_services(needed, workdir, env)
+        connector = aiohttp.TCPConnector(limit=0)
+        session = aiohttp.ClientSession(connector=connector)
+        clients = {
+            name: HttpAgentClient(service.base_url, session=session, timeout=args.timeout)
+            for name, service in services.items()
+        }
+        peaks: Dict[str, float] = {}
+        sampler = asyncio.create_task(_sample_memory(services, peaks))
+        try:
+            for name in scenarios:
+                operation = SCENARIOS[name][0]
+                if args.warmup:
+                    print(f"Warming up {name}", file=sys.stderr)
+                    await run_load(name, operation, clients, args.concurrency, duration=args.warmup)
+                print(f"Running {name}", file=sys.stderr)
+                result = await run_load(
+                    name, operation, clients, args.concurrency, duration=args.duration, requests=args.requests
+                )
+                results["scenarios"][name] = result.summary()
+        finally:
+            sampler.cancel()
+            for name, service in services.items():
+                usage = service.memory()
+                if peaks.get(name) and (usage["peak_rss_mb"] is None or peaks[name] > usage["peak_rss_mb"]):
+                    usage["peak_rss_mb"] = peaks[name]
+                results["services"][name] = usage
+            await session.close()
+            stop_services(services)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test the agent services against a simulated LLM and report latency, throughput and memory"
+    )
+    parser.add_argument(
+        "--scenarios", "-s",
+        default=",".join(SCENARIOS),
+        help=f"Comma-separated scenarios to run (default: all of {', '.join(SCENARIOS)})"
+    )
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Concurrent users (default: 8)")
+    parser.add_argument("--duration", "-d", type=float, default=20, help="Seconds to run each scenario (default: 20)")
+    parser.add_argument("--requests", "-n", type=int, help="Stop each scenario after this many requests")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds before each scenario (default: 3)")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout of each HTTP request (default: 120)")
+    parser.add_argument("--latency-ms", type=float, help="Simulated time to first token")
+    parser.add_argument("--tokens-per-second", type=float, help="Simulated completion token rate")
+    parser.add_argument("--completion-tokens", type=int, help="Simulated completion length")
+    parser.add_argument("--error-rate", type=float, help="Fraction of LLM requests throttled with a 429")
+    parser.add_argument("--seed", type=int, help="Seed of the simulated latency jitter and errors")
+    parser.add_argument(
+        "--output", "-o",
+        help="Results file (default: benchmarks/results/<timestamp>.json)"
+    )
+    parser.add_argument("--baseline", "-b", help="Results file to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1,
+        help="Relative change counted as a regression when comparing (default: 0.1)"
+    )
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results = asyncio.run(run_benchmarks(args))
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", "results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    save_results(results, output)
+    print(format_results(results))
+    print(f"\nResults saved to {output}")
+
+    if args.baseline:
+        rows = compare_results(load_results(args.baseline), results, args.tolerance)
+        print(f"\nCompared with {args.baseline}:")
+        print(format_comparison(rows))
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
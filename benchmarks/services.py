@@ -0,0 +1,151 @@
+from typing import Dict, List, Optional
+from core.client import HttpAgentClient
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Service name used on the command line and in results, and its directory
+SERVICES = {
+    "concierge": "agent-evo-concierge",
+    "resumes": "agent-rag-resumes",
+    "worker": "agent-to-agent-worker",
+}
+
+
+def free_port() -> int:
+    """A TCP port that is free on localhost"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServiceProcess:
+    """An agent service run by uvicorn in a child process, with the fake LLM backend"""
+
+    def __init__(self, name: str, workdir: str, env: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.directory = os.path.join(REPO_ROOT, SERVICES[name])
+        self.workdir = os.path.join(workdir, name)
+        self.port = free_port()
+        self.env = dict(env or {})
+        self.process: Optional[subprocess.Popen] = None
+        self._log = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.workdir, "service.log")
+
+    def start(self):
+        """Start the service; its data and log are kept in its own work directory"""
+        os.makedirs(self.workdir, exist_ok=True)
+        env = {
+            **os.environ,
+            "LLM_BACKEND": "fake",
+            "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, self.directory, os.getenv("PYTHONPATH")])),
+            "UPLOAD_DIR": os.path.join(self.workdir, "uploads"),
+            "RESUME_INDEX_PATH": os.path.join(self.workdir, "resume_index"),
+            "WORK_STORE_PATH": os.path.join(self.workdir, "work_results.db"),
+            "LOG_DIR": os.path.join(self.workdir, "logs"),
+            **self.env,
+        }
+        self._log = open(self.log_path, "w")
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning",
+            ],
+            cwd=self.directory,
+            env=env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT
+        )
+
+    async def wait_until_ready(self, timeout: float = 60):
+        """Wait until GET /agent/status answers
+
+        Raises:
+            RuntimeError: If the service exits or does not answer within timeout
+        """
+        deadline = time.monotonic() + timeout
+        async with HttpAgentClient(self.base_url, timeout=2) as client:
+            while True:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"{self.name} exited with {self.process.returncode}, see {self.log_path}")
+                try:
+                    await client.get_status()
+                    return
+                except Exception:
+                    if time.monotonic() >= deadline:
+                        raise RuntimeError(f"{self.name} did not start within {timeout}s, see {self.log_path}")
+                    await asyncio.sleep(0.25)
+
+    def memory(self) -> Dict[str, Optional[float]]:
+        """Current and peak resident set size in MB, None where /proc is not available"""
+        usage: Dict[str, Optional[float]] = {"rss_mb": None, "peak_rss_mb": None}
+        if self.process is None:
+            return usage
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        usage["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+                    elif line.startswith("VmHWM:"):
+                        usage["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        return usage
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+async def start_services(names: List[str], workdir: str, env: Optional[Dict[str, str]] = None) -> Dict[str, ServiceProcess]:
+    """Start the named services, the worker after the agents it talks to
+
+    Raises:
+        RuntimeError: If a service does not start; the others are stopped
+    """
+    services: Dict[str, ServiceProcess] = {}
+    try:
+        agents = [name for name in names if name != "worker"]
+        for name in agents:
+            services[name] = ServiceProcess(name, workdir, env)
+            services[name].start()
+        await asyncio.gather(*(services[name].wait_until_ready() for name in agents))
+
+        if "worker" in names:
+            worker_env = dict(env or {})
+            if "concierge" in services:
+                worker_env["AGENT_CONCIERGE_BASE_URL"] = services["concierge"].base_url
+            if "resumes" in services:
+                worker_env["AGENT_RAG_RESUMES_BASE_URL"] = services["resumes"].base_url
+            services["worker"] = ServiceProcess("worker", workdir, worker_env)
+            services["worker"].start()
+            await services["worker"].wait_until_ready()
+    except Exception:
+        stop_services(services)
+        raise
+    return services
+
+
+def stop_services(services: Dict[str, ServiceProcess]):
+    for service in services.values():
+        service.stop()
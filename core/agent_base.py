@@ -1,13 +1,19 @@
-from typing import List, Optional, Dict, Tuple
+from typing import List, Optional, Dict, Tuple, AsyncIterator
 from abc import ABC, abstractmethod
+from collections import Counter
 from core.schemas import MessageHistory, AgentResponse, WorkResult, WorkStatus, WorkRequestFile
 from llama_index.core import PromptTemplate
-from llama_index.core.base.llms.types import ChatMessage
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
 from datetime import datetime
 import uuid
 import asyncio
 from .azure_openai_llm import AzureOpenAILLM
+from .work_scheduler import WorkScheduler
+from .work_store import BaseWorkStore, create_work_store
+from .token_budget import ContextPacker, count_tokens, track_token_usage
+from .tracing import collect_timings, start_span
 import os
+import re
 from pathlib import Path
 
 class BaseAgent(ABC):
@@ -28,16 +34,94 @@ class BaseAgent(ABC):
     
     AGENT_SYS_PROMPT_TEMPLATE = PromptTemplate(TEMPLATE_TEXT)
 
-    def __init__(self):
+    # Agent-specific instructions placed in the system prompt
+    INTERNAL_CONTEXT = ""
+
+    def __init__(self, work_store: Optional[BaseWorkStore] = None):
         self.state = "initialized"
-        self.work_items: Dict[str, WorkResult] = {}
+        # Named after the agent, so agents sharing a working directory keep separate results
+        self.work_store = work_store or create_work_store(
+            "work_results_" + re.sub(r"(?<!^)(?=[A-Z])", "_", type(self).__name__).lower()
+        )
+        self.work_scheduler = WorkScheduler.from_env()
+        self._work_events: Dict[str, asyncio.Event] = {}
+        self._work_waiters: Counter = Counter()
+        self.work_store.on_evict = self._forget_work_events
+        # Agents set self.llm before calling this so the packer knows the model's limits
+        llm = getattr(self, "llm", None)
+        self.context_packer = ContextPacker.from_env(
+            model=llm.model_config.get("model") if llm else None,
+            token_limit=llm.token_limit if llm else None
+        )
+        self._base_prompt_tokens: Optional[int] = None
 
     def history_to_chat_messages(self, history: List[MessageHistory]) -> List[ChatMessage]:
         if history is None:
             return []
         return [ChatMessage(role=m.role, content=m.content) for m in history]
+
+    @property
+    def system_prompt_template(self) -> str:
+        """The system prompt template with this agent's internal context filled in"""
+        return self.TEMPLATE_TEXT.replace("{agent_internal_context}", self.INTERNAL_CONTEXT)
+
+    def build_system_prompt(self, context: str) -> str:
+        """Format the agent system prompt with the internal and external context"""
+        return self.AGENT_SYS_PROMPT_TEMPLATE.format(
+            agent_internal_context=self.INTERNAL_CONTEXT,
+            agent_external_context=context
+        )
+
+    def pack_prompt(
+        self,
+        message: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> Tuple[str, List[MessageHistory]]:
+        """Trim the external context and history so the prompt fits the token budget
+
+        Returns:
+            Tuple containing:
+                - context: The context, truncated if needed
+                - history: The most recent history messages that fit
+        """
+        if self._base_prompt_tokens is None:
+            self._base_prompt_tokens = count_tokens(
+                self.build_system_prompt(""), self.context_packer.model
+            )
+        return self.context_packer.pack(self._base_prompt_tokens, message, context or "", history)
+
+    def build_chat_messages(
+        self,
+        message: str,
+        role: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> List[ChatMessage]:
+        """Build the full chat message list: system prompt, history and the new message
+
+        Context and history are packed into the token budget first, see pack_prompt.
+        """
+        context, history = self.pack_prompt(message, context, history)
+        return (
+            [ChatMessage(role=MessageRole.SYSTEM, content=self.build_system_prompt(context))]
+            + self.history_to_chat_messages(history)
+            + [ChatMessage(role=role, content=message)]
+        )
+
+    def build_response_memory(
+        self,
+        message: str,
+        role: str,
+        history: List[MessageHistory],
+        response: str
+    ) -> List[MessageHistory]:
+        """Append a message and the agent's response to the conversation history"""
+        return (history or []) + [
+            MessageHistory(role=role, content=message),
+            MessageHistory(role="assistant", content=response)
+        ]
         
-    @abstractmethod
     def process_message(
         self,
         message: str,
@@ -46,6 +130,10 @@ class BaseAgent(ABC):
         history: List[MessageHistory]
     ) -> Tuple[str, List[MessageHistory]]:
         """Process an incoming message
+
+        Agents implement this, aprocess_message, or both. Agents whose work is
+        asynchronous only implement aprocess_message and cannot process
+        messages synchronously.
         
         Args:
             message: The message content to process
@@ -58,7 +146,43 @@ class BaseAgent(ABC):
                 - response_message: The agent's response text
                 - response_memory: List of MessageHistory objects representing the conversation memory
         """
-        pass
+        raise NotImplementedError(f"{type(self).__name__} only processes messages asynchronously, use aprocess_message")
+
+    async def aprocess_message(
+        self,
+        message: str,
+        role: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> Tuple[str, List[MessageHistory]]:
+        """Process an incoming message without blocking the event loop
+
+        Agents with an async LLM client should override this. The default
+        implementation runs the synchronous process_message in a worker thread.
+
+        Returns:
+            Tuple containing:
+                - response_message: The agent's response text
+                - response_memory: List of MessageHistory objects representing the conversation memory
+        """
+        return await asyncio.to_thread(self.process_message, message, role, context, history)
+
+    async def stream_message(
+        self,
+        message: str,
+        role: str,
+        context: str,
+        history: List[MessageHistory]
+    ) -> AsyncIterator[str]:
+        """Process an incoming message, yielding the response text as it is generated
+
+        Agents backed by a streaming LLM should override this. The default
+        implementation yields the complete aprocess_message response as one chunk.
+        The conversation memory for the streamed response is built with
+        build_response_memory.
+        """
+        result, _ = await self.aprocess_message(message, role, context, history)
+        yield result
         
     @abstractmethod
     async def process_work_request(
@@ -110,7 +234,11 @@ class BaseAgent(ABC):
         history: List[MessageHistory],
         file: Optional[WorkRequestFile] = None
     ) -> WorkResult:
-        """Start an asynchronous work request"""
+        """Start an asynchronous work request
+
+        Raises:
+            WorkQueueFullError: If the agent's work queue cannot accept more work
+        """
         work_id = str(uuid.uuid4())
         
         # Create work result entry
@@ -120,51 +248,108 @@ class BaseAgent(ABC):
             created_at=datetime.utcnow(),
             file_path=file.file_path if file else None
         )
-        self.work_items[work_id] = work_result
 
-        # Start work in background
-        asyncio.create_task(self._execute_work(work_id, task, context, history, file))
+        # Stored before it is queued, so the pending state cannot overwrite a later one
+        await self.work_store.aput(work_result)
+        try:
+            self.work_scheduler.submit(
+                work_id,
+                lambda: self._execute_work(work_result, task, context, history, file)
+            )
+        except Exception:
+            await self.work_store.adelete(work_id)
+            raise
         
         return work_result
 
     async def _execute_work(
         self,
-        work_id: str,
+        work_result: WorkResult,
         task: str,
         context: str,
         history: List[MessageHistory],
         file: Optional[WorkRequestFile] = None
     ):
         """Execute the work request and update status"""
-        work_result = self.work_items[work_id]
         work_result.status = WorkStatus.IN_PROGRESS
+        work_result.started_at = datetime.utcnow()
+        await self._save_work_result(work_result)
         
-        try:
-            if file:
-                result, updated_history = await self.process_work_request_with_file(
-                    task, context, history, file
-                )
-            else:
-                result, updated_history = await self.process_work_request(
-                    task, context, history
-                )
-            work_result.status = WorkStatus.COMPLETED
-            work_result.result = result
-            work_result.memory = updated_history
-            work_result.file_path = file.file_path if file else None
-        except Exception as e:
-            work_result.status = WorkStatus.FAILED
-            work_result.error = str(e)
+        with track_token_usage() as usage, collect_timings() as timings:
+            with start_span("work_request", work_id=work_result.work_id) as span:
+                try:
+                    if file:
+                        result, updated_history = await self.process_work_request_with_file(
+                            task, context, history, file
+                        )
+                    else:
+                        result, updated_history = await self.process_work_request(
+                            task, context, history
+                        )
+                    work_result.status = WorkStatus.COMPLETED
+                    work_result.result = result
+                    work_result.memory = updated_history
+                    work_result.file_path = file.file_path if file else None
+                except Exception as e:
+                    span.status = "error"
+                    span.error = str(e)
+                    work_result.status = WorkStatus.FAILED
+                    work_result.error = str(e)
         
+        work_result.tokens_used = usage.total_tokens
+        work_result.trace_id = span.trace_id
+        work_result.timings = {name: round(seconds, 4) for name, seconds in timings.items()}
         work_result.completed_at = datetime.utcnow()
+        await self._save_work_result(work_result)
+
+    async def _save_work_result(self, work_result: WorkResult):
+        """Persist a work result and wake up anyone waiting for it to change"""
+        await self.work_store.aput(work_result)
+        event = self._work_events.pop(work_result.work_id, None)
+        if event is not None:
+            event.set()
         
-    def get_work_result(self, work_id: str) -> Optional[WorkResult]:
+    async def get_work_result(self, work_id: str) -> Optional[WorkResult]:
         """Get the result of an async work request"""
+        return await self.work_store.aget(work_id)
 
-        if work_id not in self.work_items:
-            return None
-        
-        return self.work_items[work_id]
+    async def wait_for_work_result(self, work_id: str, timeout: float) -> Optional[WorkResult]:
+        """Get the result of an async work request, waiting for it to change state
+
+        Returns as soon as the work changes state or the timeout expires. Work that
+        has already completed or failed is returned immediately.
+        """
+        work_result = await self.get_work_result(work_id)
+        if work_result is None or timeout <= 0 or work_result.status in (
+            WorkStatus.COMPLETED, WorkStatus.FAILED
+        ):
+            return work_result
+
+        event = self._work_events.setdefault(work_id, asyncio.Event())
+        self._work_waiters[work_id] += 1
+        try:
+            # A change saved while the result was being read did not see this waiter
+            current = await self.get_work_result(work_id)
+            if current is None or current.status != work_result.status:
+                return current
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            # The last waiter to leave, by timeout or cancellation, drops the event
+            self._work_waiters[work_id] -= 1
+            if self._work_waiters[work_id] <= 0:
+                del self._work_waiters[work_id]
+                self._work_events.pop(work_id, None)
+        return await self.get_work_result(work_id)
+
+    def _forget_work_events(self, work_ids: List[str]):
+        """Wake the waiters of evicted work, which then find it gone"""
+        for work_id in work_ids:
+            event = self._work_events.pop(work_id, None)
+            if event is not None:
+                event.set()
         
     def get_state(self) -> str:
         """Get current agent state"""
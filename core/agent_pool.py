@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+from llama_index.agent.openai import OpenAIAgent
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.llms.openai import OpenAI
+import threading
+
+
+class OpenAIAgentPool:
+    """Pool of reusable OpenAIAgent instances keyed by system prompt template and LLM.
+
+    Building an OpenAIAgent for every message is comparatively expensive, and
+    sharing one instance between concurrent requests mixes their chat histories.
+    The pool hands out an agent exclusively for the duration of a request; only
+    the system prompt and chat history are loaded on checkout. Agents are reset
+    and returned to the pool when the request finishes. Safe to use from the
+    event loop and from worker threads.
+    """
+
+    def __init__(self, llm: OpenAI, max_idle_per_key: int = 16):
+        self.llm = llm
+        self.max_idle_per_key = max_idle_per_key
+        self._idle: Dict[Tuple[str, int], List[OpenAIAgent]] = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+        self._in_use = 0
+
+    @contextmanager
+    def checkout(
+        self,
+        template: str,
+        system_prompt: str,
+        chat_history: List[ChatMessage],
+        llm: Optional[OpenAI] = None
+    ) -> Iterator[OpenAIAgent]:
+        """Check out an agent loaded with the given system prompt and chat history
+
+        Args:
+            template: Key identifying the system prompt template the agent serves
+            system_prompt: The formatted system prompt for this request
+            chat_history: Chat history to load into the agent's memory
+            llm: LLM the agent should call, the pool's LLM by default
+        """
+        llm = llm or self.llm
+        key = (template, id(llm))
+        agent = self._acquire(key, llm)
+        try:
+            agent.agent_worker.prefix_messages = [
+                ChatMessage(role=MessageRole.SYSTEM, content=system_prompt)
+            ]
+            agent.memory.set(list(chat_history))
+            yield agent
+        finally:
+            self._release(key, agent)
+
+    def _acquire(self, key: Tuple[str, int], llm: OpenAI) -> OpenAIAgent:
+        with self._lock:
+            self._in_use += 1
+            idle = self._idle.get(key)
+            if idle:
+                self._reused += 1
+                return idle.pop()
+            self._created += 1
+
+        return OpenAIAgent.from_tools(llm=llm)
+
+    def _release(self, key: Tuple[str, int], agent: OpenAIAgent):
+        try:
+            agent.reset()
+            reusable = True
+        except Exception:
+            reusable = False
+
+        with self._lock:
+            self._in_use -= 1
+            idle = self._idle.setdefault(key, [])
+            if reusable and len(idle) < self.max_idle_per_key:
+                idle.append(agent)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool usage statistics"""
+        with self._lock:
+            return {
+                "created": self._created,
+                "reused": self._reused,
+                "in_use": self._in_use,
+                "idle": sum(len(idle) for idle in self._idle.values()),
+            }
@@ -0,0 +1,130 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List
+from .schemas import Message, AgentResponse, ConversationSession, SessionCreate, SessionMessage
+from .service_base import BaseAgentService
+import logging
+
+logger = logging.getLogger("evo_concierge")
+
+
+def add_message_routes(router: APIRouter, agent_service: BaseAgentService):
+    """Add the message, streaming, batch and session routes every agent service exposes
+
+    Args:
+        router: Router of the service's /agent API
+        agent_service: Service handling the requests
+    """
+
+    @router.post("/message", response_model=AgentResponse)
+    async def process_message(message: Message):
+        """
+        Process a message for the agent.
+
+        Takes a Message containing the role, context and history.
+        Returns an AgentResponse with status and optional result/error.
+        """
+        try:
+            logger.info("Processing message with role: %s", message.role)
+            logger.debug("Message content", extra={"payload": message.message})
+            response = await agent_service.process_message(message)
+            logger.debug("Message processed successfully", extra={"payload": response})
+            return response
+        except Exception as e:
+            logger.error("Error processing message: %s", e, exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.post("/message/stream")
+    async def stream_message(message: Message):
+        """
+        Process a message for the agent, streaming the response as Server-Sent Events.
+
+        Emits "token" events with response text deltas as they are generated and a
+        final "response" event containing the complete AgentResponse with memory.
+        """
+        try:
+            logger.info("Streaming message with role: %s", message.role)
+            return StreamingResponse(
+                agent_service.stream_message(message),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        except Exception as e:
+            logger.error("Error streaming message: %s", e, exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.post("/messages/batch", response_model=List[AgentResponse])
+    async def process_messages_batch(messages: List[Message], stream: bool = Query(False)):
+        """
+        Process a batch of independent messages concurrently.
+
+        Returns one AgentResponse per message, in the order the messages were sent.
+        With stream=true the responses are sent as newline-delimited JSON
+        MessageBatchItem objects as soon as each one finishes.
+        """
+        if len(messages) > agent_service.batch_max_messages:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch exceeds the maximum of {agent_service.batch_max_messages} messages"
+            )
+        try:
+            logger.info("Processing batch of %d messages", len(messages))
+            if stream:
+                return StreamingResponse(
+                    (item.model_dump_json() + "\n" async for item in agent_service.stream_messages_batch(messages)),
+                    media_type="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+                )
+            return await agent_service.process_messages_batch(messages)
+        except Exception as e:
+            logger.error("Error processing message batch: %s", e, exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.post("/sessions", response_model=ConversationSession)
+    async def create_session(request: SessionCreate):
+        """
+        Start a conversation session.
+
+        The server keeps the session transcript, so each message sent to the session
+        only needs to carry the new message instead of the full history.
+        """
+        try:
+            return agent_service.create_session(request)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.post("/sessions/{session_id}/message", response_model=AgentResponse)
+    async def process_session_message(session_id: str, message: SessionMessage):
+        """
+        Process a message in a conversation session.
+
+        Returns an AgentResponse whose memory holds only the entries added by this turn.
+        """
+        try:
+            response = await agent_service.process_session_message(session_id, message)
+            if response is None:
+                raise HTTPException(status_code=404, detail="Session not found")
+            return response
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.get("/sessions/{session_id}", response_model=ConversationSession)
+    async def get_session(session_id: str):
+        """
+        Get a conversation session and its full transcript.
+        """
+        session = agent_service.get_session(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return session
+
+    @router.delete("/sessions/{session_id}")
+    async def delete_session(session_id: str):
+        """
+        End a conversation session.
+        """
+        if not agent_service.delete_session(session_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+        return {"status": "success"}
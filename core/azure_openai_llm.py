@@ -1,7 +1,15 @@
 import os
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Sequence, TypeVar
 from llama_index.llms.azure_openai import AzureOpenAI 
+from llama_index.core.base.llms.types import ChatMessage
+from openai import AsyncAzureOpenAI
 from .llm_base import BaseLLM
+from .embedding_batcher import EmbeddingMicroBatcher
+from .token_budget import model_token_limit, count_message_tokens, count_tokens
+from .rate_limiter import LLMRateLimiter, get_rate_limiter
+import asyncio
+
+T = TypeVar("T")
 
 
 class AzureOpenAILLM(BaseLLM):
@@ -14,17 +22,33 @@ class AzureOpenAILLM(BaseLLM):
         if not self.validate_config():
             raise ValueError("Invalid Azure OpenAI configuration")
 
-        self.llm = AzureOpenAI(
-                    deployment_name=self.model_config["deployment_name"],
-                    api_key=self.model_config["api_key"],
-                    azure_endpoint=self.model_config["api_base"],
-                    api_version=self.model_config["api_version"],
-                    model=self.model_config["model"],
-                    temperature=self.model_config.get("temperature", .25)
-                )
+        self.llm = self._create_chat_model()
+        # Deployments share one limiter per process, as they share the deployment's quota
+        self.rate_limiter: LLMRateLimiter = get_rate_limiter(self.model_config["deployment_name"])
+        self._embedding_client: Optional[AsyncAzureOpenAI] = None
+        self.embedding_batch_size = int(self.model_config.get("embedding_batch_size", 256))
+        # Concurrent embed() calls are coalesced into embed_batch() requests
+        self.embedding_batcher = EmbeddingMicroBatcher(
+            self.embed_batch,
+            max_batch_size=self.embedding_batch_size,
+            max_wait_ms=float(self.model_config.get("embedding_batch_wait_ms", 5))
+        )
             
         self.is_initialized = True
     
+    def _create_chat_model(self) -> AzureOpenAI:
+        """Build the llama-index LLM that chat requests are made with"""
+        return AzureOpenAI(
+            deployment_name=self.model_config["deployment_name"],
+            api_key=self.model_config["api_key"],
+            azure_endpoint=self.model_config["api_base"],
+            api_version=self.model_config["api_version"],
+            model=self.model_config["model"],
+            temperature=self.model_config.get("temperature", .25),
+            # Retries are left to the shared rate limiter
+            max_retries=0
+        )
+
     async def generate(
         self,
         prompt: str,
@@ -34,18 +58,13 @@ class AzureOpenAILLM(BaseLLM):
         **kwargs
     ) -> str:
         """Generate completion using Azure OpenAI"""
-        try:
-            response = await self.llm.Completion.acreate(
-                engine=self.deployment_name,
-                prompt=prompt,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stop=stop_sequences,
-                **kwargs
-            )
-            return response.choices[0].text.strip()
-        except Exception as e:
-            raise Exception(f"Azure OpenAI generation failed: {str(e)}")
+        return await self.generate_chat(
+            [{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop_sequences=stop_sequences,
+            **kwargs
+        )
     
     async def generate_chat(
         self,
@@ -56,41 +75,114 @@ class AzureOpenAILLM(BaseLLM):
         **kwargs
     ) -> str:
         """Generate chat completion using Azure OpenAI"""
-        try:
-            response = await self.llm.ChatCompletion.acreate(
-                engine=self.deployment_name,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stop=stop_sequences,
+        chat_messages = [ChatMessage(role=m["role"], content=m["content"]) for m in messages]
+        params = {
+            key: value for key, value in {
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "stop": stop_sequences,
                 **kwargs
-            )
-            return response.choices[0].message['content'].strip()
+            }.items() if value is not None
+        }
+
+        async def produce(llm: AzureOpenAI) -> str:
+            response = await llm.achat(chat_messages, **params)
+            return (response.message.content or "").strip()
+
+        try:
+            return await self.execute_chat(chat_messages, produce, **params)
         except Exception as e:
-            raise Exception(f"Azure OpenAI chat generation failed: {str(e)}")
+            raise Exception(f"Azure OpenAI chat generation failed: {str(e)}") from e
+
+    async def run_request(
+        self,
+        call: Callable[[AzureOpenAI], Awaitable[T]],
+        messages: Sequence[ChatMessage],
+        operation: str = "chat"
+    ) -> T:
+        """Make a chat request under the deployment's rate limiter
+
+        Use for requests made directly on the llama-index LLM, such as streaming
+        or structured output calls. Throttled and transient failures are retried,
+        up to model_config["max_retries"] times if set.
+
+        Args:
+            call: Makes the request with the llama-index LLM it is given
+            messages: The messages sent, to estimate the request's tokens
+            operation: Kind of request, for metrics and traces
+        """
+        with self.observe_request(operation):
+            return await self.rate_limiter.run(
+                lambda: call(self.llm),
+                count_message_tokens(messages, self.model_config.get("model")),
+                self.model_config.get("max_retries")
+            )
+
+    async def _invoke_chat(
+        self,
+        messages: Sequence[ChatMessage],
+        producer: Callable[[Any], Awaitable[str]]
+    ) -> str:
+        return await self.run_request(producer, messages)
+
+    def record_usage(self, messages: Sequence[ChatMessage], response: str):
+        super().record_usage(messages, response)
+        # Prompt tokens were reserved before the request, completion tokens are known only now
+        self.rate_limiter.debit(count_tokens(response, self.model_config.get("model")))
     
     async def embed(self, text: str) -> List[float]:
-        """Generate embeddings using Azure OpenAI"""
+        """Generate embeddings using Azure OpenAI
+
+        Concurrent calls within a few milliseconds of each other are sent to
+        Azure as a single batch request.
+        """
+        return await self.embedding_batcher.embed(text)
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts using Azure OpenAI
+
+        Texts are sent in requests of at most embedding_batch_size inputs.
+        """
+        if not self.model_config.get("embedding_deployment_name"):
+            raise ValueError("Missing Azure OpenAI configuration: embedding_deployment_name")
+
+        batches = [
+            texts[i:i + self.embedding_batch_size]
+            for i in range(0, len(texts), self.embedding_batch_size)
+        ]
         try:
-            response = await self.llm.Embedding.acreate(
-                engine=self.embedding_deployment,
-                input=text
-            )
-            return response.data[0].embedding
+            results = await asyncio.gather(*(self._embed_request(batch) for batch in batches))
         except Exception as e:
-            raise Exception(f"Azure OpenAI embedding generation failed: {str(e)}")
+            raise Exception(f"Azure OpenAI embedding generation failed: {str(e)}") from e
+        return [embedding for batch in results for embedding in batch]
+
+    async def _embed_request(self, texts: List[str]) -> List[List[float]]:
+        deployment = self.model_config["embedding_deployment_name"]
+        with self.observe_request("embedding"):
+            response = await get_rate_limiter(deployment, "AZURE_OPENAI_EMBEDDING").run(
+                lambda: self._get_embedding_client().embeddings.create(model=deployment, input=texts),
+                sum(count_tokens(text) for text in texts),
+                self.model_config.get("max_retries")
+            )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _get_embedding_client(self) -> AsyncAzureOpenAI:
+        if self._embedding_client is None:
+            self._embedding_client = AsyncAzureOpenAI(
+                api_key=self.model_config["api_key"],
+                azure_endpoint=self.model_config["api_base"],
+                api_version=self.model_config["api_version"],
+                max_retries=0
+            )
+        return self._embedding_client
     
     @property
     def token_limit(self) -> int:
-        """Return token limit based on model configuration"""
-        # Token limits for different Azure OpenAI models
-        model_limits = {
-            "gpt-4": 8192,
-            "gpt-4-32k": 32768,
-            "gpt-35-turbo": 4096,
-            "gpt-35-turbo-16k": 16384
-        }
-        return model_limits.get(self.model_config.get("model_name", "gpt-35-turbo"), 4096)
+        """Return the context window size of the configured model
+
+        Set model_config["token_limit"] for models not in MODEL_TOKEN_LIMITS.
+        """
+        return model_token_limit(self.model_config.get("model"), self.model_config.get("token_limit"))
     
     def validate_config(self) -> bool:
         """Validate Azure OpenAI configuration"""
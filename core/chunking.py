@@ -0,0 +1,114 @@
+from typing import List, Sequence
+from collections import Counter
+import math
+import re
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+    """Split text into chunks of roughly chunk_size characters
+
+    Chunks end at a paragraph, line or sentence break where one is available
+    near the end of the window, and consecutive chunks share up to overlap
+    characters so content spanning a boundary is not lost.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    overlap = max(0, min(overlap, chunk_size // 2))
+
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            window = text[start:end]
+            for separator in ("\n\n", "\n", ". "):
+                cut = window.rfind(separator)
+                if cut > chunk_size // 2:
+                    end = start + cut + len(separator)
+                    break
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+
+    return chunks
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of whitespace into single spaces"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Approximate CPython cost of a term table entry besides the term's characters:
+# the str object header plus the hash table slot and the count or weight
+_TERM_ENTRY_BYTES = 80
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric terms used for lexical matching"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class LexicalChunkRanker:
+    """BM25 ranking of a fixed set of chunks against free-text queries.
+
+    Term statistics are computed once per chunk set so repeated queries against
+    the same document only pay for scoring.
+    """
+
+    def __init__(self, chunks: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = list(chunks)
+        self.k1 = k1
+        self.b = b
+        self._term_counts = [Counter(tokenize(chunk)) for chunk in self.chunks]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+
+        document_frequency: Counter = Counter()
+        for counts in self._term_counts:
+            document_frequency.update(counts.keys())
+        n = len(self.chunks)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def estimated_bytes(self) -> int:
+        """Approximate memory held by the per-chunk term counts and the idf table"""
+        return sum(
+            len(term) + _TERM_ENTRY_BYTES
+            for table in (*self._term_counts, self._idf)
+            for term in table
+        )
+
+    def score(self, query: str) -> List[float]:
+        """BM25 score of every chunk for the query"""
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        scores = []
+        for counts, length in zip(self._term_counts, self._lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self._avg_length or 1))
+            scores.append(sum(
+                self._idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                for term in terms if term in counts
+            ))
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[int]:
+        """Indices of the k best matching chunks, best first
+
+        Chunks with no matching terms are only returned when nothing matches, in
+        which case the first k chunks are used.
+        """
+        scores = self.score(query)
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score > 0),
+            key=lambda i: scores[i],
+            reverse=True
+        )
+        return ranked[:k] if ranked else list(range(min(k, len(self.chunks))))
@@ -1,4 +1,16 @@
 from .base import BaseAgentClient
-from .http import HttpAgentClient
+from .http import HttpAgentClient, AgentClientError
+from .pool import AgentClientPool, get_agent_client_pool
+from .registry import AgentEndpoint, AgentEndpointRegistry, NoAgentEndpointError, get_agent_registry
 
-__all__ = ['BaseAgentClient', 'HttpAgentClient'] 
\ No newline at end of file
+__all__ = [
+    'BaseAgentClient',
+    'HttpAgentClient',
+    'AgentClientError',
+    'AgentClientPool',
+    'get_agent_client_pool',
+    'AgentEndpoint',
+    'AgentEndpointRegistry',
+    'NoAgentEndpointError',
+    'get_agent_registry'
+] 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
-from ..schemas import Message, WorkRequest, AgentResponse
+from ..schemas import Message, WorkRequest, AgentResponse, WorkResult
 
 class BaseAgentClient(ABC):
     """Abstract base class for agent clients"""
@@ -21,6 +21,6 @@ class BaseAgentClient(ABC):
         pass
         
     @abstractmethod
-    async def process_work_request(self, work_request: WorkRequest) -> AgentResponse:
+    async def process_work_request(self, work_request: WorkRequest) -> WorkResult:
         """Send a work request to the agent"""
         pass 
\ No newline at end of file
@@ -1,27 +1,61 @@
-from typing import Dict, Any, Optional, BinaryIO
+from typing import Dict, Any, List, Optional, BinaryIO, AsyncIterator
 import aiohttp
 from urllib.parse import urljoin
 from .base import BaseAgentClient
-from ..schemas import Message, WorkRequest, AgentResponse, WorkResult
+from ..schemas import (
+    Message, WorkRequest, AgentResponse, WorkResult, WorkStatus, MessageStreamChunk, MessageBatchItem,
+    MessageHistory, ConversationSession, SessionCreate, SessionMessage
+)
+from ..sse import parse_sse_events
+from ..tracing import traceparent_headers
 import aiofiles
 from pathlib import Path
 import json
+import time
+
+
+class AgentClientError(Exception):
+    """Exception raised for errors in the agent client."""
+    pass
+
 
 class HttpAgentClient(BaseAgentClient):
     """HTTP client implementation for interacting with agent services"""
     
-    def __init__(self, base_url: str):
-        """Initialize with base URL of the agent service"""
+    def __init__(
+        self,
+        base_url: str,
+        session: Optional[aiohttp.ClientSession] = None,
+        timeout: Optional[float] = None
+    ):
+        """Initialize with base URL of the agent service
+
+        Args:
+            base_url: Base URL of the agent service
+            session: Shared session to send requests with; the client does not
+                close a session it was given. By default the client creates its own.
+            timeout: Total timeout in seconds for each request, overriding the
+                session's default
+        """
         self.base_url = base_url.rstrip('/')
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.session: Optional[aiohttp.ClientSession] = session
+        self._owns_session = session is None
+        self._request_options: Dict[str, Any] = {}
+        if timeout is not None:
+            self._request_options["timeout"] = aiohttp.ClientTimeout(total=timeout)
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        await self._ensure_session()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
+            self.session = None
+            
+    def _options(self, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Request options, with headers continuing the current trace in the agent"""
+        return {**self._request_options, "headers": {**(headers or {}), **traceparent_headers()}}
             
     def _get_url(self, endpoint: str) -> str:
         """Construct full URL for given endpoint"""
@@ -35,7 +69,7 @@ class HttpAgentClient(BaseAgentClient):
     async def restart(self) -> Dict[str, Any]:
         """Restart the agent"""
         await self._ensure_session()
-        async with self.session.post(self._get_url('/agent/restart')) as response:
+        async with self.session.post(self._get_url('/agent/restart'), **self._options()) as response:
             response.raise_for_status()
             return await response.json()
             
@@ -44,38 +78,177 @@ class HttpAgentClient(BaseAgentClient):
         await self._ensure_session()
         async with self.session.post(
             self._get_url('/agent/message'),
-            json=message.model_dump()
+            json=message.model_dump(),
+            **self._options()
         ) as response:
             response.raise_for_status()
             data = await response.json()
             return AgentResponse(**data)
             
+    async def stream_message(self, message: Message) -> AsyncIterator[MessageStreamChunk]:
+        """
+        Send a message to the agent and stream the response as it is generated.
+        
+        Yields MessageStreamChunk objects carrying text deltas; the last chunk
+        carries the complete AgentResponse, including memory.
+        """
+        await self._ensure_session()
+        async with self.session.post(
+            self._get_url('/agent/message/stream'),
+            json=message.model_dump(),
+            **self._options({"Accept": "text/event-stream"})
+        ) as response:
+            response.raise_for_status()
+            async for _, data in parse_sse_events(response.content):
+                yield MessageStreamChunk.model_validate_json(data)
+            
+    async def process_messages_batch(self, messages: List[Message]) -> List[AgentResponse]:
+        """
+        Send independent messages to the agent in a single request.
+        
+        The agent processes them concurrently. Returns one AgentResponse per
+        message, in the order the messages were given.
+        """
+        await self._ensure_session()
+        async with self.session.post(
+            self._get_url('/agent/messages/batch'),
+            json=[message.model_dump() for message in messages],
+            **self._options()
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+            return [AgentResponse(**item) for item in data]
+
+    async def stream_messages_batch(self, messages: List[Message]) -> AsyncIterator[MessageBatchItem]:
+        """
+        Send independent messages to the agent in a single request, receiving
+        each response as soon as it finishes.
+        
+        Yields MessageBatchItem objects whose index is the message's position in messages.
+        """
+        await self._ensure_session()
+        async with self.session.post(
+            self._get_url('/agent/messages/batch'),
+            params={"stream": "true"},
+            json=[message.model_dump() for message in messages],
+            **self._options({"Accept": "application/x-ndjson"})
+        ) as response:
+            response.raise_for_status()
+            # Read raw chunks rather than lines, a response can exceed aiohttp's line length limit
+            buffer = b""
+            async for chunk in response.content.iter_any():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        yield MessageBatchItem.model_validate_json(line)
+            if buffer.strip():
+                yield MessageBatchItem.model_validate_json(buffer)
+
+    async def create_session(
+        self,
+        context: str = "",
+        history: Optional[List[MessageHistory]] = None
+    ) -> ConversationSession:
+        """
+        Start a conversation session on the agent.
+        
+        Args:
+            context: Default context for every message in the session
+            history: Transcript to start the session from
+        """
+        await self._ensure_session()
+        async with self.session.post(
+            self._get_url('/agent/sessions'),
+            json=SessionCreate(context=context, history=history).model_dump(),
+            **self._options()
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+            return ConversationSession(**data)
+
+    async def send_session_message(
+        self,
+        session_id: str,
+        message: str,
+        role: str = "user",
+        context: Optional[str] = None
+    ) -> AgentResponse:
+        """
+        Send only the next message of a conversation session.
+        
+        Returns:
+            AgentResponse whose memory holds only the entries added by this turn
+        """
+        await self._ensure_session()
+        async with self.session.post(
+            self._get_url(f'/agent/sessions/{session_id}/message'),
+            json=SessionMessage(message=message, role=role, context=context).model_dump(),
+            **self._options()
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise AgentClientError(f"Failed to send session message: {error_text}")
+            data = await response.json()
+            return AgentResponse(**data)
+
+    async def get_session(self, session_id: str) -> ConversationSession:
+        """Get a conversation session and its full transcript"""
+        await self._ensure_session()
+        async with self.session.get(
+            self._get_url(f'/agent/sessions/{session_id}'),
+            **self._options()
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise AgentClientError(f"Failed to get session: {error_text}")
+            data = await response.json()
+            return ConversationSession(**data)
+
+    async def delete_session(self, session_id: str) -> bool:
+        """End a conversation session, returning False if it no longer exists"""
+        await self._ensure_session()
+        async with self.session.delete(
+            self._get_url(f'/agent/sessions/{session_id}'),
+            **self._options()
+        ) as response:
+            if response.status == 404:
+                return False
+            response.raise_for_status()
+            return True
+            
     async def get_status(self) -> Dict[str, str]:
         """Get the agent's current status"""
         await self._ensure_session()
-        async with self.session.get(self._get_url('/agent/status')) as response:
+        async with self.session.get(self._get_url('/agent/status'), **self._options()) as response:
             response.raise_for_status()
             return await response.json()
             
-    async def process_work_request(self, work_request: WorkRequest) -> AgentResponse:
+    async def process_work_request(self, work_request: WorkRequest) -> WorkResult:
         """Send a work request to the agent"""
         await self._ensure_session()
         async with self.session.post(
             self._get_url('/agent/work-request'),
-            json=work_request.model_dump()
+            json=work_request.model_dump(),
+            **self._options()
         ) as response:
             response.raise_for_status()
             data = await response.json()
-            return AgentResponse(**data)
+            return WorkResult(**data)
             
     async def process_work_request_with_file(
         self, 
         work_request: WorkRequest,
         file: BinaryIO,
         filename: str,
-        content_type: str
+        content_type: str,
+        document_id: Optional[str] = None
     ) -> WorkResult:
-        """Send a work request with file to the agent"""
+        """Send a work request with file to the agent
+
+        document_id identifies what the file is a version of, such as a
+        candidate, for agents that keep documents across uploads.
+        """
         await self._ensure_session()
         
         # Prepare multipart form data
@@ -86,6 +259,8 @@ class HttpAgentClient(BaseAgentClient):
         data.add_field('content_type', content_type)
         data.add_field('task', work_request.task)
         data.add_field('context', work_request.context)
+        if document_id:
+            data.add_field('document_id', document_id)
 
         # Add the file
         data.add_field('file',
@@ -96,31 +271,64 @@ class HttpAgentClient(BaseAgentClient):
         async with self.session.post(
             self._get_url('/agent/work-request-with-file'),
             data=data,
+            **self._options()
         ) as response:
             response.raise_for_status()
             data = await response.json()
             return WorkResult(**data)
             
-    async def get_work_result(self, work_id: str) -> WorkResult:
+    async def get_work_result(self, work_id: str, wait: float = 0) -> WorkResult:
         """
         Get the result of an async work request.
         
         Args:
             work_id: The ID of the work request to check
+            wait: Seconds the server may hold the request open waiting for the
+                work to change state (long-poll), 0 to return immediately
             
         Returns:
             WorkResult object containing the status and result/error
         """
+        await self._ensure_session()
+        params = {"wait": wait} if wait > 0 else None
         async with self.session.get(
-            f"{self.base_url}/agent/work-result/{work_id}"
+            self._get_url(f'/agent/work-result/{work_id}'),
+            params=params,
+            **self._options()
         ) as response:
             if response.status != 200:
                 error_text = await response.text()
-                class AgentClientError(Exception):
-                    """Exception raised for errors in the agent client."""
-                    pass
-                
                 raise AgentClientError(f"Error getting work result: {error_text}")
                 
             result = await response.json()
-            return WorkResult(**result)
\ No newline at end of file
+            return WorkResult(**result)
+
+    async def wait_for_result(
+        self,
+        work_id: str,
+        timeout: Optional[float] = None,
+        poll_wait: float = 30
+    ) -> WorkResult:
+        """
+        Wait for an async work request to complete or fail using long-polling.
+        
+        Args:
+            work_id: The ID of the work request to wait for
+            timeout: Maximum total seconds to wait, None to wait indefinitely
+            poll_wait: Seconds each long-poll request may be held open by the server
+            
+        Returns:
+            The latest WorkResult, which is still pending or in progress only if
+            the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = poll_wait
+            if deadline is not None:
+                wait = min(wait, max(deadline - time.monotonic(), 0))
+
+            result = await self.get_work_result(work_id, wait=wait)
+            if result.status in (WorkStatus.COMPLETED, WorkStatus.FAILED):
+                return result
+            if deadline is not None and time.monotonic() >= deadline:
+                return result
\ No newline at end of file
@@ -0,0 +1,99 @@
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import aiohttp
+from .http import HttpAgentClient
+
+logger = logging.getLogger("evo_concierge")
+
+
+class AgentClientPool:
+    """Process-wide registry of HTTP agent clients.
+
+    Keeps one aiohttp session, and therefore one keep-alive connection pool and
+    DNS cache, per target base URL so that repeated and concurrent calls to the
+    same agent reuse open connections instead of opening a new one per request.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30,
+        request_timeout: float = 300,
+        connect_timeout: float = 10
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+        self._clients: Dict[str, HttpAgentClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "AgentClientPool":
+        """Create a pool configured from environment variables"""
+        return cls(
+            limit=int(os.getenv("AGENT_CLIENT_POOL_LIMIT", 100)),
+            limit_per_host=int(os.getenv("AGENT_CLIENT_POOL_LIMIT_PER_HOST", 20)),
+            dns_cache_ttl=int(os.getenv("AGENT_CLIENT_DNS_CACHE_TTL", 300)),
+            keepalive_timeout=float(os.getenv("AGENT_CLIENT_KEEPALIVE_TIMEOUT", 30)),
+            request_timeout=float(os.getenv("AGENT_CLIENT_REQUEST_TIMEOUT", 300)),
+            connect_timeout=float(os.getenv("AGENT_CLIENT_CONNECT_TIMEOUT", 10))
+        )
+
+    def get_client(self, base_url: str) -> HttpAgentClient:
+        """Get the shared client for an agent base URL
+
+        Must be called from within the running event loop. The returned client
+        must not be closed by the caller; use close() to release all connections.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sessions are bound to the loop they were created on
+            self._clients = {}
+            self._loop = loop
+
+        base_url = base_url.rstrip('/')
+        client = self._clients.get(base_url)
+        if client is None or client.session is None or client.session.closed:
+            client = HttpAgentClient(base_url, session=self._create_session())
+            self._clients[base_url] = client
+        return client
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.request_timeout,
+            connect=self.connect_timeout
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        """Close all pooled sessions"""
+        clients, self._clients = self._clients, {}
+        for base_url, client in clients.items():
+            if client.session and not client.session.closed:
+                logger.debug("Closing pooled session for %s", base_url)
+                await client.session.close()
+
+
+_default_pool: Optional[AgentClientPool] = None
+
+
+def get_agent_client_pool() -> AgentClientPool:
+    """Get the process-wide agent client pool"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = AgentClientPool.from_env()
+    return _default_pool
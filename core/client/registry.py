@@ -0,0 +1,229 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Collection, Dict, List, Optional
+from ..schemas import TargetAgentEnum
+from .http import HttpAgentClient
+from .pool import AgentClientPool, get_agent_client_pool
+import asyncio
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger("evo_concierge")
+
+
+class AgentEndpoint:
+    """One replica of a target agent and its health and load"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+        self.healthy = True
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class NoAgentEndpointError(Exception):
+    """Raised when no endpoint is configured for a target agent"""
+
+    def __init__(self, target: str):
+        self.target = target
+        super().__init__(f"No endpoints configured for agent {target}")
+
+
+class AgentEndpointRegistry:
+    """Health-aware load balancing across the replicas of each target agent.
+
+    Requests go to the healthy replica with the fewest outstanding requests.
+    A replica is ejected after failure_threshold consecutive failed requests or
+    health checks, and re-admitted as soon as a periodic /agent/status health
+    check succeeds again. If every replica of a target is ejected, requests are
+    spread over all of them rather than failing outright.
+    """
+
+    def __init__(
+        self,
+        endpoints: Dict[str, List[str]],
+        pool: Optional[AgentClientPool] = None,
+        health_check_interval: float = 10,
+        health_check_timeout: float = 2,
+        failure_threshold: int = 2
+    ):
+        self._endpoints: Dict[str, List[AgentEndpoint]] = {
+            target: [AgentEndpoint(url) for url in urls]
+            for target, urls in endpoints.items() if urls
+        }
+        self._pool = pool
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.failure_threshold = failure_threshold
+        self._health_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "AgentEndpointRegistry":
+        """Create a registry for every TargetAgentEnum value from environment variables
+
+        Replicas of a target are listed comma-separated in <TARGET>_BASE_URLS, for
+        example AGENT_CONCIERGE_BASE_URLS; <TARGET>_BASE_URL is used if unset.
+        """
+        endpoints = {}
+        for target in TargetAgentEnum:
+            urls = os.getenv(f"{target.value}_BASE_URLS") or os.getenv(f"{target.value}_BASE_URL") or ""
+            endpoints[target.value] = [url.strip() for url in urls.split(",") if url.strip()]
+        return cls(
+            endpoints,
+            health_check_interval=float(os.getenv("AGENT_REGISTRY_HEALTH_CHECK_INTERVAL", 10)),
+            health_check_timeout=float(os.getenv("AGENT_REGISTRY_HEALTH_CHECK_TIMEOUT", 2)),
+            failure_threshold=int(os.getenv("AGENT_REGISTRY_FAILURE_THRESHOLD", 2))
+        )
+
+    @property
+    def pool(self) -> AgentClientPool:
+        return self._pool or get_agent_client_pool()
+
+    def endpoints(self, target: str) -> List[AgentEndpoint]:
+        """All configured endpoints of a target agent"""
+        return list(self._endpoints.get(str(getattr(target, "value", target)), []))
+
+    def select(self, target: str, exclude: Collection[str] = ()) -> AgentEndpoint:
+        """Pick the healthy endpoint with the fewest outstanding requests
+
+        Args:
+            target: The target agent
+            exclude: Base URLs to skip, for example replicas that already failed a retried request
+
+        Raises:
+            NoAgentEndpointError: If the target has no configured endpoints
+        """
+        target = str(getattr(target, "value", target))
+        endpoints = self._endpoints.get(target)
+        if not endpoints:
+            raise NoAgentEndpointError(target)
+
+        endpoints = [e for e in endpoints if e.base_url not in exclude] or endpoints
+        candidates = [e for e in endpoints if e.healthy]
+        if not candidates:
+            logger.warning("All endpoints of %s are unhealthy, trying them anyway", target)
+            candidates = endpoints
+        fewest = min(e.outstanding for e in candidates)
+        return random.choice([e for e in candidates if e.outstanding == fewest])
+
+    @asynccontextmanager
+    async def acquire(self, target: str, exclude: Collection[str] = ()) -> AsyncIterator[HttpAgentClient]:
+        """Reserve an endpoint of a target agent for the duration of the block
+
+        Everything inside the block goes to the same replica, so it can be used
+        for multi-request exchanges such as conversation sessions. An exception
+        raised from the block counts as a failure of the replica. A block that
+        handles a failed request itself and reports it with record_failure is
+        not counted as a success.
+        """
+        self._ensure_health_checks()
+        endpoint = self.select(target, exclude)
+        endpoint.outstanding += 1
+        failures = endpoint.failures
+        try:
+            yield self.pool.get_client(endpoint.base_url)
+        except Exception as e:
+            self.record_failure(endpoint.base_url, e)
+            raise
+        else:
+            # A success must not clear failures recorded while the block ran
+            if endpoint.failures == failures:
+                self.record_success(endpoint.base_url)
+        finally:
+            endpoint.outstanding -= 1
+
+    def record_success(self, base_url: str):
+        """Note a successful request to an endpoint"""
+        for endpoint in self._find(base_url):
+            endpoint.consecutive_failures = 0
+
+    def record_failure(self, base_url: str, error: Exception):
+        """Note a failed request to an endpoint, ejecting it past the failure threshold"""
+        for endpoint in self._find(base_url):
+            endpoint.consecutive_failures += 1
+            endpoint.failures += 1
+            endpoint.last_error = str(error)
+            if endpoint.healthy and endpoint.consecutive_failures >= self.failure_threshold:
+                endpoint.healthy = False
+                logger.warning("Ejecting agent endpoint %s: %s", endpoint.base_url, error)
+
+    async def check_health(self):
+        """Check every endpoint's /agent/status once"""
+        endpoints = [e for targets in self._endpoints.values() for e in targets]
+        await asyncio.gather(*(self._check_endpoint(e) for e in endpoints))
+
+    async def _check_endpoint(self, endpoint: AgentEndpoint):
+        client = self.pool.get_client(endpoint.base_url)
+        endpoint.last_checked = time.time()
+        try:
+            await asyncio.wait_for(client.get_status(), self.health_check_timeout)
+        except Exception as e:
+            self.record_failure(endpoint.base_url, e)
+            return
+
+        endpoint.consecutive_failures = 0
+        endpoint.last_error = None
+        if not endpoint.healthy:
+            endpoint.healthy = True
+            logger.info("Re-admitting agent endpoint %s", endpoint.base_url)
+
+    def _find(self, base_url: str) -> List[AgentEndpoint]:
+        base_url = base_url.rstrip('/')
+        return [e for targets in self._endpoints.values() for e in targets if e.base_url == base_url]
+
+    def _ensure_health_checks(self):
+        if self.health_check_interval <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        if self._health_task is None or self._health_task.done() or self._health_task.get_loop() is not loop:
+            self._health_task = loop.create_task(self._health_check_loop())
+
+    async def _health_check_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.warning("Agent endpoint health check failed: %s", e)
+
+    async def close(self):
+        """Stop the background health checks"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+            self._health_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the health and load of every endpoint"""
+        return {
+            target: [e.get_stats() for e in endpoints]
+            for target, endpoints in self._endpoints.items()
+        }
+
+
+_default_registry: Optional[AgentEndpointRegistry] = None
+
+
+def get_agent_registry() -> AgentEndpointRegistry:
+    """Get the process-wide agent endpoint registry"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = AgentEndpointRegistry.from_env()
+    return _default_registry
@@ -0,0 +1,87 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Any
+import asyncio
+import logging
+
+logger = logging.getLogger("evo_concierge")
+
+
+class EmbeddingMicroBatcher:
+    """Coalesces concurrent single-text embedding requests into batch requests.
+
+    Texts submitted within max_wait_ms of the first pending text are sent
+    together in one embed_batch call of at most max_batch_size texts. Each
+    caller receives the embedding for its own text.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = 256,
+        max_wait_ms: float = 5
+    ):
+        self._embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._batches = 0
+        self._texts = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a single text as part of the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical texts in a batch are embedded once
+        positions: Dict[str, int] = {}
+        texts: List[str] = []
+        for text, _ in batch:
+            if text not in positions:
+                positions[text] = len(texts)
+                texts.append(text)
+
+        self._batches += 1
+        self._texts += len(batch)
+        try:
+            embeddings = await self._embed_batch(texts)
+        except Exception as e:
+            logger.warning("Embedding batch of %d texts failed: %s", len(texts), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future in batch:
+            if not future.done():
+                future.set_result(embeddings[positions[text]])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        return {
+            "batches": self._batches,
+            "texts": self._texts,
+            "avg_batch_size": self._texts / self._batches if self._batches else 0.0,
+        }
@@ -0,0 +1,255 @@
+from typing import Any, Dict, List, Optional, Sequence
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    MessageRole,
+)
+from llama_index.llms.openai import OpenAI
+from openai.types.chat.chat_completion_message_tool_call import ChatCompletionMessageToolCall, Function
+from pydantic import PrivateAttr
+from .azure_openai_llm import AzureOpenAILLM
+import asyncio
+import hashlib
+import httpx
+import json
+import math
+import os
+import random
+import secrets
+import time
+import openai
+
+_FILLER_WORDS = (
+    "the", "agent", "reviewed", "your", "request", "and", "found", "several", "relevant",
+    "details", "about", "skills", "experience", "projects", "that", "match", "what", "you", "asked",
+)
+
+
+def sample_from_schema(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None) -> Any:
+    """Smallest plausible value matching a JSON schema, using defaults where given"""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return sample_from_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "default" in schema:
+        return schema["default"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [o for o in schema[key] if o.get("type") != "null"] or schema[key]
+            return sample_from_schema(options[0], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    schema_type = schema.get("type", "string")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+    if schema_type == "object":
+        return {
+            name: sample_from_schema(prop, defs)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if schema_type == "array":
+        return [sample_from_schema(schema.get("items", {}), defs)] * max(1, schema.get("minItems", 1))
+    if schema_type == "integer":
+        return max(1, schema.get("minimum", 1))
+    if schema_type == "number":
+        return float(max(1, schema.get("minimum", 1)))
+    if schema_type == "boolean":
+        return True
+    if schema_type == "null":
+        return None
+    return "Simulated text"
+
+
+class FakeChatModel(OpenAI):
+    """llama-index OpenAI model that simulates responses instead of calling the API.
+
+    Every response waits latency seconds (varied by latency_jitter) for its
+    first token, then produces completion_tokens tokens at tokens_per_second.
+    A request fails with a throttled (429) response with probability
+    error_rate, asking to retry after retry_after seconds. Requests offering
+    tools get a call to the first tool with arguments generated from its
+    schema, so structured output and function calling work.
+    """
+
+    latency: float = 0.2
+    latency_jitter: float = 0.1
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 60
+    error_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+    _random: random.Random = PrivateAttr(default_factory=random.Random)
+
+    def __init__(self, **kwargs: Any):
+        kwargs.setdefault("api_key", "fake")
+        super().__init__(**kwargs)
+        self._random = random.Random(self.seed)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "fake_chat_model"
+
+    def _maybe_fail(self):
+        if self.error_rate and self._random.random() < self.error_rate:
+            request = httpx.Request("POST", "https://fake-llm.local/chat/completions")
+            response = httpx.Response(
+                429, headers={"retry-after-ms": str(int(self.retry_after * 1000))}, request=request
+            )
+            raise openai.RateLimitError("Simulated rate limit", response=response, body=None)
+
+    def _first_token_delay(self) -> float:
+        jitter = self.latency * self.latency_jitter * self._random.uniform(-1, 1)
+        return max(0.0, self.latency + jitter)
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _tokens(self, messages: Sequence[ChatMessage]) -> List[str]:
+        # The wording depends only on the prompt, so identical requests get identical responses
+        offset = int(hashlib.sha256((messages[-1].content or "").encode("utf-8")).hexdigest()[:8], 16)
+        return [
+            _FILLER_WORDS[(offset + i) % len(_FILLER_WORDS)] + " "
+            for i in range(self.completion_tokens)
+        ]
+
+    def _response(self, messages: Sequence[ChatMessage], tools: Optional[List[Dict[str, Any]]]) -> ChatResponse:
+        if tools:
+            function = tools[0]["function"]
+            tool_call = ChatCompletionMessageToolCall(
+                id=f"call_{secrets.token_hex(8)}",
+                type="function",
+                function=Function(
+                    name=function["name"],
+                    arguments=json.dumps(sample_from_schema(function.get("parameters", {})))
+                )
+            )
+            message = ChatMessage(
+                role=MessageRole.ASSISTANT, content="", additional_kwargs={"tool_calls": [tool_call]}
+            )
+        else:
+            message = ChatMessage(role=MessageRole.ASSISTANT, content="".join(self._tokens(messages)).strip())
+        return ChatResponse(message=message)
+
+    def _response_delay(self) -> float:
+        return self._first_token_delay() + self.completion_tokens * self._token_delay()
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        self._maybe_fail()
+        time.sleep(self._response_delay())
+        return self._response(messages, kwargs.get("tools"))
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        self._maybe_fail()
+        await asyncio.sleep(self._response_delay())
+        return self._response(messages, kwargs.get("tools"))
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        self._maybe_fail()
+
+        def gen() -> ChatResponseGen:
+            time.sleep(self._first_token_delay())
+            content = ""
+            for token in self._tokens(messages):
+                time.sleep(self._token_delay())
+                content += token
+                yield ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=content), delta=token)
+
+        return gen()
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        self._maybe_fail()
+
+        async def gen() -> ChatResponseAsyncGen:
+            await asyncio.sleep(self._first_token_delay())
+            content = ""
+            for token in self._tokens(messages):
+                await asyncio.sleep(self._token_delay())
+                content += token
+                yield ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=content), delta=token)
+
+        return gen()
+
+
+class FakeLLM(AzureOpenAILLM):
+    """Azure OpenAI LLM whose model and embedding calls are simulated locally.
+
+    Requests take the same path as with AzureOpenAILLM, through the response
+    cache, request coalescing, the rate limiter and its retries, so the
+    services can be load tested without spending Azure quota. The simulation
+    is configured with the model_config keys latency, latency_jitter,
+    tokens_per_second, completion_tokens, error_rate, retry_after, seed,
+    embedding_latency and embedding_dimensions; see fake_llm_config_from_env.
+    """
+    llm: FakeChatModel
+
+    def __init__(self, model_config: Dict[str, Any]):
+        super().__init__({
+            **model_config,
+            "model": model_config.get("model") or "gpt-4o",
+            "deployment_name": model_config.get("deployment_name") or "fake",
+            "embedding_deployment_name": model_config.get("embedding_deployment_name") or "fake-embedding",
+        })
+        self.embedding_latency = float(self.model_config.get("embedding_latency", 0.02))
+        self.embedding_dimensions = int(self.model_config.get("embedding_dimensions", 256))
+
+    def _create_chat_model(self) -> FakeChatModel:
+        settings = {
+            key: self.model_config[key]
+            for key in (
+                "latency", "latency_jitter", "tokens_per_second", "completion_tokens",
+                "error_rate", "retry_after", "seed"
+            )
+            if self.model_config.get(key) is not None
+        }
+        return FakeChatModel(
+            model=self.model_config["model"],
+            temperature=self.model_config.get("temperature", .25),
+            max_retries=0,
+            **settings
+        )
+
+    def validate_config(self) -> bool:
+        # No endpoint or credentials are needed, and __init__ fills in the model and deployments
+        return True
+
+    async def _embed_request(self, texts: List[str]) -> List[List[float]]:
+        with self.observe_request("embedding"):
+            await asyncio.sleep(self.embedding_latency)
+        return [self._embedding(text) for text in texts]
+
+    def _embedding(self, text: str) -> List[float]:
+        # Deterministic unit vector, so the same text always embeds the same way
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vector = [rng.gauss(0, 1) for _ in range(self.embedding_dimensions)]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+def fake_llm_config_from_env(prefix: str = "FAKE_LLM_") -> Dict[str, Any]:
+    """Read FakeLLM simulation settings from environment variables
+
+    FAKE_LLM_LATENCY_MS (time to first token), FAKE_LLM_LATENCY_JITTER,
+    FAKE_LLM_TOKENS_PER_SECOND, FAKE_LLM_COMPLETION_TOKENS, FAKE_LLM_ERROR_RATE,
+    FAKE_LLM_RETRY_AFTER_MS, FAKE_LLM_SEED, FAKE_LLM_EMBEDDING_LATENCY_MS and
+    FAKE_LLM_EMBEDDING_DIMENSIONS; unset ones keep their defaults.
+    """
+    config: Dict[str, Any] = {}
+    for name, key, convert in [
+        ("LATENCY_MS", "latency", lambda v: float(v) / 1000),
+        ("LATENCY_JITTER", "latency_jitter", float),
+        ("TOKENS_PER_SECOND", "tokens_per_second", float),
+        ("COMPLETION_TOKENS", "completion_tokens", int),
+        ("ERROR_RATE", "error_rate", float),
+        ("RETRY_AFTER_MS", "retry_after", lambda v: float(v) / 1000),
+        ("SEED", "seed", int),
+        ("EMBEDDING_LATENCY_MS", "embedding_latency", lambda v: float(v) / 1000),
+        ("EMBEDDING_DIMENSIONS", "embedding_dimensions", int),
+    ]:
+        if os.getenv(prefix + name):
+            config[key] = convert(os.getenv(prefix + name))
+    return config
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+from pathlib import Path
+from .chunking import chunk_text, LexicalChunkRanker
+import aiofiles
+import aiofiles.os
+import asyncio
+import logging
+import os
+from .metrics import REGISTRY
+
+logger = logging.getLogger("evo_concierge")
+
+FILE_CACHE_REQUESTS = REGISTRY.counter("file_cache_requests_total", "File content cache lookups", ["result"])
+
+
+class CachedFile:
+    """Decoded content of a file, split into chunks with a lexical ranker"""
+
+    def __init__(self, path: str, text: str, chunk_size: int, chunk_overlap: int):
+        self.path = path
+        self.text = text
+        self.chunks = chunk_text(text, chunk_size, chunk_overlap)
+        self.ranker = LexicalChunkRanker(self.chunks)
+        self.length = len(text)
+        # Approximate memory held by the entry: the text, its chunks and the ranker's term tables
+        self.memory_bytes = len(text) + sum(len(chunk) for chunk in self.chunks) + self.ranker.estimated_bytes()
+
+    def select(self, query: str, max_chunks: int, max_chars: int) -> List[str]:
+        """Choose the content to place in a prompt for a query about this file
+
+        Files up to max_chars are returned whole. Otherwise the best matching
+        chunks are returned in document order, at most max_chunks of them.
+        """
+        if self.length <= max_chars:
+            return [self.text]
+        selected = self.ranker.top_k(query, max_chunks)
+        return [self.chunks[i] for i in sorted(selected)]
+
+
+class FileContentCache:
+    """LRU cache of decoded, chunked file contents.
+
+    Entries are revalidated against the file's modification time and size on
+    every lookup, so edits on disk are picked up, and the least recently used
+    entries are evicted once the estimated memory held by the cached text,
+    chunks and term statistics exceeds max_bytes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        chunk_size: int = 1500,
+        chunk_overlap: int = 200
+    ):
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], CachedFile]]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "FileContentCache":
+        """Create a cache configured from environment variables"""
+        return cls(
+            max_bytes=int(os.getenv("FILE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            chunk_size=int(os.getenv("FILE_CHUNK_SIZE", 1500)),
+            chunk_overlap=int(os.getenv("FILE_CHUNK_OVERLAP", 200))
+        )
+
+    async def get(self, path: str) -> CachedFile:
+        """Get a file's content, reading it only if it is not cached or has changed
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            UnicodeDecodeError: If the file is not valid UTF-8
+        """
+        key = str(Path(path).resolve())
+        stat = await aiofiles.os.stat(key)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == signature:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            FILE_CACHE_REQUESTS.labels("hit").inc()
+            return entry[1]
+
+        self.misses += 1
+        FILE_CACHE_REQUESTS.labels("miss").inc()
+        async with aiofiles.open(key, "r", encoding="utf-8") as f:
+            text = await f.read()
+        # Chunking and term statistics are CPU-bound, keep them off the event loop
+        cached = await asyncio.to_thread(
+            CachedFile, key, text, self.chunk_size, self.chunk_overlap
+        )
+        self._store(key, signature, cached)
+        return cached
+
+    def invalidate(self, path: str):
+        """Drop a file from the cache"""
+        entry = self._entries.pop(str(Path(path).resolve()), None)
+        if entry is not None:
+            self._total_bytes -= entry[1].memory_bytes
+
+    def _store(self, key: str, signature: Tuple[int, int], cached: CachedFile):
+        self.invalidate(key)
+        if cached.memory_bytes > self.max_bytes:
+            logger.debug("Not caching %s, %d bytes exceeds the cache size", key, cached.memory_bytes)
+            return
+
+        self._entries[key] = (signature, cached)
+        self._total_bytes += cached.memory_bytes
+        while self._total_bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted.memory_bytes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,15 +1,48 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Iterator, Sequence, TypeVar
+from llama_index.core.base.llms.types import ChatMessage
+from .llm_cache import LLMResponseCache
+from .token_budget import count_message_tokens, count_tokens, record_token_usage
+from .single_flight import SingleFlight
+from .metrics import REGISTRY
+from .tracing import start_span
+import asyncio
+import time
+
+T = TypeVar("T")
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds",
+    "LLM request latency, including throttling and retries",
+    ["model", "operation", "outcome"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total",
+    "Tokens of completed LLM calls",
+    ["model", "kind"]
+)
 
 class BaseLLM(ABC):
     """Abstract base class for LLM implementations"""
-    
+
+    # Underlying llama-index LLM, for implementations that wrap one
+    llm: Any = None
+
     @abstractmethod
     def __init__(self, model_config: Dict[str, Any]):
-        """Initialize the LLM with configuration"""
+        """Initialize the LLM with configuration
+
+        An optional model_config["cache"] dict enables the response cache, see
+        LLMResponseCache.from_config.
+        """
         self.model_config = model_config
         self.is_initialized = False
-    
+        self.cache: Optional[LLMResponseCache] = LLMResponseCache.from_config(
+            model_config.get("cache")
+        )
+        self.single_flight = SingleFlight()
+
     @abstractmethod
     async def generate(
         self,
@@ -21,7 +54,7 @@ class BaseLLM(ABC):
     ) -> str:
         """Generate a completion for the given prompt"""
         pass
-    
+
     @abstractmethod
     async def generate_chat(
         self,
@@ -33,18 +66,120 @@ class BaseLLM(ABC):
     ) -> str:
         """Generate a chat completion for the given messages"""
         pass
-    
+
     @abstractmethod
     async def embed(self, text: str) -> List[float]:
         """Generate embeddings for the given text"""
         pass
-    
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts, returned in the same order
+
+        Implementations whose provider accepts multiple inputs per request
+        should override this; the default embeds each text concurrently.
+        """
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
     @property
     @abstractmethod
     def token_limit(self) -> int:
         """Return the maximum token limit for the model"""
         pass
-    
+
     def validate_config(self) -> bool:
         """Validate the model configuration"""
-        return True 
\ No newline at end of file
+        return True
+
+    def cache_identity(self) -> Dict[str, Any]:
+        """Model settings that distinguish this LLM's responses in the response cache"""
+        return {
+            key: self.model_config.get(key)
+            for key in ("deployment_name", "model", "temperature")
+        }
+
+    async def execute_chat(
+        self,
+        messages: Sequence[ChatMessage],
+        producer: Callable[[Any], Awaitable[str]],
+        **params
+    ) -> str:
+        """Run a chat completion through the response cache
+
+        Identical requests arriving while one is in flight share its response.
+
+        Args:
+            messages: The complete messages sent to the model, used as the cache key
+            producer: Called with the underlying llama-index LLM to produce the
+                response on a cache miss
+            params: Call parameters that affect the response, part of the cache key
+
+        Returns:
+            The response text
+        """
+        return await self.coalesce(
+            messages, params, lambda: self._execute_chat(messages, producer, params)
+        )
+
+    async def coalesce(
+        self,
+        messages: Sequence[ChatMessage],
+        params: Dict[str, Any],
+        call: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Run a request, or wait for an identical one already in flight
+
+        Requests are identical when this LLM's cache identity, the messages and
+        params match. Usage is recorded only by the request that made the call.
+        """
+        key = LLMResponseCache.make_key(self.cache_identity(), messages, params)
+        return await self.single_flight.do(key, call)
+
+    async def _execute_chat(
+        self,
+        messages: Sequence[ChatMessage],
+        producer: Callable[[Any], Awaitable[str]],
+        params: Dict[str, Any]
+    ) -> str:
+        if self.cache is None:
+            response = await self._invoke_chat(messages, producer)
+            self.record_usage(messages, response)
+            return response
+
+        cached, lookup_state = await self.cache.lookup(self, messages, params)
+        if cached is not None:
+            return cached
+
+        response = await self._invoke_chat(messages, producer)
+        self.record_usage(messages, response)
+        self.cache.store(lookup_state, response)
+        return response
+
+    def record_usage(self, messages: Sequence[ChatMessage], response: str):
+        """Count a completed call's tokens towards the request's token usage"""
+        model = self.model_config.get("model")
+        prompt_tokens = count_message_tokens(messages, model)
+        completion_tokens = count_tokens(response, model)
+        record_token_usage(prompt_tokens, completion_tokens)
+        LLM_TOKENS.labels(model or "unknown", "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(model or "unknown", "completion").inc(completion_tokens)
+
+    @contextmanager
+    def observe_request(self, operation: str) -> Iterator[None]:
+        """Trace a model request made within the block and record its latency and outcome"""
+        model = self.model_config.get("model") or "unknown"
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with start_span(f"llm.{operation}", model=model):
+                yield
+            outcome = "ok"
+        finally:
+            LLM_REQUEST_SECONDS.labels(model, operation, outcome).observe(time.perf_counter() - start)
+
+    async def _invoke_chat(
+        self,
+        messages: Sequence[ChatMessage],
+        producer: Callable[[Any], Awaitable[str]]
+    ) -> str:
+        """Call the model for a chat completion that was not served from the cache"""
+        return await producer(self.llm)
@@ -0,0 +1,353 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+from pathlib import Path
+from llama_index.core.base.llms.types import ChatMessage
+import numpy as np
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from .metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from .llm_base import BaseLLM
+
+logger = logging.getLogger("evo_concierge")
+
+LLM_CACHE_REQUESTS = REGISTRY.counter("llm_cache_requests_total", "LLM response cache lookups", ["result"])
+
+
+def _message_key(messages: Sequence[ChatMessage]) -> List[Tuple[str, str]]:
+    return [(str(getattr(m.role, "value", m.role)), m.content or "") for m in messages]
+
+
+def _hash(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExactResponseCache:
+    """LRU cache of responses keyed by request hash, optionally persisted to disk.
+
+    Persistence is an append-only JSON lines file that is replayed on startup and
+    compacted when it grows well beyond the cache size. Writes and compactions
+    are handed to a background thread, so storing a response never waits on disk.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 24 * 60 * 60,
+        persist_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._persisted_lines = 0
+        self._writes: "queue.Queue[Optional[Tuple[str, Any]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        if self.persist_path:
+            self._load()
+            self._writer = threading.Thread(target=self._write_loop, name="llm-cache-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        response, stored_at = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: str):
+        stored_at = time.time()
+        self._entries[key] = (response, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        if self._writer is not None:
+            self._append(key, response, stored_at)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def flush(self):
+        """Wait until the queued writes are on disk"""
+        self._writes.join()
+
+    def close(self):
+        """Write the queued records and stop the writer thread"""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _load(self):
+        if not self.persist_path.exists():
+            return
+
+        now = time.time()
+        with self.persist_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                self._persisted_lines += 1
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if now - record["stored_at"] > self.ttl_seconds:
+                    continue
+                self._entries[record["key"]] = (record["response"], record["stored_at"])
+                self._entries.move_to_end(record["key"])
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        logger.info("Loaded %d cached LLM responses from %s", len(self._entries), self.persist_path)
+        if self._persisted_lines > 2 * max(len(self._entries), 1):
+            self._rewrite(list(self._entries.items()))
+            self._persisted_lines = len(self._entries)
+
+    def _append(self, key: str, response: str, stored_at: float):
+        self._writes.put(("append", (key, response, stored_at)))
+        self._persisted_lines += 1
+        if self._persisted_lines > 2 * self.max_entries:
+            # The writer rewrites the file from this snapshot, after the appends queued before it
+            self._writes.put(("compact", list(self._entries.items())))
+            self._persisted_lines = len(self._entries)
+
+    def _write_loop(self):
+        while True:
+            item = self._writes.get()
+            try:
+                if item is None:
+                    return
+                kind, payload = item
+                if kind == "append":
+                    self._append_record(*payload)
+                else:
+                    self._rewrite(payload)
+            except Exception as e:
+                logger.warning("Could not persist LLM response cache to %s: %s", self.persist_path, e)
+            finally:
+                self._writes.task_done()
+
+    def _append_record(self, key: str, response: str, stored_at: float):
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.persist_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "response": response, "stored_at": stored_at}) + "\n")
+
+    def _rewrite(self, records: List[Tuple[str, Tuple[str, float]]]):
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            for key, (response, stored_at) in records:
+                f.write(json.dumps({"key": key, "response": response, "stored_at": stored_at}) + "\n")
+        os.replace(tmp_path, self.persist_path)
+
+
+class SemanticResponseCache:
+    """Cache that reuses responses to semantically similar questions.
+
+    Entries are grouped by scope, a hash of everything in the request except the
+    last message, so a response is only reused when the model, parameters,
+    system prompt and history are identical and the final question is similar.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 1024,
+        ttl_seconds: float = 24 * 60 * 60
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # scope -> list of (normalized embedding, response, stored_at)
+        self._entries: "OrderedDict[str, List[Tuple[np.ndarray, str, float]]]" = OrderedDict()
+        self._count = 0
+
+    def get(self, scope: str, embedding: List[float]) -> Optional[str]:
+        entries = self._entries.get(scope)
+        if not entries:
+            return None
+
+        now = time.time()
+        live = [e for e in entries if now - e[2] <= self.ttl_seconds]
+        self._count -= len(entries) - len(live)
+        if not live:
+            del self._entries[scope]
+            return None
+        self._entries[scope] = live
+
+        query = self._normalize(embedding)
+        matrix = np.stack([e[0] for e in live])
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        self._entries.move_to_end(scope)
+        return live[best][1]
+
+    def put(self, scope: str, embedding: List[float], response: str):
+        self._entries.setdefault(scope, []).append(
+            (self._normalize(embedding), response, time.time())
+        )
+        self._entries.move_to_end(scope)
+        self._count += 1
+
+        while self._count > self.max_entries and self._entries:
+            oldest_scope, entries = next(iter(self._entries.items()))
+            entries.pop(0)
+            self._count -= 1
+            if not entries:
+                del self._entries[oldest_scope]
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class LLMResponseCache:
+    """Two-tier response cache for chat completions.
+
+    The exact tier answers requests whose model, parameters and messages hash
+    identically. The optional semantic tier answers requests that only differ
+    in the wording of the last message, using the LLM's embeddings.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 24 * 60 * 60,
+        persist_path: Optional[str] = None,
+        semantic_enabled: bool = False,
+        semantic_threshold: float = 0.95,
+        semantic_max_entries: int = 1024
+    ):
+        self.exact = ExactResponseCache(max_entries, ttl_seconds, persist_path)
+        self.semantic = SemanticResponseCache(
+            semantic_threshold, semantic_max_entries, ttl_seconds
+        ) if semantic_enabled else None
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["LLMResponseCache"]:
+        """Create a cache from an LLM model_config "cache" entry, or None if disabled"""
+        if not config or not config.get("enabled"):
+            return None
+        return cls(
+            max_entries=int(config.get("max_entries", 1024)),
+            ttl_seconds=float(config.get("ttl_seconds", 24 * 60 * 60)),
+            persist_path=config.get("persist_path"),
+            semantic_enabled=bool(config.get("semantic_enabled", False)),
+            semantic_threshold=float(config.get("semantic_threshold", 0.95)),
+            semantic_max_entries=int(config.get("semantic_max_entries", 1024))
+        )
+
+    @staticmethod
+    def make_key(identity: Dict[str, Any], messages: Sequence[ChatMessage], params: Dict[str, Any]) -> str:
+        """Hash of the model identity, messages and call parameters"""
+        return _hash(identity, _message_key(messages), params)
+
+    async def lookup(
+        self,
+        llm: "BaseLLM",
+        messages: Sequence[ChatMessage],
+        params: Dict[str, Any]
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Look up a cached response
+
+        Returns:
+            Tuple containing:
+                - response: The cached response, or None on a miss
+                - lookup_state: State to pass to store() after a miss
+        """
+        identity = llm.cache_identity()
+        key = self.make_key(identity, messages, params)
+        response = self.exact.get(key)
+        if response is not None:
+            self.exact_hits += 1
+            LLM_CACHE_REQUESTS.labels("exact_hit").inc()
+            return response, {}
+
+        state: Dict[str, Any] = {"key": key}
+        if self.semantic is not None and messages and messages[-1].content:
+            scope = _hash(identity, _message_key(messages[:-1]), params)
+            try:
+                embedding = await llm.embed(messages[-1].content)
+            except Exception as e:
+                logger.warning("Semantic cache lookup skipped, embedding failed: %s", e)
+            else:
+                state.update(scope=scope, embedding=embedding)
+                response = self.semantic.get(scope, embedding)
+                if response is not None:
+                    self.semantic_hits += 1
+                    LLM_CACHE_REQUESTS.labels("semantic_hit").inc()
+                    self.exact.put(key, response)
+                    return response, state
+
+        self.misses += 1
+        LLM_CACHE_REQUESTS.labels("miss").inc()
+        return None, state
+
+    def store(self, lookup_state: Dict[str, Any], response: str):
+        """Store a response computed after a cache miss"""
+        if "key" in lookup_state:
+            self.exact.put(lookup_state["key"], response)
+        if self.semantic is not None and "embedding" in lookup_state:
+            self.semantic.put(lookup_state["scope"], lookup_state["embedding"], response)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "exact_entries": len(self.exact),
+            "semantic_entries": len(self.semantic) if self.semantic is not None else 0,
+        }
+
+
+def llm_cache_config_from_env(prefix: str = "LLM_CACHE_") -> Dict[str, Any]:
+    """Read LLM cache settings from environment variables
+
+    LLM_CACHE_ENABLED turns the cache on. LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_PERSIST_PATH, LLM_CACHE_SEMANTIC_ENABLED, LLM_CACHE_SEMANTIC_THRESHOLD
+    and LLM_CACHE_SEMANTIC_MAX_ENTRIES tune it.
+    """
+    def flag(name: str) -> bool:
+        return os.getenv(prefix + name, "false").lower() == "true"
+
+    config: Dict[str, Any] = {
+        "enabled": flag("ENABLED"),
+        "semantic_enabled": flag("SEMANTIC_ENABLED"),
+    }
+    for name, key in [
+        ("MAX_ENTRIES", "max_entries"),
+        ("TTL_SECONDS", "ttl_seconds"),
+        ("PERSIST_PATH", "persist_path"),
+        ("SEMANTIC_THRESHOLD", "semantic_threshold"),
+        ("SEMANTIC_MAX_ENTRIES", "semantic_max_entries"),
+    ]:
+        if os.getenv(prefix + name):
+            config[key] = os.getenv(prefix + name)
+    return config
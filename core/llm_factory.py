@@ -0,0 +1,56 @@
+from typing import Any, Dict, List
+from .llm_base import BaseLLM
+import os
+import re
+
+
+def create_llm(model_config: Dict[str, Any]) -> BaseLLM:
+    """Create the LLM selected by LLM_BACKEND
+
+    "azure" (the default) creates an AzureOpenAILLM. "fake" creates a FakeLLM
+    that simulates Azure OpenAI locally, configured by the FAKE_LLM_*
+    variables, for load tests and development without Azure credentials.
+
+    If AZURE_OPENAI_DEPLOYMENTS lists several deployments, an LLMRouter
+    spreading requests over one such LLM per deployment is created instead.
+    """
+    deployments = deployment_configs_from_env(model_config)
+    if len(deployments) > 1:
+        from .llm_router import LLMRouter, llm_router_config_from_env
+        # The router caches responses and fails over instead of retrying, the deployments do neither
+        llms = [_create_backend({**config, "cache": None, "max_retries": 0}) for config in deployments]
+        return LLMRouter({**model_config, **llm_router_config_from_env()}, llms)
+    return _create_backend(deployments[0] if deployments else model_config)
+
+
+def _create_backend(model_config: Dict[str, Any]) -> BaseLLM:
+    backend = os.getenv("LLM_BACKEND", "azure").lower()
+    if backend == "azure":
+        from .azure_openai_llm import AzureOpenAILLM
+        return AzureOpenAILLM(model_config)
+    if backend == "fake":
+        from .fake_llm import FakeLLM, fake_llm_config_from_env
+        return FakeLLM({**model_config, **fake_llm_config_from_env()})
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+
+
+def deployment_configs_from_env(model_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One model config per deployment listed comma-separated in AZURE_OPENAI_DEPLOYMENTS
+
+    A deployment in another Azure resource sets AZURE_OPENAI_<NAME>_ENDPOINT and
+    AZURE_OPENAI_<NAME>_API_KEY, <NAME> being the deployment name upper-cased
+    with other characters than letters and digits replaced by underscores.
+    """
+    configs = []
+    for name in os.getenv("AZURE_OPENAI_DEPLOYMENTS", "").split(","):
+        name = name.strip()
+        if not name:
+            continue
+        key = re.sub(r"[^A-Z0-9]", "_", name.upper())
+        config = {**model_config, "deployment_name": name}
+        if os.getenv(f"AZURE_OPENAI_{key}_ENDPOINT"):
+            config["api_base"] = os.getenv(f"AZURE_OPENAI_{key}_ENDPOINT")
+        if os.getenv(f"AZURE_OPENAI_{key}_API_KEY"):
+            config["api_key"] = os.getenv(f"AZURE_OPENAI_{key}_API_KEY")
+        configs.append(config)
+    return configs
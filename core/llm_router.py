@@ -0,0 +1,379 @@
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, TypeVar
+from llama_index.core.base.llms.types import ChatMessage
+from .llm_base import BaseLLM
+from .metrics import REGISTRY
+from .rate_limiter import retry_after_seconds
+from .token_budget import count_tokens
+import asyncio
+import logging
+import os
+import time
+import openai
+
+logger = logging.getLogger("evo_concierge")
+
+LLM_HEDGED_REQUESTS = REGISTRY.counter(
+    "llm_hedged_requests_total",
+    "LLM requests duplicated to a second deployment for being slow, by which attempt answered first",
+    ["winner"]
+)
+LLM_FAILOVERS = REGISTRY.counter(
+    "llm_failovers_total",
+    "LLM requests retried on another deployment after failing",
+    ["deployment"]
+)
+
+T = TypeVar("T")
+
+# Deployment that answered the current request, for record_usage
+_served_by: ContextVar[Optional["Deployment"]] = ContextVar("llm_served_by", default=None)
+
+
+class LatencyTracker:
+    """Recent latencies of one kind of request to one deployment"""
+
+    def __init__(self, window: int = 200, alpha: float = 0.2):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.alpha = alpha
+        self.average: Optional[float] = None
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.average = seconds if self.average is None else (
+            self.alpha * seconds + (1 - self.alpha) * self.average
+        )
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class Deployment:
+    """One deployment behind an LLMRouter, with its latency and failure history"""
+
+    def __init__(self, llm: BaseLLM):
+        self.llm = llm
+        self.name = llm.model_config.get("deployment_name") or f"deployment-{id(llm)}"
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.unavailable_until = 0.0
+        self.hedges_won = 0
+        self.last_error: Optional[str] = None
+
+    def tracker(self, operation: str) -> LatencyTracker:
+        tracker = self.latency.get(operation)
+        if tracker is None:
+            tracker = self.latency[operation] = LatencyTracker()
+        return tracker
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.consecutive_failures,
+            "available": time.monotonic() >= self.unavailable_until,
+            "hedges_won": self.hedges_won,
+            "last_error": self.last_error,
+            "latency_ms": {
+                operation: {
+                    "average": round(tracker.average * 1000, 1) if tracker.average is not None else None,
+                    "p95": round(tracker.percentile(95) * 1000, 1) if tracker.samples else None,
+                    "samples": len(tracker.samples),
+                }
+                for operation, tracker in self.latency.items()
+            },
+        }
+
+
+class LLMRouter(BaseLLM):
+    """Routes requests across several deployments of the same model.
+
+    Each request goes first to the deployment with the lowest recent average
+    latency for that kind of request. If it has not answered within the
+    deployment's hedge_percentile latency, the request is duplicated to the
+    next best deployment and whichever answers first wins; the other attempt
+    is cancelled. A failed attempt fails over to the next deployment, and a
+    deployment failing failure_threshold times in a row is skipped for
+    cooldown seconds. Streaming requests are not hedged, since their call
+    returns before the response is generated.
+
+    The deployments are complete LLMs, each with its own rate limiter; the
+    response cache and request coalescing are the router's. Deployments
+    should not retry (create_llm sets their max_retries to 0): a throttled or
+    failing request fails over at once, and a throttled deployment is skipped
+    for as long as its Retry-After header asks.
+    """
+
+    def __init__(self, model_config: Dict[str, Any], llms: List[BaseLLM]):
+        if not llms:
+            raise ValueError("LLMRouter needs at least one deployment")
+        super().__init__(model_config)
+        self.deployments = [Deployment(llm) for llm in llms]
+        # Callers using the llama-index LLM directly get the first deployment
+        self.llm = llms[0].llm
+
+        self.hedge_percentile = float(model_config.get("hedge_percentile", 95))
+        self.hedge_min_delay = float(model_config.get("hedge_min_delay", 0.1))
+        self.hedge_max_delay = float(model_config.get("hedge_max_delay", 10.0))
+        self.hedge_min_samples = int(model_config.get("hedge_min_samples", 10))
+        self.hedge_operations = set(model_config.get("hedge_operations", ("chat", "structured")))
+        self.failure_threshold = int(model_config.get("failure_threshold", 3))
+        self.cooldown = float(model_config.get("cooldown", 30.0))
+
+        self.hedged_requests = 0
+        self.failovers = 0
+        self.is_initialized = True
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        stop_sequences: Optional[List[str]] = None,
+        **kwargs
+    ) -> str:
+        """Generate a completion on the best deployment"""
+        return await self.generate_chat(
+            [{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop_sequences=stop_sequences,
+            **kwargs
+        )
+
+    async def generate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        stop_sequences: Optional[List[str]] = None,
+        **kwargs
+    ) -> str:
+        """Generate a chat completion on the best deployment"""
+        chat_messages = [ChatMessage(role=m["role"], content=m["content"]) for m in messages]
+        params = {
+            key: value for key, value in {
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "stop": stop_sequences,
+                **kwargs
+            }.items() if value is not None
+        }
+
+        async def produce(llm: Any) -> str:
+            response = await llm.achat(chat_messages, **params)
+            return (response.message.content or "").strip()
+
+        try:
+            return await self.execute_chat(chat_messages, produce, **params)
+        except Exception as e:
+            raise Exception(f"LLM chat generation failed: {str(e)}") from e
+
+    async def _invoke_chat(
+        self,
+        messages: Sequence[ChatMessage],
+        producer: Callable[[Any], Awaitable[str]]
+    ) -> str:
+        return await self.run_request(producer, messages)
+
+    def _ranked(self, operation: str) -> List[Deployment]:
+        """Deployments from most to least preferred for a kind of request"""
+        now = time.monotonic()
+
+        def score(deployment: Deployment):
+            average = deployment.tracker(operation).average
+            # Untried deployments first, so every deployment gets latency samples
+            return (
+                now < deployment.unavailable_until,
+                0.0 if average is None else average * (1 + deployment.consecutive_failures),
+            )
+
+        return sorted(self.deployments, key=score)
+
+    def _hedge_delay(self, deployment: Deployment, operation: str) -> float:
+        tracker = deployment.tracker(operation)
+        if len(tracker.samples) < self.hedge_min_samples:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, tracker.percentile(self.hedge_percentile)))
+
+    async def _attempt(
+        self,
+        deployment: Deployment,
+        operation: str,
+        request: Callable[[BaseLLM], Awaitable[T]]
+    ) -> T:
+        """Make a request on one deployment, recording its latency or failure"""
+        deployment.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await request(deployment.llm)
+        except asyncio.CancelledError:
+            # A cancelled attempt took at least this long; count it if that is slower than usual
+            elapsed = time.perf_counter() - start
+            tracker = deployment.tracker(operation)
+            if tracker.average is None or elapsed > tracker.average:
+                tracker.observe(elapsed)
+            raise
+        except Exception as e:
+            deployment.errors += 1
+            deployment.consecutive_failures += 1
+            deployment.last_error = str(e)
+            retry_after = retry_after_seconds(e) if isinstance(e, openai.RateLimitError) else None
+            if retry_after is not None:
+                deployment.unavailable_until = max(deployment.unavailable_until, time.monotonic() + retry_after)
+            if deployment.consecutive_failures >= self.failure_threshold:
+                deployment.unavailable_until = max(deployment.unavailable_until, time.monotonic() + self.cooldown)
+                logger.warning(
+                    "Skipping LLM deployment %s for %ss after %d failures: %s",
+                    deployment.name, self.cooldown, deployment.consecutive_failures, e
+                )
+            raise
+        deployment.consecutive_failures = 0
+        deployment.tracker(operation).observe(time.perf_counter() - start)
+        return result
+
+    async def run_request(
+        self,
+        call: Callable[[Any], Awaitable[T]],
+        messages: Sequence[ChatMessage],
+        operation: str = "chat"
+    ) -> T:
+        """Make a request on the best deployment, hedging slow requests and failing over on errors
+
+        Args:
+            call: Makes the request with the llama-index LLM it is given; may be
+                called once per deployment tried
+            messages: The messages sent, to estimate the request's tokens
+            operation: Kind of request; latencies are tracked per kind
+
+        Raises:
+            The last deployment's error if every deployment failed
+        """
+        order = self._ranked(operation)
+        attempts: Dict[asyncio.Task, Deployment] = {}
+        hedge = operation in self.hedge_operations and self.hedge_percentile > 0 and len(order) > 1
+        launched = 0
+        last_launch = 0.0
+        hedged_to: Optional[Deployment] = None
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            nonlocal launched, last_launch
+            deployment = order[launched]
+            launched += 1
+            last_launch = time.monotonic()
+            task = asyncio.ensure_future(self._attempt(
+                deployment, operation, lambda llm: llm.run_request(call, messages, operation)
+            ))
+            attempts[task] = deployment
+
+        launch()
+        try:
+            while attempts:
+                timeout = None
+                if hedge and launched < len(order):
+                    delay = self._hedge_delay(order[launched - 1], operation)
+                    timeout = max(0.0, last_launch + delay - time.monotonic())
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Slower than the deployment usually is, send a duplicate to the next one
+                    hedge = False
+                    hedged_to = order[launched]
+                    self.hedged_requests += 1
+                    logger.debug("Hedging slow %s request on %s", operation, hedged_to.name)
+                    launch()
+                    continue
+
+                for task in done:
+                    deployment = attempts.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if hedged_to is not None:
+                            LLM_HEDGED_REQUESTS.labels("hedge" if deployment is hedged_to else "original").inc()
+                            if deployment is hedged_to:
+                                deployment.hedges_won += 1
+                        _served_by.set(deployment)
+                        return task.result()
+                    last_error = error
+
+                if not attempts and launched < len(order):
+                    logger.warning(
+                        "LLM %s request failed on %s, failing over to %s: %s",
+                        operation, deployment.name, order[launched].name, last_error
+                    )
+                    self.failovers += 1
+                    LLM_FAILOVERS.labels(deployment.name).inc()
+                    launch()
+            raise last_error
+        finally:
+            for task in attempts:
+                task.cancel()
+                # The loser's outcome is not needed, retrieve it so it is not reported as unhandled
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def record_usage(self, messages: Sequence[ChatMessage], response: str):
+        super().record_usage(messages, response)
+        # Completion tokens count against the quota of the deployment that answered
+        deployment = _served_by.get()
+        rate_limiter = getattr(deployment.llm, "rate_limiter", None) if deployment is not None else None
+        if rate_limiter is not None:
+            rate_limiter.debit(count_tokens(response, self.model_config.get("model")))
+
+    async def embed(self, text: str) -> List[float]:
+        """Generate embeddings on the first available deployment, failing over on errors"""
+        return await self._with_failover("embedding", lambda llm: llm.embed(text))
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts, failing over on errors"""
+        return await self._with_failover("embedding", lambda llm: llm.embed_batch(texts))
+
+    async def _with_failover(self, operation: str, call: Callable[[BaseLLM], Awaitable[T]]) -> T:
+        last_error: Optional[BaseException] = None
+        for deployment in self._ranked(operation):
+            try:
+                return await self._attempt(deployment, operation, call)
+            except Exception as e:
+                logger.warning("LLM %s request failed on %s: %s", operation, deployment.name, e)
+                last_error = e
+        raise last_error
+
+    @property
+    def token_limit(self) -> int:
+        """The smallest context window of the deployments"""
+        return min(deployment.llm.token_limit for deployment in self.deployments)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing statistics and each deployment's latency and failures"""
+        return {
+            "hedged_requests": self.hedged_requests,
+            "failovers": self.failovers,
+            "deployments": {deployment.name: deployment.get_stats() for deployment in self.deployments},
+        }
+
+
+def llm_router_config_from_env(prefix: str = "LLM_ROUTER_") -> Dict[str, Any]:
+    """Read LLMRouter settings from environment variables
+
+    LLM_ROUTER_HEDGE_PERCENTILE (0 disables hedging), LLM_ROUTER_HEDGE_MIN_DELAY_MS,
+    LLM_ROUTER_HEDGE_MAX_DELAY_MS, LLM_ROUTER_HEDGE_MIN_SAMPLES,
+    LLM_ROUTER_FAILURE_THRESHOLD and LLM_ROUTER_COOLDOWN_SECONDS.
+    """
+    config: Dict[str, Any] = {}
+    for name, key, convert in [
+        ("HEDGE_PERCENTILE", "hedge_percentile", float),
+        ("HEDGE_MIN_DELAY_MS", "hedge_min_delay", lambda v: float(v) / 1000),
+        ("HEDGE_MAX_DELAY_MS", "hedge_max_delay", lambda v: float(v) / 1000),
+        ("HEDGE_MIN_SAMPLES", "hedge_min_samples", int),
+        ("FAILURE_THRESHOLD", "failure_threshold", int),
+        ("COOLDOWN_SECONDS", "cooldown", float),
+    ]:
+        if os.getenv(prefix + name):
+            config[key] = convert(os.getenv(prefix + name))
+    return config
@@ -0,0 +1,229 @@
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional
+from .metrics import REGISTRY
+from .tracing import current_span
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+
+LOGGER_NAME = "evo_concierge"
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "log_records_dropped_total",
+    "Log records not written, because the log queue was full or the payload was not sampled",
+    ["reason"]
+)
+
+# Attributes every LogRecord has; any other attribute was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# Arguments that cannot change between the log call and the listener formatting them
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+def truncate(value: str, max_chars: int) -> str:
+    """Cut a string to max_chars, noting how many characters were left out"""
+    if max_chars <= 0 or len(value) <= max_chars:
+        return value
+    return f"{value[:max_chars]}... [{len(value) - max_chars} more chars]"
+
+
+def _immutable_args(args: Any) -> bool:
+    values = args.values() if isinstance(args, dict) else args
+    return all(isinstance(value, _IMMUTABLE_TYPES) for value in values)
+
+
+class PayloadSampler(logging.Filter):
+    """Lets through only a fraction of the records carrying a payload, other records pass"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "payload") or self.rate >= 1.0:
+            return True
+        if random.random() < self.rate:
+            return True
+        LOG_RECORDS_DROPPED.labels("sampled").inc()
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without formatting or writing them.
+
+    Records are dropped rather than blocking the event loop when the queue is
+    full. Everything that could change before the listener formats a record
+    is captured here: mutable arguments are merged into the message, the
+    payload is converted to a truncated string, the traceback is rendered and
+    the current trace and span IDs are attached.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[Any]", max_payload_chars: int = 1000):
+        super().__init__(log_queue)
+        self.max_payload_chars = max_payload_chars
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.args and not _immutable_args(record.args):
+            record.msg = record.getMessage()
+            record.args = None
+        if hasattr(record, "payload"):
+            payload = record.payload if isinstance(record.payload, str) else str(record.payload)
+            record.payload = truncate(payload, self.max_payload_chars)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        span = current_span()
+        if span is not None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+
+class _QueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail when stopping with a full queue
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line"""
+
+    def __init__(self, service: str, max_message_chars: int = 10000):
+        super().__init__()
+        self.service = service
+        self.max_message_chars = max_message_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "service": self.service,
+            "message": truncate(record.getMessage(), self.max_message_chars),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Formats a record as a line of text, followed by its payload if any"""
+
+    def __init__(self, fmt: str, max_message_chars: int = 10000):
+        super().__init__(fmt)
+        self.max_message_chars = max_message_chars
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = truncate(record.message, self.max_message_chars)
+        if hasattr(record, "payload"):
+            record.message = f"{record.message}: {record.payload}"
+        return super().formatMessage(record)
+
+
+def logging_config_from_env() -> Dict[str, Any]:
+    return {
+        "format": os.getenv("LOG_FORMAT", "json").lower(),
+        "log_dir": os.getenv("LOG_DIR", "logs"),
+        "max_bytes": int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        "backup_count": int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        "queue_size": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        "max_message_chars": int(os.getenv("LOG_MAX_MESSAGE_CHARS", "10000")),
+        "max_payload_chars": int(os.getenv("LOG_MAX_PAYLOAD_CHARS", "1000")),
+        "payload_sample_rate": float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0")),
+    }
+
+
+def setup_logging(service: str, debug_mode: bool = False) -> logging.Logger:
+    """Configure the evo_concierge logger of a service, as set by the LOG_* variables
+
+    Log calls only put records on a bounded queue; a background thread formats
+    them and writes them to stdout and to a rotating <service>.log file in
+    LOG_DIR. Calling it again replaces the previous configuration.
+
+    Args:
+        service: Service name, recorded in every entry and naming the log file
+        debug_mode: Log DEBUG records, otherwise INFO and above
+
+    Returns:
+        The configured logger
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+    config = logging_config_from_env()
+    log_level = logging.DEBUG if debug_mode else logging.INFO
+
+    if config["format"] == "json":
+        file_formatter = console_formatter = JsonFormatter(service, config["max_message_chars"])
+    elif config["format"] == "text":
+        file_formatter = TextFormatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s", config["max_message_chars"]
+        )
+        console_formatter = TextFormatter("%(levelname)s - %(message)s", config["max_message_chars"])
+    else:
+        raise ValueError(f"Unknown LOG_FORMAT: {config['format']}")
+
+    handlers: List[logging.Handler] = []
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(console_formatter)
+    handlers.append(console_handler)
+    if config["log_dir"]:
+        os.makedirs(config["log_dir"], exist_ok=True)
+        file_handler = RotatingFileHandler(
+            os.path.join(config["log_dir"], f"{service}.log"),
+            maxBytes=config["max_bytes"],
+            backupCount=config["backup_count"]
+        )
+        file_handler.setFormatter(file_formatter)
+        handlers.append(file_handler)
+
+    log_queue: "queue.Queue[Any]" = queue.Queue(config["queue_size"])
+    _queue_handler = NonBlockingQueueHandler(log_queue, config["max_payload_chars"])
+    _queue_handler.addFilter(PayloadSampler(config["payload_sample_rate"]))
+    _listener = _QueueListener(log_queue, *handlers)
+    _listener.start()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(log_level)
+    logger.addHandler(_queue_handler)
+    return logger
+
+
+def shutdown_logging():
+    """Write the queued records and stop the listener thread"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger(LOGGER_NAME).removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
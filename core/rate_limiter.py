@@ -0,0 +1,258 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+import asyncio
+import logging
+import os
+import time
+import openai
+from .metrics import REGISTRY
+
+logger = logging.getLogger("evo_concierge")
+
+LLM_THROTTLE_WAIT_SECONDS = REGISTRY.counter(
+    "llm_throttle_wait_seconds_total",
+    "Time LLM requests waited for the deployment's rate limit",
+    ["deployment"]
+)
+LLM_RETRIES = REGISTRY.counter("llm_retries_total", "Retried LLM requests", ["deployment", "error"])
+
+T = TypeVar("T")
+
+# Errors worth retrying: throttling, timeouts, dropped connections and 5xx responses
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by a throttled response's retry-after-ms or Retry-After header"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate.
+
+    Callers reserve their amount up front and are told how long to wait for it,
+    so concurrent callers queue up behind each other without a lock. The level
+    may go negative when more is debited after the fact.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket, returning the seconds to wait until it is covered"""
+        self._refill()
+        self._level -= min(amount, self.capacity)
+        return max(0.0, -self._level / self.refill_per_second)
+
+    def debit(self, amount: float):
+        """Take amount from the bucket without waiting, for usage known only afterwards"""
+        self._refill()
+        self._level -= amount
+
+
+class LLMRateLimiter:
+    """Request and token rate limiter for one model deployment.
+
+    Every request first reserves one request and its estimated prompt tokens
+    from requests_per_minute and tokens_per_minute buckets, waiting if the
+    deployment's quota is used up. Throttled (429), timed out and 5xx requests
+    are retried up to max_retries times, waiting as long as the Retry-After
+    header asks or with jittered exponential backoff otherwise. A 429 also
+    pauses every other request to the deployment for the same time, so a burst
+    does not turn into a storm of throttled retries.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_retries: int = 5,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 60.0,
+        name: str = "default"
+    ):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute else None
+        )
+        self._token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+        )
+        self._paused_until = 0.0
+        self._backoff = wait_random_exponential(multiplier=backoff_initial, max=backoff_max)
+
+        self.requests = 0
+        self.throttled_requests = 0
+        self.throttle_wait_seconds = 0.0
+        self.retries = 0
+        self.rate_limited_responses = 0
+
+    @classmethod
+    def from_env(cls, env_prefix: str = "AZURE_OPENAI", name: str = "default") -> "LLMRateLimiter":
+        """Create a rate limiter configured from environment variables
+
+        Quotas are read from <env_prefix>_RPM and <env_prefix>_TPM; retries from
+        LLM_MAX_RETRIES, LLM_RETRY_BACKOFF_INITIAL and LLM_RETRY_BACKOFF_MAX.
+        """
+        requests_per_minute = os.getenv(f"{env_prefix}_RPM")
+        tokens_per_minute = os.getenv(f"{env_prefix}_TPM")
+        return cls(
+            requests_per_minute=int(requests_per_minute) if requests_per_minute else None,
+            tokens_per_minute=int(tokens_per_minute) if tokens_per_minute else None,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", 5)),
+            backoff_initial=float(os.getenv("LLM_RETRY_BACKOFF_INITIAL", 1.0)),
+            backoff_max=float(os.getenv("LLM_RETRY_BACKOFF_MAX", 60.0)),
+            name=name
+        )
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait until a request of tokens estimated tokens fits the quota
+
+        Returns:
+            The seconds waited
+        """
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self._request_bucket is not None:
+            wait = max(wait, self._request_bucket.reserve(1))
+        if self._token_bucket is not None and tokens:
+            wait = max(wait, self._token_bucket.reserve(tokens))
+
+        self.requests += 1
+        if wait > 0:
+            self.throttled_requests += 1
+            self.throttle_wait_seconds += wait
+            LLM_THROTTLE_WAIT_SECONDS.labels(self.name).inc(wait)
+            logger.debug("Throttling LLM request for %.2fs", wait)
+            await asyncio.sleep(wait)
+        return wait
+
+    def debit(self, tokens: int):
+        """Count tokens that were only known after the request, such as completion tokens"""
+        if self._token_bucket is not None and tokens:
+            self._token_bucket.debit(tokens)
+
+    def pause(self, seconds: float):
+        """Hold back all requests for the given time"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int = 0, max_retries: Optional[int] = None) -> T:
+        """Make a request within the quota, retrying throttled and transient failures
+
+        Args:
+            call: Makes the request; called again for every retry
+            tokens: Estimated tokens of the request
+            max_retries: Retries of this request, the limiter's max_retries if None
+
+        Raises:
+            The last error once the retries have failed
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        try:
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception_type(RETRYABLE_ERRORS),
+                wait=self._wait,
+                stop=stop_after_attempt(retries + 1),
+                before_sleep=self._before_retry,
+                reraise=True
+            ):
+                with attempt:
+                    await self.acquire(tokens)
+                    return await call()
+        except openai.RateLimitError as e:
+            # Not retried any more, but the next requests still wait as long as the deployment asked
+            self.rate_limited_responses += 1
+            retry_after = retry_after_seconds(e)
+            if retry_after is not None:
+                self.pause(min(retry_after, self.backoff_max))
+            raise
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        retry_after = retry_after_seconds(retry_state.outcome.exception())
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return self._backoff(retry_state)
+
+    def _before_retry(self, retry_state: RetryCallState):
+        error = retry_state.outcome.exception()
+        delay = retry_state.next_action.sleep
+        self.retries += 1
+        LLM_RETRIES.labels(self.name, type(error).__name__).inc()
+        if isinstance(error, openai.RateLimitError):
+            self.rate_limited_responses += 1
+            self.pause(delay)
+        logger.warning(
+            "LLM request failed (%s), retry %d of %d in %.2fs: %s",
+            type(error).__name__, retry_state.attempt_number, self.max_retries, delay, error
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rate limiter statistics"""
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "requests": self.requests,
+            "throttled_requests": self.throttled_requests,
+            "throttle_wait_seconds": round(self.throttle_wait_seconds, 3),
+            "retries": self.retries,
+            "rate_limited_responses": self.rate_limited_responses,
+        }
+
+
+_rate_limiters: Dict[str, LLMRateLimiter] = {}
+
+
+def get_rate_limiter(deployment: str, env_prefix: str = "AZURE_OPENAI") -> LLMRateLimiter:
+    """Get the process-wide rate limiter of a model deployment
+
+    All LLM instances calling the same deployment share its limiter, since
+    they share the deployment's quota.
+    """
+    limiter = _rate_limiters.get(deployment)
+    if limiter is None:
+        limiter = _rate_limiters[deployment] = LLMRateLimiter.from_env(env_prefix, deployment)
+    return limiter
+
+
+def get_rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Get the statistics of every deployment's rate limiter"""
+    return {deployment: limiter.get_stats() for deployment, limiter in _rate_limiters.items()}
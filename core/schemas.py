@@ -23,6 +23,9 @@ class WorkRequestFile(BaseModel):
     filename: str
     content_type: str
     file_path: str  # Path where file is stored locally
+    content_hash: Optional[str] = None  # SHA-256 of the file content
+    size: Optional[int] = None  # Size in bytes
+    document_id: Optional[str] = None  # Caller's stable id of the document, such as a candidate id
 
 
 class WorkRequest(BaseModel):
@@ -36,6 +39,15 @@ class AgentResponse(BaseModel):
     result: Optional[str] = None
     error: Optional[str] = None
     memory: Optional[List[MessageHistory]] = []
+    tokens_used: Optional[int] = None  # Prompt and completion tokens of the LLM calls made
+
+class MessageBatchItem(BaseModel):
+    index: int  # Position of the message in the batch
+    response: AgentResponse
+
+class MessageStreamChunk(BaseModel):
+    delta: Optional[str] = None  # Next piece of the response text
+    response: Optional[AgentResponse] = None  # Final response, sent as the last chunk
 
 class WorkStatus(str, Enum):
     PENDING = "pending"
@@ -50,15 +62,39 @@ class WorkResult(BaseModel):
     error: Optional[str] = None
     memory: Optional[List[MessageHistory]] = None
     created_at: datetime
+    started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     file_path: Optional[str] = None  # Add reference to processed file
+    tokens_used: Optional[int] = None  # Prompt and completion tokens of the LLM calls made
+    trace_id: Optional[str] = None  # Trace the work was executed in
+    timings: Optional[Dict[str, float]] = None  # Seconds spent per span name, summed over concurrent spans
+
+class SessionCreate(BaseModel):
+    context: str = ""  # Default context for every message in the session
+    history: Optional[List[MessageHistory]] = None  # Transcript to start from
+
+class SessionMessage(BaseModel):
+    message: str
+    role: str = "user"
+    context: Optional[str] = None  # Overrides the session context for this message
+
+class ConversationSession(BaseModel):
+    session_id: str
+    context: str = ""
+    history: List[MessageHistory] = []
+    created_at: datetime
+    updated_at: datetime
 
 class TargetAgentEnum(str, Enum):
     AGENT_CONCIERGE = "AGENT_CONCIERGE"
+    AGENT_RAG_RESUMES = "AGENT_RAG_RESUMES"
 
 class WorkAgentToAgent(BaseModel):
     target_agent_id: TargetAgentEnum
     initial_message: Message
     initial_context: str
     max_turns: int = 10
+
+class WorkAgentToAgentPlan(BaseModel):
+    conversations: List[WorkAgentToAgent]  # Independent conversations, run concurrently
     
\ No newline at end of file
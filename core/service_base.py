@@ -1,6 +1,17 @@
-from typing import Dict, Any, Optional
-from core.schemas import Message, WorkRequest, AgentResponse, WorkResult, MessageForFile
+from typing import Dict, Any, List, Optional, AsyncIterator
+from core.schemas import (
+    Message, WorkRequest, AgentResponse, WorkResult, MessageForFile, MessageStreamChunk, MessageBatchItem,
+    ConversationSession, SessionCreate, SessionMessage, MessageHistory
+)
 from core.agent_base import BaseAgent
+from core.work_scheduler import WorkQueueFullError
+from core.sse import format_sse_event
+from core.token_budget import track_token_usage
+from core.session_store import ConversationSessionStore
+from core.rate_limiter import get_rate_limiter_stats
+from core.llm_router import LLMRouter
+import asyncio
+import os
 import uuid
 from datetime import datetime
 import logging
@@ -13,31 +24,105 @@ class BaseAgentService:
     def __init__(self, agent: BaseAgent):
         self.agent = agent
         self.status = "idle"
-        self.work_results: Dict[str, WorkResult] = {}
+        self.sessions = ConversationSessionStore.from_env()
+        self.batch_max_concurrency = int(os.getenv("AGENT_BATCH_MAX_CONCURRENCY", 8))
+        self.batch_max_messages = int(os.getenv("AGENT_BATCH_MAX_MESSAGES", 500))
 
     def restart(self) -> Dict[str, str]:
         """Restart the agent service"""
         self.status = "idle"
         return {"status": "success"}
 
-    def process_message(self, message: Message) -> AgentResponse:
+    async def process_message(self, message: Message) -> AgentResponse:
         """Process an incoming message"""
         try:
             self.status = "in_progress"
-            result, response_memory = self.agent.process_message(
-                message.message,
-                message.role,
-                message.context,
-                message.history or []
-            )
+            with track_token_usage() as usage:
+                result, response_memory = await self.agent.aprocess_message(
+                    message.message,
+                    message.role,
+                    message.context,
+                    message.history or []
+                )
             self.status = "completed"
-            return AgentResponse(status="completed", result=result, memory=response_memory)
+            return AgentResponse(
+                status="completed",
+                result=result,
+                memory=response_memory,
+                tokens_used=usage.total_tokens
+            )
         except Exception as e:
-            logger.error(f"Error processing message: {str(e)}", exc_info=True)
+            logger.error("Error processing message: %s", e, exc_info=True)
             self.status = "failed"
             return AgentResponse(status="failed", error=str(e))
 
-    def process_message_for_file(self, message: Message) -> AgentResponse:
+    async def process_messages_batch(self, messages: List[Message]) -> List[AgentResponse]:
+        """Process independent messages concurrently, returning responses in input order"""
+        responses: List[Optional[AgentResponse]] = [None] * len(messages)
+        async for item in self.stream_messages_batch(messages):
+            responses[item.index] = item.response
+        return responses
+
+    async def stream_messages_batch(self, messages: List[Message]) -> AsyncIterator[MessageBatchItem]:
+        """Process independent messages concurrently, yielding each response as it finishes
+
+        At most batch_max_concurrency messages are processed at a time. A failed
+        message yields a failed AgentResponse without affecting the others.
+        """
+        semaphore = asyncio.Semaphore(self.batch_max_concurrency)
+
+        async def run(index: int, message: Message) -> MessageBatchItem:
+            async with semaphore:
+                return MessageBatchItem(index=index, response=await self.process_message(message))
+
+        tasks = [asyncio.create_task(run(i, m)) for i, m in enumerate(messages)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer went away, for example a streaming client disconnected
+            for task in tasks:
+                task.cancel()
+
+    async def stream_message(self, message: Message) -> AsyncIterator[str]:
+        """Process an incoming message, yielding Server-Sent Events
+
+        Emits a "token" event for every chunk of the response text and a final
+        "response" event carrying the complete AgentResponse, including memory.
+        """
+        history = message.history or []
+        chunks = []
+        try:
+            self.status = "in_progress"
+            with track_token_usage() as usage:
+                async for delta in self.agent.stream_message(
+                    message.message,
+                    message.role,
+                    message.context,
+                    history
+                ):
+                    chunks.append(delta)
+                    yield format_sse_event("token", MessageStreamChunk(delta=delta).model_dump_json())
+
+            result = "".join(chunks)
+            response_memory = self.agent.build_response_memory(
+                message.message, message.role, history, result
+            )
+            self.status = "completed"
+            response = AgentResponse(
+                status="completed",
+                result=result,
+                memory=response_memory,
+                tokens_used=usage.total_tokens
+            )
+        except Exception as e:
+            logger.error("Error streaming message: %s", e, exc_info=True)
+            self.status = "failed"
+            response = AgentResponse(status="failed", error=str(e))
+
+        yield format_sse_event("response", MessageStreamChunk(response=response).model_dump_json())
+
+    async def process_message_for_file(self, message: Message) -> AgentResponse:
         """
         Process a message specifically for file-based queries.
         This can be overridden by specific agents to handle file content differently.
@@ -45,23 +130,101 @@ class BaseAgentService:
         try:
             logger.info("Processing file-based message")
             # By default, use the same processing as regular messages
-            result, response_memory = self.agent.process_message(
-                message.message,
-                message.role,
-                message.context,
-                message.history or []
+            with track_token_usage() as usage:
+                result, response_memory = await self.agent.aprocess_message(
+                    message.message,
+                    message.role,
+                    message.context,
+                    message.history or []
+                )
+            return AgentResponse(
+                status="completed",
+                result=result,
+                memory=response_memory,
+                tokens_used=usage.total_tokens
             )
-            return AgentResponse(status="completed", result=result, memory=response_memory)
         except Exception as e:
-            logger.error(f"Error processing file message: {str(e)}", exc_info=True)
+            logger.error("Error processing file message: %s", e, exc_info=True)
             return AgentResponse(status="failed", error=str(e))
 
-    def get_status(self) -> Dict[str, str]:
+    def create_session(self, request: SessionCreate) -> ConversationSession:
+        """Start a server-side conversation session"""
+        return self.sessions.create(request.context, request.history)
+
+    def get_session(self, session_id: str) -> Optional[ConversationSession]:
+        """Get a session and its transcript"""
+        return self.sessions.get(session_id)
+
+    def delete_session(self, session_id: str) -> bool:
+        """End a session"""
+        return self.sessions.delete(session_id)
+
+    async def process_session_message(
+        self,
+        session_id: str,
+        message: SessionMessage
+    ) -> Optional[AgentResponse]:
+        """Process a message in a session, using the transcript kept by the server
+
+        Returns:
+            AgentResponse whose memory holds only the entries added by this turn,
+            or None if the session does not exist
+        """
+        if self.sessions.get(session_id) is None:
+            return None
+
+        async with self.sessions.lock(session_id):
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+
+            context = message.context if message.context is not None else session.context
+            try:
+                self.status = "in_progress"
+                with track_token_usage() as usage:
+                    result, _ = await self.agent.aprocess_message(
+                        message.message,
+                        message.role,
+                        context,
+                        session.history
+                    )
+                self.status = "completed"
+            except Exception as e:
+                logger.error("Error processing session message: %s", e, exc_info=True)
+                self.status = "failed"
+                return AgentResponse(status="failed", error=str(e))
+
+            turn = [
+                MessageHistory(role=message.role, content=message.message),
+                MessageHistory(role="assistant", content=result)
+            ]
+            self.sessions.append(session_id, turn)
+            return AgentResponse(
+                status="completed",
+                result=result,
+                memory=turn,
+                tokens_used=usage.total_tokens
+            )
+
+    def get_status(self) -> Dict[str, Any]:
         """Get current service status"""
-        return {"status": self.status}
+        status = {
+            "status": self.status,
+            "work_queue": self.agent.work_scheduler.get_stats(),
+            "sessions": self.sessions.get_stats(),
+            "rate_limits": get_rate_limiter_stats(),
+            "single_flight": self.agent.llm.single_flight.get_stats()
+        }
+        if isinstance(self.agent.llm, LLMRouter):
+            status["llm_routing"] = self.agent.llm.get_stats()
+        return status
 
     async def process_work_request(self, work_request: WorkRequest) -> WorkResult:
-        """Start an asynchronous work request"""
+        """Start an asynchronous work request
+
+        Raises:
+            WorkQueueFullError: If the agent cannot accept more work right now
+        """
         try:
             return await self.agent.start_work(
                 work_request.task,
@@ -69,6 +232,8 @@ class BaseAgentService:
                 work_request.history,
                 work_request.file
             )
+        except WorkQueueFullError:
+            raise
         except Exception as e:
             return WorkResult(
                 work_id=str(uuid.uuid4()),
@@ -78,6 +243,10 @@ class BaseAgentService:
                 completed_at=datetime.utcnow()
             )
 
-    def get_work_result(self, work_id: str) -> Optional[WorkResult]:
+    async def get_work_result(self, work_id: str) -> Optional[WorkResult]:
         """Get the result of an async work request"""
-        return self.agent.get_work_result(work_id) 
\ No newline at end of file
+        return await self.agent.get_work_result(work_id)
+
+    async def wait_for_work_result(self, work_id: str, timeout: float) -> Optional[WorkResult]:
+        """Get the result of an async work request, waiting up to timeout seconds for a state change"""
+        return await self.agent.wait_for_work_result(work_id, timeout) 
\ No newline at end of file
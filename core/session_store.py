@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from .schemas import ConversationSession, MessageHistory
+import asyncio
+import logging
+import os
+import uuid
+
+logger = logging.getLogger("evo_concierge")
+
+
+class ConversationSessionStore:
+    """Bounded in-memory store of conversation sessions.
+
+    Keeps the transcript of each conversation on the server so clients only
+    send the new message on every turn. Sessions idle for longer than
+    ttl_seconds expire, the least recently used sessions are evicted beyond
+    max_sessions, and each transcript keeps at most max_messages entries.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_messages: int = 200,
+        ttl_seconds: float = 60 * 60
+    ):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @classmethod
+    def from_env(cls) -> "ConversationSessionStore":
+        """Create a session store configured from environment variables"""
+        return cls(
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", 1000)),
+            max_messages=int(os.getenv("SESSION_MAX_MESSAGES", 200)),
+            ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", 60 * 60))
+        )
+
+    def create(self, context: str = "", history: Optional[List[MessageHistory]] = None) -> ConversationSession:
+        """Start a new session"""
+        self._expire()
+        now = datetime.utcnow()
+        session = ConversationSession(
+            session_id=str(uuid.uuid4()),
+            context=context,
+            history=(history or [])[-self.max_messages:],
+            created_at=now,
+            updated_at=now
+        )
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._locks.pop(evicted, None)
+        return session
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        """Get a session, or None if it does not exist or has expired"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self._is_expired(session):
+            self.delete(session_id)
+            return None
+        session.updated_at = datetime.utcnow()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def append(self, session_id: str, entries: List[MessageHistory]):
+        """Add messages to a session's transcript"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        session.history = (session.history + entries)[-self.max_messages:]
+        session.updated_at = datetime.utcnow()
+        self._sessions.move_to_end(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session"""
+        self._locks.pop(session_id, None)
+        return self._sessions.pop(session_id, None) is not None
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Lock that serializes the turns of a session"""
+        return self._locks.setdefault(session_id, asyncio.Lock())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _is_expired(self, session: ConversationSession) -> bool:
+        return (datetime.utcnow() - session.updated_at).total_seconds() > self.ttl_seconds
+
+    def _expire(self):
+        # Sessions are ordered by last use, so expired ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if not self._is_expired(session):
+                break
+            self.delete(session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get session statistics"""
+        return {"sessions": len(self._sessions)}
@@ -0,0 +1,69 @@
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+import asyncio
+import logging
+from .metrics import REGISTRY
+
+logger = logging.getLogger("evo_concierge")
+
+COALESCED_REQUESTS = REGISTRY.counter(
+    "single_flight_coalesced_total",
+    "Requests that waited for an identical request in flight instead of making their own call"
+)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces identical concurrent requests into one call.
+
+    The first caller for a key starts the call; callers arriving with the same
+    key while it is in flight wait for its result instead of making their own.
+    Nothing is kept once the call finishes, so this is independent of any
+    response cache. The call runs in its own task and is cancelled only when
+    every caller waiting for it has been cancelled.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call, or wait for the in-flight call with the same key"""
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is not None and flight.task.get_loop() is loop:
+            self.coalesced += 1
+            COALESCED_REQUESTS.inc()
+            logger.debug("Coalescing request %s with the one in flight", key[:12])
+        else:
+            flight = _Flight(loop.create_task(call()))
+            self._flights[key] = flight
+            self.calls += 1
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
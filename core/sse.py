@@ -0,0 +1,37 @@
+from typing import AsyncIterable, AsyncIterator, Tuple, Union
+
+
+def format_sse_event(event: str, data: str) -> str:
+    """Format a Server-Sent Event frame"""
+    data_lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{data_lines}\n"
+
+
+async def parse_sse_events(
+    lines: AsyncIterable[Union[bytes, str]]
+) -> AsyncIterator[Tuple[str, str]]:
+    """Parse a stream of Server-Sent Event lines into (event, data) pairs"""
+    event = "message"
+    data = []
+    async for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r\n")
+
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event = "message"
+            data = []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+
+    if data:
+        yield event, "\n".join(data)
@@ -0,0 +1,244 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from llama_index.core.base.llms.types import ChatMessage
+from .schemas import MessageHistory
+import logging
+import os
+
+logger = logging.getLogger("evo_concierge")
+
+# Context window sizes by model name prefix; the longest matching prefix wins
+MODEL_TOKEN_LIMITS: Dict[str, int] = {
+    "gpt-4.1": 1047576,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-35-turbo-16k": 16384,
+    "gpt-35-turbo": 16385,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+}
+
+DEFAULT_TOKEN_LIMIT = 8192
+
+# Tokens added per chat message and to prime the reply, as counted by OpenAI
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+
+def model_token_limit(model: Optional[str], override: Optional[int] = None) -> int:
+    """Context window size for a model or Azure deployment model name"""
+    if override:
+        return int(override)
+    if model:
+        name = model.lower()
+        for prefix in sorted(MODEL_TOKEN_LIMITS, key=len, reverse=True):
+            if name.startswith(prefix):
+                return MODEL_TOKEN_LIMITS[prefix]
+    return DEFAULT_TOKEN_LIMIT
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: Optional[str] = None) -> Any:
+    """Get the tiktoken encoding for a model, or None if it cannot be loaded
+
+    Encodings are loaded once per model. Azure model names (gpt-35-turbo) are
+    mapped to their OpenAI equivalents. When the encoding is unavailable, for
+    example without network access to download it, token counts fall back to
+    an estimate.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken is not installed, estimating token counts")
+        return None
+
+    name = (model or "").replace("gpt-35", "gpt-3.5")
+    try:
+        try:
+            return tiktoken.encoding_for_model(name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("Could not load tiktoken encoding for %s, estimating token counts: %s", model, e)
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count the tokens in a text"""
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        # Roughly four characters per token for English text
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: Sequence[ChatMessage], model: Optional[str] = None) -> int:
+    """Count the prompt tokens of a chat request"""
+    return REPLY_PRIMING_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + count_tokens(m.content or "", model) for m in messages
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Cut a text down to at most max_tokens, keeping its beginning"""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+class TokenUsage:
+    """Tokens used by the LLM calls made while handling one request"""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.calls += 1
+
+
+_current_usage: ContextVar[Optional[TokenUsage]] = ContextVar("token_usage", default=None)
+
+
+@contextmanager
+def track_token_usage() -> Iterator[TokenUsage]:
+    """Collect the token usage of LLM calls made within the block"""
+    usage = TokenUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        try:
+            _current_usage.reset(token)
+        except ValueError:
+            # An async generator finalized from another context, nothing to restore there
+            pass
+
+
+def record_token_usage(prompt_tokens: int, completion_tokens: int):
+    """Add an LLM call's tokens to the usage being tracked, if any"""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.add(prompt_tokens, completion_tokens)
+
+
+class ContextPacker:
+    """Fits an agent prompt into the model's token budget.
+
+    The budget is the model's context window minus tokens reserved for the
+    response, optionally capped further by max_prompt_tokens. The system prompt
+    and the new message are always kept. When everything does not fit, the
+    external context is truncated to the larger of context_share of what
+    remains and what the history leaves free, and the remainder is filled with
+    the most recent history messages; older messages are dropped.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        token_limit: Optional[int] = None,
+        reserved_output_tokens: int = 1024,
+        max_prompt_tokens: Optional[int] = None,
+        context_share: float = 0.5
+    ):
+        self.model = model
+        self.token_limit = token_limit or model_token_limit(model)
+        self.reserved_output_tokens = reserved_output_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        self.context_share = context_share
+
+    @classmethod
+    def from_env(cls, model: Optional[str] = None, token_limit: Optional[int] = None) -> "ContextPacker":
+        """Create a packer for a model configured from environment variables"""
+        max_prompt_tokens = os.getenv("AGENT_MAX_PROMPT_TOKENS")
+        return cls(
+            model=model,
+            token_limit=token_limit,
+            reserved_output_tokens=int(os.getenv("AGENT_RESERVED_OUTPUT_TOKENS", 1024)),
+            max_prompt_tokens=int(max_prompt_tokens) if max_prompt_tokens else None,
+            context_share=float(os.getenv("AGENT_CONTEXT_TOKEN_SHARE", 0.5))
+        )
+
+    @property
+    def prompt_budget(self) -> int:
+        budget = self.token_limit - self.reserved_output_tokens
+        if self.max_prompt_tokens:
+            budget = min(budget, self.max_prompt_tokens)
+        return budget
+
+    def pack(
+        self,
+        base_prompt_tokens: int,
+        message: str,
+        context: str,
+        history: Optional[List[MessageHistory]]
+    ) -> Tuple[str, List[MessageHistory]]:
+        """Trim context and history to the prompt budget
+
+        Args:
+            base_prompt_tokens: Tokens of the system prompt without external context
+            message: The new message
+            context: External context placed in the system prompt
+            history: Conversation history, oldest first
+
+        Returns:
+            Tuple containing:
+                - context: The context, truncated if needed
+                - history: The most recent history messages that fit
+        """
+        history = history or []
+        remaining = (
+            self.prompt_budget
+            - REPLY_PRIMING_TOKENS
+            - base_prompt_tokens
+            - MESSAGE_OVERHEAD_TOKENS * 2
+            - count_tokens(message, self.model)
+        )
+
+        history_costs = [
+            MESSAGE_OVERHEAD_TOKENS + count_tokens(entry.content, self.model) for entry in history
+        ]
+
+        # Context may use whatever history leaves free, and at least context_share of the budget
+        context_tokens = count_tokens(context, self.model)
+        context_cap = max(0, int(remaining * self.context_share), remaining - sum(history_costs))
+        if context_tokens > context_cap:
+            logger.debug("Truncating context from %d to %d tokens", context_tokens, context_cap)
+            context = truncate_to_tokens(context, context_cap, self.model)
+            context_tokens = context_cap
+        remaining -= context_tokens
+
+        kept: List[MessageHistory] = []
+        for entry, cost in zip(reversed(history), reversed(history_costs)):
+            if cost > remaining:
+                break
+            kept.append(entry)
+            remaining -= cost
+        kept.reverse()
+
+        if len(kept) < len(history):
+            logger.debug(
+                "Dropped %d of %d history messages to fit the token budget", len(history) - len(kept), len(history)
+            )
+        return context, kept
@@ -0,0 +1,356 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from .metrics import route_template
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger("evo_concierge")
+
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Trace ID and parent span ID of a W3C traceparent header, or None if invalid"""
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self._start = time.perf_counter()
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Sends finished spans somewhere; called from the export thread, never the event loop"""
+
+    def export(self, spans: List[Span]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends spans to a file as JSON lines"""
+
+    def __init__(self, path: str = "traces.jsonl"):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """Posts spans to an OTLP/HTTP collector as OTLP JSON"""
+
+    KINDS = {"internal": 1, "server": 2, "client": 3}
+
+    def __init__(self, endpoint: str = "http://localhost:4318", service: str = "evo-agents", timeout: float = 5):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service = service
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        start_ns = int(span.start_time * 1e9)
+        data = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": self.KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int((span.duration or 0.0) * 1e9)),
+            "attributes": [self._attribute(k, v) for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+        }
+        if span.parent_id:
+            data["parentSpanId"] = span.parent_id
+        return data
+
+    def export(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service)]},
+                "scopeSpans": [{
+                    "scope": {"name": "evo-agents"},
+                    "spans": [self._span(span) for span in spans],
+                }],
+            }]
+        }
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class BatchSpanProcessor:
+    """Queues finished spans and exports them in batches from a background thread.
+
+    Ending a span only puts it on a bounded queue; spans are dropped rather
+    than blocking when the exporter falls behind.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        batch_size: int = 256,
+        interval: float = 2.0
+    ):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning("Could not export %d spans: %s", len(batch), e)
+
+    def shutdown(self, timeout: float = 5):
+        """Export the queued spans and stop the export thread"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.exporter.shutdown()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("span_timings", default=None)
+_processor: Optional[BatchSpanProcessor] = None
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span"""
+    return _current_span.get()
+
+
+def traceparent_headers() -> Dict[str, str]:
+    """Headers that continue the current trace in another service"""
+    span = _current_span.get()
+    return {TRACEPARENT_HEADER: span.traceparent} if span is not None else {}
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: str = "internal",
+    traceparent: Optional[str] = None,
+    **attributes: Any
+) -> Iterator[Span]:
+    """Time the block as a span, a child of the current span or of traceparent if given
+
+    Spans are always recorded so trace IDs propagate and timings are collected;
+    they are exported only when an exporter is configured.
+    """
+    parent = _current_span.get()
+    remote = parse_traceparent(traceparent) if traceparent else None
+    if remote is not None:
+        trace_id, parent_id = remote
+    elif parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+
+    span = Span(name, trace_id, parent_id, kind, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.error = f"{type(e).__name__}: {str(e)}"
+        raise
+    finally:
+        span.end()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Ended from another context, for example a finalized async generator
+            pass
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[span.name] = timings.get(span.name, 0.0) + span.duration
+        if _processor is not None:
+            _processor.on_end(span)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """Sum the seconds spent in each span name within the block, including spawned tasks"""
+    timings: Dict[str, float] = {}
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        try:
+            _current_timings.reset(token)
+        except ValueError:
+            pass
+
+
+def configure_tracing(exporter: Optional[SpanExporter]):
+    """Export finished spans with the given exporter, or stop exporting if None"""
+    global _processor
+    if _processor is not None:
+        _processor.shutdown()
+    _processor = BatchSpanProcessor(exporter) if exporter is not None else None
+
+
+def shutdown_tracing():
+    """Export the remaining spans and stop exporting"""
+    configure_tracing(None)
+
+
+def span_exporter_from_env(service: str) -> Optional[SpanExporter]:
+    """Span exporter selected by TRACE_EXPORTER: "file", "otlp" or unset for none"""
+    exporter = os.getenv("TRACE_EXPORTER", "").lower()
+    if exporter == "file":
+        return FileSpanExporter(os.getenv("TRACE_FILE", "traces.jsonl"))
+    if exporter == "otlp":
+        return OTLPHttpSpanExporter(
+            os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"), service
+        )
+    return None
+
+
+class TracingMiddleware:
+    """ASGI middleware running each HTTP request in a server span.
+
+    The span continues the trace of an incoming traceparent header and its
+    traceparent is returned in the response headers.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        with start_span(f"{method} {scope['path']}", kind="server", traceparent=traceparent) as span:
+
+            async def send_with_trace(message: Dict[str, Any]):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "error"
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"traceparent", span.traceparent.encode("latin-1"))
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                span.name = f"{method} {route_template(scope)}"
+                span.set_attribute("http.method", method)
+                span.set_attribute("http.target", scope["path"])
+
+
+def setup_tracing(app: Any, service: str):
+    """Trace every request of a FastAPI app, exporting spans as configured by TRACE_EXPORTER"""
+    configure_tracing(span_exporter_from_env(service))
+    app.add_middleware(TracingMiddleware)
+    app.on_event("shutdown")(shutdown_tracing)
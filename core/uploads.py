@@ -0,0 +1,162 @@
+from typing import Optional
+from pathlib import Path
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .schemas import WorkRequestFile
+import aiofiles
+import aiofiles.os
+import hashlib
+import logging
+import os
+import re
+import uuid
+
+logger = logging.getLogger("evo_concierge")
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an uploaded file exceeds the configured size limit"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Uploaded file exceeds the maximum size of {max_bytes} bytes")
+
+
+# Room in a multipart body for the other form fields and the part boundaries and headers
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """Rejects multipart request bodies too large to hold an upload of max_bytes.
+
+    Starlette spools a multipart body to a temporary file before the route
+    runs, so UploadStore.save alone cannot stop an oversize upload from being
+    received and written to disk. This middleware answers 413 from the
+    Content-Length header before any of the body is read, and stops reading
+    bodies sent without one as soon as they cross the limit.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            logger.warning("Rejected upload of %s bytes to %s", content_length, scope["path"])
+            response = JSONResponse({"detail": str(UploadTooLargeError(self.max_bytes))}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # Raised while the route reads its form, FastAPI answers with this status
+                    raise HTTPException(status_code=413, detail=str(UploadTooLargeError(self.max_bytes)))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def sanitize_filename(filename: Optional[str]) -> str:
+    """Reduce a client-supplied filename to a safe name inside the upload directory"""
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", name).lstrip(".")
+    return name[:255] or "upload"
+
+
+class UploadStore:
+    """Saves uploaded files to a local directory without blocking the event loop.
+
+    The upload is read in chunks and written asynchronously to a temporary file,
+    hashed as it is written, and renamed into place only once complete, so other
+    readers never see a partial file. Each upload is stored under a unique name;
+    the client's filename is kept only in the returned WorkRequestFile. Uploads larger than max_bytes are rejected
+    with UploadTooLargeError as soon as the limit is crossed; add UploadSizeLimitMiddleware
+    to the app to refuse them before the request body is received.
+    """
+
+    def __init__(
+        self,
+        upload_dir: str = "uploads",
+        max_bytes: int = 25 * 1024 * 1024,
+        chunk_size: int = 1024 * 1024
+    ):
+        self.upload_dir = Path(upload_dir)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_env(cls) -> "UploadStore":
+        """Create an upload store configured from environment variables"""
+        return cls(
+            upload_dir=os.getenv("UPLOAD_DIR", "uploads"),
+            max_bytes=int(os.getenv("UPLOAD_MAX_BYTES", 25 * 1024 * 1024)),
+            chunk_size=int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+        )
+
+    async def save(self, file: UploadFile) -> WorkRequestFile:
+        """Stream an uploaded file to the upload directory
+
+        Returns:
+            WorkRequestFile with the stored path, size and SHA-256 content hash
+
+        Raises:
+            UploadTooLargeError: If the file is larger than max_bytes
+        """
+        if file.size is not None and file.size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+
+        filename = sanitize_filename(file.filename)
+        await aiofiles.os.makedirs(self.upload_dir, exist_ok=True)
+        # Uploads sharing a filename must not replace each other before their work reads them
+        stored_name = f"{uuid.uuid4().hex}_{filename}"[:255]
+        final_path = self.upload_dir / stored_name
+        tmp_path = self.upload_dir / f".{stored_name}.part"
+
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as out:
+                while True:
+                    chunk = await file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLargeError(self.max_bytes)
+                    digest.update(chunk)
+                    await out.write(chunk)
+                await out.flush()
+            await aiofiles.os.replace(tmp_path, final_path)
+        except BaseException:
+            try:
+                await aiofiles.os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        logger.info("Stored upload %s as %s (%d bytes)", filename, stored_name, size)
+        return WorkRequestFile(
+            filename=filename,
+            content_type=file.content_type or "application/octet-stream",
+            file_path=str(final_path),
+            content_hash=digest.hexdigest(),
+            size=size
+        )
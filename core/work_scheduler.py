@@ -0,0 +1,154 @@
+from typing import Awaitable, Callable, Dict, Optional, Set, Any
+import asyncio
+import logging
+import os
+import time
+from .metrics import REGISTRY
+
+logger = logging.getLogger("evo_concierge")
+
+WORK_PENDING = REGISTRY.gauge("work_queue_pending", "Work requests waiting for an execution slot")
+WORK_RUNNING = REGISTRY.gauge("work_in_progress", "Work requests currently executing")
+WORK_WAIT_SECONDS = REGISTRY.histogram("work_queue_wait_seconds", "Time work requests waited for an execution slot")
+WORK_REJECTED = REGISTRY.counter("work_rejected_total", "Work requests rejected because the queue was full")
+
+
+class WorkQueueFullError(Exception):
+    """Raised when a work item is submitted while the pending queue is full"""
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        super().__init__(
+            f"Work queue is full ({max_pending} pending work requests), try again later"
+        )
+
+
+class WorkScheduler:
+    """Runs agent work with a concurrency cap and a bounded pending queue.
+
+    Work submitted while all execution slots are busy waits in the pending queue.
+    When the pending queue is full, submit raises WorkQueueFullError instead of
+    accepting more work.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_pending: int = 100):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_pending < 0:
+            raise ValueError("max_pending must not be negative")
+
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+        self._running = 0
+
+        # Statistics
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._last_wait = 0.0
+
+    @classmethod
+    def from_env(cls) -> "WorkScheduler":
+        """Create a scheduler configured from environment variables"""
+        return cls(
+            max_concurrency=int(os.getenv("AGENT_MAX_CONCURRENT_WORK", 4)),
+            max_pending=int(os.getenv("AGENT_MAX_PENDING_WORK", 100))
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of work items waiting for an execution slot"""
+        return self._pending
+
+    @property
+    def running(self) -> int:
+        """Number of work items currently executing"""
+        return self._running
+
+    def submit(
+        self,
+        work_id: str,
+        work: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Task:
+        """Queue work for execution.
+
+        Args:
+            work_id: Identifier of the work item, used for logging
+            work: Factory returning the coroutine to execute
+
+        Returns:
+            The task running the work
+
+        Raises:
+            WorkQueueFullError: If the pending queue is full
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self._pending + self._running >= self.max_concurrency + self.max_pending:
+            self._rejected += 1
+            WORK_REJECTED.inc()
+            logger.warning("Rejecting work %s: work queue is full", work_id)
+            raise WorkQueueFullError(self.max_pending)
+
+        self._submitted += 1
+        self._pending += 1
+        WORK_PENDING.inc()
+        task = asyncio.create_task(self._run(work_id, work, time.monotonic()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(
+        self,
+        work_id: str,
+        work: Callable[[], Awaitable[Any]],
+        queued_at: float
+    ):
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._pending -= 1
+            WORK_PENDING.dec()
+
+        wait = time.monotonic() - queued_at
+        self._record_wait(wait)
+        self._running += 1
+        WORK_RUNNING.inc()
+        try:
+            return await work()
+        except Exception as e:
+            logger.error("Unhandled error in work %s: %s", work_id, e, exc_info=True)
+        finally:
+            self._running -= 1
+            WORK_RUNNING.dec()
+            self._completed += 1
+            self._semaphore.release()
+
+    def _record_wait(self, wait: float):
+        self._last_wait = wait
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        WORK_WAIT_SECONDS.observe(wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and wait time statistics"""
+        started = self._completed + self._running
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "running": self._running,
+            "pending": self._pending,
+            "submitted": self._submitted,
+            "rejected": self._rejected,
+            "completed": self._completed,
+            "avg_wait_seconds": self._total_wait / started if started else 0.0,
+            "max_wait_seconds": self._max_wait,
+            "last_wait_seconds": self._last_wait,
+        }
@@ -0,0 +1,322 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from pathlib import Path
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import (
+    Column, Float, Integer, MetaData, String, Table, Text,
+    create_engine, delete, func, select
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from core.schemas import WorkResult
+
+logger = logging.getLogger("evo_concierge")
+
+
+class BaseWorkStore(ABC):
+    """Abstract storage for work results, looked up by work_id"""
+
+    # Called with the work_ids a write expired or evicted, so their owner can drop
+    # what it keeps for them; the async methods call it on the event loop
+    on_evict: Optional[Callable[[List[str]], None]] = None
+
+    @abstractmethod
+    def get(self, work_id: str) -> Optional[WorkResult]:
+        """Get a work result, or None if it is unknown or was evicted"""
+        pass
+
+    @abstractmethod
+    def put(self, work_result: WorkResult) -> None:
+        """Insert or update a work result"""
+        pass
+
+    @abstractmethod
+    def delete(self, work_id: str) -> None:
+        """Remove a work result"""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of retained work results"""
+        pass
+
+    async def aget(self, work_id: str) -> Optional[WorkResult]:
+        """Get a work result from async code
+
+        Stores doing blocking I/O override the async methods to run it in a worker thread.
+        """
+        return self.get(work_id)
+
+    async def aput(self, work_result: WorkResult) -> None:
+        """Insert or update a work result from async code"""
+        self.put(work_result)
+
+    async def adelete(self, work_id: str) -> None:
+        """Remove a work result from async code"""
+        self.delete(work_id)
+
+    def _notify_evicted(self, work_ids: List[str]):
+        if work_ids and self.on_evict is not None:
+            self.on_evict(work_ids)
+
+
+class InMemoryWorkStore(BaseWorkStore):
+    """In-process work store with LRU, TTL and retained size limits.
+
+    An entry expires ttl_seconds after it was last read or written. When the
+    number of entries or their total serialized size exceeds the limits, the
+    least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 24 * 60 * 60
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, Tuple[WorkResult, int, float]]" = OrderedDict()
+        self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        """Total serialized size of the retained work results"""
+        return self._total_bytes
+
+    def get(self, work_id: str) -> Optional[WorkResult]:
+        entry = self._items.get(work_id)
+        if entry is None:
+            return None
+
+        work_result, size, touched_at = entry
+        if time.monotonic() - touched_at > self.ttl_seconds:
+            self.delete(work_id)
+            return None
+
+        self._items[work_id] = (work_result, size, time.monotonic())
+        self._items.move_to_end(work_id)
+        return work_result
+
+    def put(self, work_result: WorkResult) -> None:
+        self.delete(work_result.work_id)
+
+        size = len(work_result.model_dump_json())
+        self._items[work_result.work_id] = (work_result, size, time.monotonic())
+        self._total_bytes += size
+        self._notify_evicted(self._evict())
+
+    def delete(self, work_id: str) -> None:
+        entry = self._items.pop(work_id, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _evict(self) -> List[str]:
+        # Entries are kept in last-touched order, so expired entries are at the front
+        evicted = []
+        now = time.monotonic()
+        while self._items:
+            work_id, (_, _, touched_at) = next(iter(self._items.items()))
+            if now - touched_at <= self.ttl_seconds:
+                break
+            self.delete(work_id)
+            evicted.append(work_id)
+
+        while len(self._items) > 1 and (
+            len(self._items) > self.max_items or self._total_bytes > self.max_bytes
+        ):
+            work_id = next(iter(self._items))
+            logger.debug("Evicting work result %s from work store", work_id)
+            self.delete(work_id)
+            evicted.append(work_id)
+        return evicted
+
+
+class SqliteWorkStore(BaseWorkStore):
+    """SQLite-backed work store with TTL and retained size limits.
+
+    Work results are stored as JSON rows keyed by work_id. Rows not written
+    for ttl_seconds are removed, and when the total payload size exceeds
+    max_bytes the oldest rows are removed first.
+
+    The row count and total size are kept as running counters, so a write
+    only reads the rows it expires or evicts. The async methods run the
+    queries in a worker thread, and writes are serialized with a lock. The
+    counters assume this store is the only writer to its database.
+    """
+
+    metadata = MetaData()
+    work_results = Table(
+        "work_results",
+        metadata,
+        Column("work_id", String(64), primary_key=True),
+        Column("payload", Text, nullable=False),
+        Column("size", Integer, nullable=False),
+        Column("updated_at", Float, nullable=False, index=True),
+    )
+
+    def __init__(
+        self,
+        path: str = "data/work_results.db",
+        max_items: int = 100000,
+        max_bytes: int = 512 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 60 * 60
+    ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.engine = create_engine(f"sqlite:///{path}")
+        self.metadata.create_all(self.engine)
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        table = self.work_results
+        with self.engine.connect() as conn:
+            self._count, self._total_bytes = conn.execute(
+                select(func.count(), func.coalesce(func.sum(table.c.size), 0))
+            ).one()
+
+    @property
+    def total_bytes(self) -> int:
+        """Total serialized size of the retained work results"""
+        return self._total_bytes
+
+    async def aget(self, work_id: str) -> Optional[WorkResult]:
+        return await asyncio.to_thread(self.get, work_id)
+
+    async def aput(self, work_result: WorkResult) -> None:
+        self._notify_evicted(await asyncio.to_thread(self._put, work_result))
+
+    async def adelete(self, work_id: str) -> None:
+        await asyncio.to_thread(self.delete, work_id)
+
+    def get(self, work_id: str) -> Optional[WorkResult]:
+        table = self.work_results
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(table.c.payload, table.c.updated_at).where(table.c.work_id == work_id)
+            ).first()
+
+        if row is None:
+            return None
+        if time.time() - row.updated_at > self.ttl_seconds:
+            self.delete(work_id)
+            return None
+        return WorkResult.model_validate_json(row.payload)
+
+    def put(self, work_result: WorkResult) -> None:
+        self._notify_evicted(self._put(work_result))
+
+    def _put(self, work_result: WorkResult) -> List[str]:
+        """Write a work result, returning the work_ids evicted to make room"""
+        table = self.work_results
+        payload = work_result.model_dump_json()
+        values = {
+            "work_id": work_result.work_id,
+            "payload": payload,
+            "size": len(payload),
+            "updated_at": time.time(),
+        }
+        statement = sqlite_insert(table).values(**values).on_conflict_do_update(
+            index_elements=[table.c.work_id],
+            set_={k: v for k, v in values.items() if k != "work_id"}
+        )
+        with self._lock:
+            with self.engine.begin() as conn:
+                previous_size = conn.execute(
+                    select(table.c.size).where(table.c.work_id == work_result.work_id)
+                ).scalar_one_or_none()
+                conn.execute(statement)
+                count = self._count + (previous_size is None)
+                total_bytes = self._total_bytes - (previous_size or 0) + len(payload)
+                count, total_bytes, evicted = self._evict(conn, count, total_bytes)
+            # Only once committed
+            self._count, self._total_bytes = count, total_bytes
+        return evicted
+
+    def delete(self, work_id: str) -> None:
+        table = self.work_results
+        with self._lock:
+            with self.engine.begin() as conn:
+                size = conn.execute(
+                    delete(table).where(table.c.work_id == work_id).returning(table.c.size)
+                ).scalar_one_or_none()
+            if size is not None:
+                self._count -= 1
+                self._total_bytes -= size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _evict(self, conn, count: int, total_bytes: int) -> Tuple[int, int, List[str]]:
+        """Remove expired rows, then the oldest rows over the limits
+
+        Returns:
+            The row count and total size left, and the work_ids removed
+        """
+        table = self.work_results
+        # Uses the updated_at index and only touches expired rows
+        expired = conn.execute(
+            delete(table)
+            .where(table.c.updated_at < time.time() - self.ttl_seconds)
+            .returning(table.c.work_id, table.c.size)
+        ).all()
+        evicted = [row.work_id for row in expired]
+        count -= len(expired)
+        total_bytes -= sum(row.size for row in expired)
+        if count <= self.max_items and total_bytes <= self.max_bytes:
+            return count, total_bytes, evicted
+
+        # Collect the oldest rows until both limits are satisfied
+        stale_ids = []
+        rows = conn.execute(
+            select(table.c.work_id, table.c.size).order_by(table.c.updated_at)
+        )
+        for row in rows:
+            if count <= 1 or (count <= self.max_items and total_bytes <= self.max_bytes):
+                break
+            stale_ids.append(row.work_id)
+            count -= 1
+            total_bytes -= row.size
+        rows.close()
+
+        if stale_ids:
+            logger.debug("Evicting %d work results from work store", len(stale_ids))
+            conn.execute(delete(table).where(table.c.work_id.in_(stale_ids)))
+        return count, total_bytes, evicted + stale_ids
+
+
+def create_work_store(name: str = "work_results") -> BaseWorkStore:
+    """Create the work store configured by environment variables.
+
+    WORK_STORE_BACKEND selects "memory" (default) or "sqlite". WORK_STORE_PATH,
+    WORK_STORE_TTL_SECONDS, WORK_STORE_MAX_BYTES and WORK_STORE_MAX_ITEMS
+    override the backend defaults.
+
+    Args:
+        name: Name of the store's owner; the SQLite database defaults to
+            data/<name>.db, so services started in one directory do not share it
+    """
+    backend = os.getenv("WORK_STORE_BACKEND", "memory").lower()
+    limits = {}
+    if os.getenv("WORK_STORE_TTL_SECONDS"):
+        limits["ttl_seconds"] = float(os.getenv("WORK_STORE_TTL_SECONDS"))
+    if os.getenv("WORK_STORE_MAX_BYTES"):
+        limits["max_bytes"] = int(os.getenv("WORK_STORE_MAX_BYTES"))
+    if os.getenv("WORK_STORE_MAX_ITEMS"):
+        limits["max_items"] = int(os.getenv("WORK_STORE_MAX_ITEMS"))
+
+    if backend == "memory":
+        return InMemoryWorkStore(**limits)
+    if backend == "sqlite":
+        return SqliteWorkStore(path=os.getenv("WORK_STORE_PATH") or f"data/{name}.db", **limits)
+    raise ValueError(f"Unknown work store backend: {backend}")
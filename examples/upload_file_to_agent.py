@@ -65,15 +65,11 @@ async def upload_file_to_agent(
             print(f"\nWork request started with ID: {response.work_id}")
             print(f"Initial status: {response.status}")
             
-            # Poll for completion if the work is async
-            while response.status in ['pending', 'in_progress']:
+            # Wait for completion if the work is async; the server holds each
+            # request open until the work changes state
+            if response.status in ['pending', 'in_progress']:
                 print(f"Status: {response.status}... waiting")
-                await asyncio.sleep(2)  # Wait 2 seconds between checks
-                
-                response = await client.get_work_result(response.work_id)
-                if not response:
-                    print("Error: Work request not found")
-                    return
+                response = await client.wait_for_result(response.work_id)
             
             # Print final result
             print("\nFinal result:")